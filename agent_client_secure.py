@@ -1,7 +1,6 @@
 import httpx
 import asyncio
-from nacl.signing import SigningKey
-from nacl.encoding import HexEncoder
+from agent_sdk import AgentSDK
 import json
 import os
 import time
@@ -9,27 +8,9 @@ import time
 # --- Configuration ---
 API_URL = "http://localhost:8004"
 
-class AgentSDK:
-    def __init__(self):
-        self.signing_key = SigningKey.generate()
-        self.verify_key = self.signing_key.verify_key
-        self.public_key_hex = self.verify_key.encode(encoder=HexEncoder).decode('utf-8')
-        self.agent_id = f"agent_secure_{self.public_key_hex[:8]}"
-        
-    def sign_request(self, method, path, body_str):
-        timestamp = str(int(time.time()))
-        message = f"{method}{path}{timestamp}{body_str}".encode("utf-8")
-        signature = self.signing_key.sign(message).signature.hex()
-        return {
-            "X-Agent-ID": self.agent_id,
-            "X-Signature": signature,
-            "X-Timestamp": timestamp,
-            "Content-Type": "application/json"
-        }
-
 async def run_secure_agent():
     print("🤖 [SecureBot] Booting up with Ed25519 Crypto Module...")
-    agent = AgentSDK()
+    agent = AgentSDK("agent_secure")
     print(f"   -> Identity: {agent.agent_id}")
 
     async with httpx.AsyncClient() as client:
@@ -0,0 +1,169 @@
+from nacl.signing import SigningKey
+from nacl.encoding import HexEncoder
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional
+import asyncio
+import httpx
+import json
+import random
+import time
+
+# --- Agent SDK ---
+# Ed25519 identity and request signing for AgentKred clients. A signed request
+# carries X-Agent-ID, X-Timestamp and X-Signature = Sign(Method + Path +
+# Timestamp + Body), where Body is the exact bytes sent.
+
+class AgentSDK:
+    def __init__(self, prefix: str = "agent", signing_key: Optional[SigningKey] = None):
+        self.signing_key = signing_key or SigningKey.generate()
+        self.verify_key = self.signing_key.verify_key
+        self.public_key_hex = self.verify_key.encode(encoder=HexEncoder).decode('utf-8')
+        self.agent_id = f"{prefix}_{self.public_key_hex[:8]}"
+
+    def sign_request(self, method, path, body_str, timestamp_override=None):
+        timestamp = str(int(time.time())) if timestamp_override is None else str(timestamp_override)
+        return self.sign(method, path, body_str.encode("utf-8"), timestamp)
+
+    def sign(self, method: str, path: str, body: bytes, timestamp: str) -> dict:
+        """Headers for sending exactly ``body``; signs the bytes that go on the wire."""
+        signature = self.signing_key.sign(f"{method}{path}{timestamp}".encode() + body).signature.hex()
+        return {
+            "X-Agent-ID": self.agent_id,
+            "X-Signature": signature,
+            "X-Timestamp": timestamp,
+            "Content-Type": "application/json"
+        }
+
+# --- Async Client ---
+# One AgentClient serves any number of agents: a single keep-alive connection
+# pool, a semaphore bounding in-flight calls, and the server's clock offset
+# (from the Date header) applied to every X-Timestamp so a skewed host stays
+# inside the signature window. Reads are retried on 429, 5xx and transport
+# errors; writes only when the server cannot have acted on them (429, 503, a
+# connection that never opened), since a fresh signature gets past replay
+# protection and e.g. a stake would be credited twice. Backoff is jittered
+# and exponential, at least as long as Retry-After. Every attempt is signed
+# again with a later timestamp, once it holds a concurrency slot: the server
+# remembers each signature it has accepted, so resending the same bytes would
+# be refused as a replay.
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+WRITE_RETRY_STATUSES = frozenset({429, 503})
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+class AgentKredError(Exception):
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+class AgentClient:
+    def __init__(self, base_url: str = "http://localhost:8004", max_connections: int = 100, concurrency: int = 100,
+                 retries: int = 3, backoff: float = 0.5, max_backoff: float = 30.0, timeout: float = 10.0,
+                 clock_sync_interval: float = 300.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock_sync_interval = clock_sync_interval
+        self.clock_offset = 0.0 # server time - local time, seconds
+        self._synced_at = float("-inf")
+        self._limit = asyncio.Semaphore(concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url, timeout=timeout, transport=transport,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self.requests = 0
+        self.retried = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    # --- Clock ---
+    def now(self) -> int:
+        return int(time.time() + self.clock_offset)
+
+    def _sync_clock(self, resp: httpx.Response, sent_at: float, force: bool = False):
+        if not force and time.monotonic() - self._synced_at < self.clock_sync_interval: return
+        date = resp.headers.get("date")
+        if not date: return
+        try: server = parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError): return
+        # Date has whole seconds: take the middle of that second and of the round trip
+        self.clock_offset = server + 0.5 - (sent_at + time.time()) / 2
+        self._synced_at = time.monotonic()
+
+    # --- Requests ---
+    async def request(self, method: str, path: str, payload: Any = None, agent: Optional[AgentSDK] = None,
+                      params: Optional[dict] = None) -> httpx.Response:
+        """Send one call, signed by ``agent`` if given, retrying where that is safe; returns the final response."""
+        body = b"" if payload is None else json.dumps(payload, separators=(",", ":")).encode()
+        read = method.upper() in ("GET", "HEAD")
+        retry_statuses = RETRY_STATUSES if read else WRITE_RETRY_STATUSES
+        last_ts = 0
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._limit:
+                    # Signed once a slot is free, so time spent queued doesn't age the timestamp
+                    headers = None
+                    if agent is not None:
+                        last_ts = max(self.now(), last_ts + 1) # a fresh signature for every attempt
+                        headers = agent.sign(method, path, body, str(last_ts))
+                    sent_at = time.time()
+                    self.requests += 1
+                    resp = await self._client.request(method, path, content=body or None, headers=headers, params=params)
+            except httpx.TransportError as e:
+                if attempt == self.retries or not (read or isinstance(e, UNSENT_ERRORS)): raise
+                await self._wait(attempt)
+                continue
+            expired = resp.status_code == 403 and agent is not None and _detail(resp) == "Request timestamp expired"
+            self._sync_clock(resp, sent_at, force=expired)
+            if attempt == self.retries or not (resp.status_code in retry_statuses or expired): return resp
+            await self._wait(attempt, resp.headers.get("retry-after"))
+        return resp
+
+    async def _wait(self, attempt: int, retry_after: Optional[str] = None):
+        self.retried += 1
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt) * (0.5 + random.random() / 2)
+        if retry_after and retry_after.isdigit(): delay = max(delay, min(float(retry_after), self.max_backoff))
+        await asyncio.sleep(delay)
+
+    async def call(self, method: str, path: str, payload: Any = None, agent: Optional[AgentSDK] = None, params: Optional[dict] = None) -> Any:
+        """Like request(), but returns the decoded JSON and raises AgentKredError for an error status."""
+        resp = await self.request(method, path, payload, agent, params)
+        if resp.status_code >= 400: raise AgentKredError(resp.status_code, _detail(resp))
+        return resp.json()
+
+    # --- API ---
+    async def register(self, agent: AgentSDK, name: str) -> dict:
+        return await self.call("POST", "/register", {"id": agent.agent_id, "name": name, "public_key": agent.public_key_hex}, agent)
+
+    async def update_profile(self, agent: AgentSDK, **fields) -> dict:
+        return await self.call("POST", "/agent/update", fields, agent)
+
+    async def verify(self, agent: AgentSDK, platform: str, proof_url: str, background: bool = False) -> dict:
+        return await self.call("POST", "/verify", {"agent_id": agent.agent_id, "platform": platform, "proof_url": proof_url, "background": background}, agent)
+
+    async def review(self, agent: AgentSDK, target_id: str, score: int, comment: str = "") -> dict:
+        return await self.call("POST", "/review", {"reviewer_id": agent.agent_id, "target_id": target_id, "score": score, "comment": comment}, agent)
+
+    async def stake(self, agent: AgentSDK, tx_hash: str, amount: float) -> dict:
+        return await self.call("POST", "/stake", {"agent_id": agent.agent_id, "tx_hash": tx_hash, "amount": amount}, agent)
+
+    async def batch(self, agent: AgentSDK, operations: list[dict], atomic: bool = False) -> dict:
+        return await self.call("POST", "/batch", {"operations": operations, "atomic": atomic}, agent)
+
+    async def get_agent(self, agent_id: str) -> dict:
+        return await self.call("GET", f"/agent/{agent_id}")
+
+    async def top(self, limit: int = 50, sort_by: str = "trust_score") -> list[dict]:
+        return await self.call("GET", "/agents/top", params={"limit": limit, "sort_by": sort_by})
+
+def _detail(resp: httpx.Response) -> Any:
+    try: return resp.json().get("detail")
+    except (ValueError, AttributeError): return resp.text
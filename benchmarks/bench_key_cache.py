@@ -0,0 +1,99 @@
+"""Signed-write throughput with and without the public-key cache.
+
+    python benchmarks/bench_key_cache.py [--agents 200] [--requests 2000] [--endpoint stake]
+
+Runs signed /agent/update (or /stake) calls through the ASGI app against in-memory SQLite and reports
+requests/sec, SELECTs per request and cache hit/miss counters.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from httpx import AsyncClient, ASGITransport
+from nacl.signing import SigningKey
+from nacl.encoding import HexEncoder
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from database import get_db
+from models import Base, Agent
+from key_cache import key_cache
+
+def make_signer():
+    sk = SigningKey.generate()
+    pk = sk.verify_key.encode(encoder=HexEncoder).decode()
+    return f"bench_{pk[:12]}", pk, sk
+
+def sign(agent_id, sk, path, body):
+    ts = str(int(time.time()))
+    sig = sk.sign(f"POST{path}{ts}{body}".encode()).signature.hex()
+    return {"X-Agent-ID": agent_id, "X-Signature": sig, "X-Timestamp": ts, "Content-Type": "application/json"}
+
+async def run(n_agents, n_requests, cache_size, endpoint):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    selects = 0
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, *args):
+        nonlocal selects
+        if statement.lstrip().upper().startswith("SELECT"): selects += 1
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    signers = [make_signer() for _ in range(n_agents)]
+    async with Session() as db:
+        for agent_id, pk, _ in signers:
+            a = Agent(id=agent_id, name=agent_id, public_key=pk, verification_score=0, review_score=0, moltbook_karma=0, staked_amount=0.0)
+            a.calculate_total_score()
+            db.add(a)
+        await db.commit()
+
+    async def override_get_db():
+        async with Session() as db:
+            yield db
+    app.dependency_overrides[get_db] = override_get_db
+    key_cache.clear()
+    key_cache.maxsize = cache_size
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        selects = 0
+        start = time.perf_counter()
+        for i in range(n_requests):
+            agent_id, _, sk = signers[i % n_agents]
+            if endpoint == "stake":
+                path, body = "/stake", json.dumps({"agent_id": agent_id, "tx_hash": f"0x{i:064x}", "amount": 1.0})
+            else:
+                path, body = "/agent/update", json.dumps({"bio": f"update {i}"})
+            resp = await client.post(path, content=body, headers=sign(agent_id, sk, path, body))
+            assert resp.status_code == 200, resp.text
+        elapsed = time.perf_counter() - start
+
+    app.dependency_overrides.clear()
+    await engine.dispose()
+    return {
+        "endpoint": endpoint,
+        "cache_size": cache_size,
+        "requests_per_sec": round(n_requests / elapsed, 1),
+        "selects_per_request": round(selects / n_requests, 2),
+        **{k: v for k, v in key_cache.stats().items() if k in ("hits", "misses", "hit_rate")},
+    }
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--endpoint", choices=["update", "stake"], default="update")
+    args = parser.parse_args()
+    for size in (0, 10_000):
+        print(json.dumps(await run(args.agents, args.requests, size, args.endpoint)))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""/agents/top rendering cost per list size: old paths vs the fast ones.
+
+    python benchmarks/bench_list_serialization.py [--agents 20000] [--sizes 10,50,100,500,1000] [--repeat 50]
+
+SQL paths run against an in-memory SQLite database:
+  orm_response_model   SELECT Agent -> ORM objects -> validate into AgentResponse
+                       (from_attributes) -> dump to Python -> json.dumps, as
+                       FastAPI does for response_model
+  columns_typeadapter  SELECT the AgentResponse columns -> dicts -> one
+                       TypeAdapter(list[AgentRow]).dump_json
+Leaderboard index paths (no database):
+  index_validate       snapshot dicts -> validate into AgentResponse -> dump_json
+  index_fragments      per-agent JSON kept by the index, joined into an array
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DB_PROFILE", "test")
+
+from datetime import datetime
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from models import Base, Agent
+from leaderboard import Leaderboard
+from main import AgentResponse, AGENT_FIELDS, AGENT_COLUMNS, AGENT_ROWS, render_agent
+
+RESPONSE_LIST = TypeAdapter(list[AgentResponse])
+
+async def orm_response_model(db, limit):
+    agents = (await db.execute(select(Agent).order_by(Agent.trust_score.desc(), Agent.id.desc()).limit(limit))).scalars().all()
+    db.expunge_all()
+    content = RESPONSE_LIST.dump_python(RESPONSE_LIST.validate_python(agents, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+async def columns_typeadapter(db, limit):
+    query = select(*AGENT_COLUMNS).order_by(Agent.trust_score.desc(), Agent.id.desc()).limit(limit)
+    return AGENT_ROWS.dump_json([dict(zip(AGENT_FIELDS, row)) for row in (await db.execute(query)).all()])
+
+async def index_validate(board, limit):
+    return RESPONSE_LIST.dump_json(RESPONSE_LIST.validate_python(board.top("trust_score", limit)))
+
+async def index_fragments(board, limit):
+    return board.top_json("trust_score", limit)[0]
+
+async def timed(fn, arg, limit, repeat):
+    await fn(arg, limit) # warm up
+    start = time.perf_counter()
+    for _ in range(repeat): await fn(arg, limit)
+    return (time.perf_counter() - start) / repeat * 1000
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", type=int, default=20_000)
+    parser.add_argument("--sizes", default="10,50,100,500,1000")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    now = datetime.utcnow()
+    async with factory() as db:
+        await db.execute(insert(Agent), [
+            {"id": f"agent-{i:07d}", "name": f"Agent {i}", "public_key": "ab" * 32, "bio": "Autonomous trader", "tags": "defi,coding",
+             "trust_score": i % 5000, "verification_score": 50, "review_score": i % 300, "moltbook_karma": i % 40,
+             "staked_amount": float(i % 2000), "created_at": now, "last_active_at": now} for i in range(args.agents)
+        ])
+        await db.commit()
+        board = Leaderboard(render=render_agent)
+        await board.load(db)
+
+    results = []
+    async with factory() as db:
+        for limit in (int(s) for s in args.sizes.split(",")):
+            assert json.loads(await orm_response_model(db, limit)) == json.loads(await columns_typeadapter(db, limit)) == json.loads(await index_fragments(board, limit))
+            row = {"limit": limit}
+            for fn, arg in ((orm_response_model, db), (columns_typeadapter, db), (index_validate, board), (index_fragments, board)):
+                row[f"{fn.__name__}_ms"] = round(await timed(fn, arg, limit, args.repeat), 3)
+            row["sql_speedup"] = round(row["orm_response_model_ms"] / row["columns_typeadapter_ms"], 1)
+            row["index_speedup"] = round(row["index_validate_ms"] / row["index_fragments_ms"], 1)
+            results.append(row)
+    await engine.dispose()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""Ed25519 verification throughput and event-loop lag per executor mode.
+
+    python benchmarks/bench_sig_verify.py [--count 20000] [--concurrency 256] [--body-bytes 200]
+
+For each mode, fires --count signed messages through SignatureVerifier with at
+most --concurrency in flight, while a probe coroutine measures how late the
+loop wakes it from a 1 ms sleep (the lag every other request would see).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nacl.signing import SigningKey
+from sig_verifier import SignatureVerifier, MODES
+
+def make_items(count, body_bytes, n_keys=64):
+    keys = [SigningKey.generate() for _ in range(n_keys)]
+    items = []
+    for i in range(count):
+        sk = keys[i % n_keys]
+        msg = f"POST/review{1700000000 + i}".encode() + os.urandom(body_bytes)
+        items.append((sk.verify_key, msg, sk.sign(msg).signature))
+    return items
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+async def run(mode, items, concurrency, workers):
+    verifier = SignatureVerifier(mode=mode, workers=workers, process_min_bytes=0 if mode == "process" else 1 << 62)
+    lags, done = [], False
+
+    async def probe():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - start - 0.001) * 1000)
+
+    sem = asyncio.Semaphore(concurrency)
+    async def one(item):
+        async with sem:
+            assert await verifier.verify(*item)
+
+    await verifier.verify(*items[0]) # warm up the pool
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(item) for item in items))
+    elapsed = time.perf_counter() - start
+    done = True
+    await probe_task
+    verifier.shutdown()
+    return {
+        "mode": mode,
+        "verifications_per_sec": round(len(items) / elapsed),
+        "loop_lag_ms_p50": round(percentile(lags, 0.5), 3),
+        "loop_lag_ms_p99": round(percentile(lags, 0.99), 3),
+        "loop_lag_ms_max": round(max(lags, default=0.0), 3),
+        "batches": verifier.batches,
+        "jobs": verifier.jobs,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--body-bytes", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--modes", default=",".join(MODES))
+    args = parser.parse_args()
+    items = make_items(args.count, args.body_bytes)
+    for mode in args.modes.split(","):
+        print(json.dumps(await run(mode, items, args.concurrency, args.workers)))
+
+if __name__ == "__main__":
+    asyncio.run(main())
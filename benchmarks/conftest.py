@@ -0,0 +1,196 @@
+"""Micro-benchmark harness for benchmarks/test_hot_paths.py.
+
+    uv run pytest benchmarks [--bench-sizes 1000,100000,1000000] [--bench-threshold 0.25] [--bench-no-save]
+
+Each benchmark times its operation in rounds and keeps the median time per
+operation. Results go to a history file (one JSON line per run, with commit
+and machine), and a benchmark fails if it is slower than the median of the
+last --bench-baseline runs on the same machine by more than
+--bench-threshold. A result that fails that check is not saved, so a
+regression never becomes part of the baseline. Seeded SQLite datasets are built once per size and
+schema and cached in benchmarks/.data/.
+"""
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DB_PROFILE", "test")
+
+from nacl.signing import SigningKey
+from sqlalchemy import create_engine, insert
+from sqlalchemy.schema import CreateTable
+from models import Base, Agent, AgentTag, Review
+from search import doc_rowid, normalize_tags
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SIGNERS = 64 # agents with real keys, spread over the id range
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench")
+    group.addoption("--bench-sizes", default="1000,100000,1000000", help="Agents per seeded dataset")
+    group.addoption("--bench-history", default=os.path.join(HERE, "history.jsonl"), help="JSONL file of past runs")
+    group.addoption("--bench-threshold", type=float, default=0.25, help="Allowed slowdown vs the baseline (0.25 = 25%%)")
+    group.addoption("--bench-baseline", type=int, default=5, help="Past runs whose median is the baseline")
+    group.addoption("--bench-rounds", type=int, default=7)
+    group.addoption("--bench-no-save", action="store_true", help="Don't append this run to the history")
+
+def pytest_generate_tests(metafunc):
+    if "dataset" in metafunc.fixturenames:
+        sizes = [int(s) for s in metafunc.config.getoption("--bench-sizes").split(",")]
+        metafunc.parametrize("dataset", sizes, indirect=True, ids=[f"{n}" for n in sizes])
+
+# --- History ---
+class History:
+    def __init__(self, path: str, baseline_runs: int):
+        self.path = path
+        self.machine = f"{platform.node()}/{platform.machine()}/py{platform.python_version()}"
+        self.baseline_runs = baseline_runs
+        self.past: list[dict] = []
+        if os.path.exists(path):
+            with open(path) as f:
+                self.past = [run for run in map(json.loads, filter(str.strip, f)) if run["machine"] == self.machine]
+        self.results: dict[str, float] = {}
+        self.regressed: set[str] = set()
+
+    def baseline(self, name: str):
+        values = [run["results"][name] for run in self.past if name in run["results"]][-self.baseline_runs:]
+        return statistics.median(values) if values else None
+
+    def save(self):
+        try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=HERE).stdout.strip()
+        except OSError: commit = ""
+        results = {name: us for name, us in self.results.items() if name not in self.regressed}
+        run = {"at": datetime.utcnow().isoformat(timespec="seconds"), "commit": commit, "machine": self.machine, "results": results,
+               "regressed": sorted(self.regressed)}
+        with open(self.path, "a") as f: f.write(json.dumps(run, sort_keys=True) + "\n")
+
+@pytest.fixture(scope="session")
+def history(request):
+    h = History(request.config.getoption("--bench-history"), request.config.getoption("--bench-baseline"))
+    request.config._bench_history = h
+    yield h
+    if h.results and not request.config.getoption("--bench-no-save"): h.save()
+
+def pytest_terminal_summary(terminalreporter, config):
+    h = getattr(config, "_bench_history", None)
+    if not h or not h.results: return
+    terminalreporter.section("benchmarks (median us per call)")
+    for name, us in h.results.items():
+        baseline = h.baseline(name)
+        delta = f"{(us / baseline - 1) * 100:+.0f}% vs {baseline:.1f}" if baseline else "no baseline"
+        terminalreporter.write_line(f"{name:<60} {us:>12.1f}  {delta}")
+
+# --- Timing ---
+class Bench:
+    def __init__(self, history: History, name: str, threshold: float, rounds: int):
+        self.history = history
+        self.name = name
+        self.threshold = threshold
+        self.rounds = rounds
+
+    def _number(self, elapsed_one: float) -> int:
+        # Enough calls per round that one round takes ~20ms
+        return max(1, int(0.02 / max(elapsed_one, 1e-7)))
+
+    def __call__(self, fn, *args):
+        start = time.perf_counter(); fn(*args)
+        number = self._number(time.perf_counter() - start)
+        times = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            for _ in range(number): fn(*args)
+            times.append((time.perf_counter() - start) / number)
+        return self.record(times)
+
+    async def run_async(self, fn, *args):
+        start = time.perf_counter(); await fn(*args)
+        number = self._number(time.perf_counter() - start)
+        times = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            for _ in range(number): await fn(*args)
+            times.append((time.perf_counter() - start) / number)
+        return self.record(times)
+
+    def record(self, times: list[float]) -> float:
+        us = round(statistics.median(times) * 1e6, 3)
+        self.history.results[self.name] = us
+        baseline = self.history.baseline(self.name)
+        if baseline and us > baseline * (1 + self.threshold):
+            self.history.regressed.add(self.name)
+            pytest.fail(f"{self.name}: {us:.1f}us vs baseline {baseline:.1f}us (+{(us / baseline - 1) * 100:.0f}%, threshold {self.threshold * 100:.0f}%)")
+        return us
+
+@pytest.fixture
+def bench(request, history):
+    """Times a callable: ``bench(fn, *args)`` or ``await bench.run_async(fn, *args)``; median us per call."""
+    name = request.node.name
+    return Bench(history, name, request.config.getoption("--bench-threshold"), request.config.getoption("--bench-rounds"))
+
+# --- Datasets ---
+def signer_key(i: int) -> SigningKey:
+    return SigningKey(hashlib.blake2b(f"bench-signer-{i}".encode(), digest_size=32).digest())
+
+def signer_ids(size: int) -> list[str]:
+    return [f"agent-{i * (size // SIGNERS):08d}" for i in range(min(SIGNERS, size))]
+
+def schema_fingerprint() -> str:
+    ddl = "".join(str(CreateTable(t)) for t in Base.metadata.sorted_tables)
+    return hashlib.blake2b(ddl.encode(), digest_size=6).hexdigest()
+
+def agent_tags(i: int) -> str:
+    """"defi" on half the agents, "coding" on a third, "niche-<n>" on one in 1000."""
+    return ",".join(t for t, on in (("defi", i % 2 == 0), ("coding", i % 3 == 0), (f"niche-{i % 1000}", True)) if on)
+
+def seed(path: str, size: int):
+    """``size`` agents; agent i reviews agent i % 100, so each of the first 100 has size/100 reviews."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    now = datetime(2026, 1, 1)
+    keys = {agent_id: signer_key(i).verify_key.encode().hex() for i, agent_id in enumerate(signer_ids(size))}
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=OFF")
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        for lo in range(0, size, 50_000):
+            ids = range(lo, min(size, lo + 50_000))
+            conn.execute(insert(Agent), [{
+                "id": f"agent-{i:08d}", "name": f"Agent {i}", "public_key": keys.get(f"agent-{i:08d}", "ab" * 32),
+                "bio": f"Autonomous trader, desk {i % 1000}", "tags": agent_tags(i), "trust_score": (i * 7919) % 5000,
+                "verification_score": 50, "review_score": i % 300, "moltbook_karma": i % 40, "staked_amount": float(i % 2000),
+                "score_version": 1, "graph_score": 0, "version": 1, "created_at": now, "last_active_at": now, "updated_at": now,
+            } for i in ids])
+            conn.execute(insert(Review), [{
+                "reviewer_id": f"agent-{i:08d}", "target_id": f"agent-{i % 100:08d}", "score": 1, "comment": "Reliable",
+                "created_at": now + timedelta(seconds=i),
+            } for i in ids if i >= 100])
+            conn.execute(insert(AgentTag), [{"agent_id": f"agent-{i:08d}", "tag": t} for i in ids for t in normalize_tags(agent_tags(i))])
+            conn.exec_driver_sql("INSERT INTO agent_bio_fts (rowid, agent_id, bio) VALUES (?, ?, ?)",
+                                 [(doc_rowid(f"agent-{i:08d}"), f"agent-{i:08d}", f"Autonomous trader, desk {i % 1000}") for i in ids])
+    engine.dispose()
+
+@pytest.fixture(scope="session")
+def datasets():
+    os.makedirs(os.path.join(HERE, ".data"), exist_ok=True)
+    return {}
+
+@pytest.fixture
+def dataset(request, datasets):
+    """Path of a seeded SQLite file with ``request.param`` agents."""
+    size = request.param
+    if size not in datasets:
+        path = os.path.join(HERE, ".data", f"agents-{size}-{schema_fingerprint()}.db")
+        if not os.path.exists(path):
+            if os.path.exists(path + ".tmp"): os.remove(path + ".tmp")
+            seed(path + ".tmp", size)
+            os.replace(path + ".tmp", path)
+        datasets[size] = path
+    return size, datasets[size]
@@ -0,0 +1,112 @@
+"""Hot paths in isolation; see conftest.py for options, history and regression checks."""
+import pytest
+import pytest_asyncio
+import time
+from datetime import datetime
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+import main
+from main import AgentResponse, AGENT_FIELDS, AGENT_ROWS, REVIEW_ROWS, top_agents_query, reviews_query, verify_request_signature
+from search import find_agents
+from models import Agent
+from key_cache import key_cache
+from rate_limit import rate_limiter
+from conftest import signer_ids, signer_key
+
+@pytest_asyncio.fixture
+async def db(dataset):
+    size, path = dataset
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield size, session
+    await engine.dispose()
+
+def agent_row(i: int = 1) -> dict:
+    return {"id": f"agent-{i:08d}", "name": f"Agent {i}", "bio": "Autonomous trader", "tags": "defi,coding", "trust_score": 160,
+            "verification_score": 50, "review_score": 100, "moltbook_karma": 20, "staked_amount": 0.0, "graph_score": 0,
+            "created_at": datetime(2026, 1, 1), "last_active_at": datetime(2026, 1, 1)}
+
+# --- Pure CPU ---
+def test_calculate_total_score(bench):
+    agent = Agent(id="a", verification_score=50, review_score=100, moltbook_karma=20, staked_amount=500.0)
+    bench(agent.calculate_total_score)
+    assert agent.trust_score > 0
+
+def test_agent_response_serialize(bench):
+    agent = Agent(**agent_row(), public_key="ab" * 32)
+    bench(lambda: AgentResponse.model_validate(agent).model_dump_json())
+
+def test_agent_rows_serialize_100(bench):
+    rows = [agent_row(i) for i in range(100)]
+    bench(AGENT_ROWS.dump_json, rows)
+
+# --- Signature verification, with a DB lookup of the key ---
+@pytest.mark.asyncio
+async def test_verify_request_signature(bench, db, monkeypatch):
+    size, session = db
+    monkeypatch.setattr(rate_limiter, "enabled", False)
+    monkeypatch.setattr(main, "replay_store", None) # every call below reuses a signature
+    signers = [(agent_id, signer_key(i)) for i, agent_id in enumerate(signer_ids(size))]
+    ts = str(int(time.time()))
+    body = b'{"bio": "bench"}'
+    calls = []
+    for agent_id, key in signers:
+        signature = key.sign(b"POST/agent/update" + ts.encode() + body).signature.hex()
+        async def receive(body=body): return {"type": "http.request", "body": body, "more_body": False}
+        calls.append((Request({"type": "http", "method": "POST", "path": "/agent/update", "headers": [], "query_string": b""}, receive), agent_id, signature))
+    n = 0
+    async def verify():
+        nonlocal n
+        request, agent_id, signature = calls[n % len(calls)]
+        n += 1
+        key_cache.clear() # measure the cold path: key lookup + decode + verify
+        assert await verify_request_signature(request, agent_id, signature, ts, session) == agent_id
+    await bench.run_async(verify)
+
+# --- Queries behind /agents/top and /agent/{id}/reviews (no caches) ---
+@pytest.mark.asyncio
+async def test_top_agents_query(bench, db):
+    size, session = db
+    async def top():
+        rows = [dict(zip(AGENT_FIELDS, row)) for row in (await session.execute(top_agents_query("trust_score", 50))).all()]
+        assert len(rows) == min(50, size)
+    await bench.run_async(top)
+
+@pytest.mark.asyncio
+async def test_top_agents_query_deep_page(bench, db):
+    size, session = db
+    after = (2500, "agent-00500000") # a cursor halfway down the trust_score index
+    async def top():
+        await session.execute(top_agents_query("trust_score", 50, after))
+    await bench.run_async(top)
+
+@pytest.mark.asyncio
+async def test_agent_reviews_query(bench, db):
+    size, session = db
+    async def reviews():
+        rows = [row._asdict() for row in (await session.execute(reviews_query("agent-00000007", 100))).all()]
+        REVIEW_ROWS.dump_json(rows)
+    await bench.run_async(reviews)
+
+# --- /agents/search (SQLite: agent_tags and FTS5) ---
+SEARCHES = {
+    "common_tag": {"tags": ["defi"]},
+    "rare_tag": {"tags": ["niche-7"]},
+    "all_tags": {"tags": ["defi", "coding"], "match_all": True},
+    "common_tag_rare_combo": {"tags": ["coding", "niche-7"], "match_all": True},
+    "name_prefix": {"name": "agent 12"},
+    "bio_rare": {"q": "desk 7"},
+    "bio_common": {"q": "trader"},
+    "bio_common_and_tag": {"q": "trader", "tags": ["niche-7"]},
+    "bio_rare_and_tag": {"q": "desk 7", "tags": ["defi"]},
+}
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("search", list(SEARCHES))
+async def test_search_query(bench, db, search):
+    size, session = db
+    async def run():
+        await find_agents(session, main.AGENT_COLUMNS, limit=50, **SEARCHES[search])
+    await bench.run_async(run)
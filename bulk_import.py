@@ -0,0 +1,284 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+from sqlalchemy import insert, select, text, tuple_
+from sqlalchemy.dialects import sqlite
+from nacl.bindings import crypto_sign_ed25519_pk_to_curve25519
+from nacl.signing import VerifyKey
+from nacl.encoding import HexEncoder
+from models import Agent, Review, Verification
+from rescore import rescore
+from search import reindex
+from verify_worker import PLATFORM_BOOSTS
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+
+# --- Bulk Import ---
+# Loads agents, verifications and reviews from JSONL or CSV without going
+# through /register. The file is read in batches; worker processes parse and
+# validate them (public keys are decoded and checked to be valid Ed25519
+# points) while the event loop writes earlier batches, with at most
+# ``inflight`` batches in memory at a time.
+#
+# Postgres batches go in with COPY (agents via a staging table so existing
+# ids are skipped); other databases use batched executemany. Score columns
+# come from the agent rows as-is (imported reviews and verifications are
+# history, they don't add boosts again) and trust_score is recomputed with
+# rescore.py once the agents are in; their tags and bios are then indexed
+# for /agents/search (search.py). Import agents before the rows that
+# reference them: reviews and verifications naming an unknown agent are
+# rejected. Re-running an import skips what is already there: agents by id,
+# reviews by (reviewer, target, created_at) and verifications by (agent,
+# platform, proof_url). Reviews without created_at get the import time, so
+# only those with one are recognized on a re-run.
+#
+#   python bulk_import.py --agents agents.jsonl --verifications v.csv --reviews reviews.jsonl
+
+KINDS = ("agents", "verifications", "reviews") # load order
+TABLES = {"agents": Agent.__table__, "reviews": Review.__table__, "verifications": Verification.__table__}
+COLUMNS = {
+    "agents": [c.name for c in Agent.__table__.columns],
+    "reviews": ["reviewer_id", "target_id", "score", "comment", "created_at"],
+    "verifications": ["agent_id", "platform", "proof_url", "is_verified", "verified_at", "status", "attempts", "created_at"],
+}
+KEYS = {"reviews": ("reviewer_id", "target_id", "created_at"), "verifications": ("agent_id", "platform", "proof_url")}
+REFS = {"reviews": ("reviewer_id", "target_id"), "verifications": ("agent_id",)}
+
+class RowError(ValueError):
+    pass
+
+def _str(rec: dict, key: str, required: bool = True) -> Optional[str]:
+    value = rec.get(key)
+    if value in (None, ""):
+        if required: raise RowError(f"{key} missing")
+        return None
+    return str(value)
+
+def _num(rec: dict, key: str, cast, default=0):
+    value = rec.get(key)
+    if value in (None, ""): return default
+    try: return cast(value)
+    except (TypeError, ValueError): raise RowError(f"{key} is not a number")
+
+def _time(rec: dict, key: str, default: Optional[datetime]) -> Optional[datetime]:
+    value = rec.get(key)
+    if value in (None, ""): return default
+    try: return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError: raise RowError(f"{key} is not an ISO timestamp")
+
+def _public_key(value: str) -> str:
+    try:
+        key = VerifyKey(value, encoder=HexEncoder)
+        crypto_sign_ed25519_pk_to_curve25519(bytes(key)) # rejects bytes that aren't a curve point
+    except Exception:
+        raise RowError("invalid public_key")
+    return key.encode(encoder=HexEncoder).decode()
+
+def _agent(rec: dict, now: datetime) -> tuple:
+    tags, links = rec.get("tags"), rec.get("social_links")
+    created = _time(rec, "created_at", now)
+    row = {
+        "id": _str(rec, "id"), "name": _str(rec, "name"), "public_key": _public_key(_str(rec, "public_key")),
+        "created_at": created, "bio": _str(rec, "bio", False),
+        "tags": ",".join(tags) if isinstance(tags, list) else (tags or None),
+        "social_links": json.dumps(links) if isinstance(links, dict) else (links or None),
+        "trust_score": 0, "verification_score": _num(rec, "verification_score", int), "review_score": _num(rec, "review_score", int),
+        "moltbook_karma": _num(rec, "moltbook_karma", int), "staked_amount": _num(rec, "staked_amount", float, 0.0),
+        "staking_tx_hash": _str(rec, "staking_tx_hash", False), "last_active_at": _time(rec, "last_active_at", created),
+        "score_version": None, # stale until rescored
+        "graph_score": 0, "updated_at": now, "version": 1,
+    }
+    return tuple(row[c] for c in COLUMNS["agents"])
+
+def _review(rec: dict, now: datetime) -> tuple:
+    reviewer, target = _str(rec, "reviewer_id"), _str(rec, "target_id")
+    if reviewer == target: raise RowError("self review")
+    score = _num(rec, "score", int, None)
+    if score is None: raise RowError("score missing")
+    return reviewer, target, score, _str(rec, "comment", False), _time(rec, "created_at", now)
+
+def _verification(rec: dict, now: datetime) -> tuple:
+    platform = _str(rec, "platform")
+    if platform not in PLATFORM_BOOSTS: raise RowError(f"unknown platform {platform}")
+    verified_at = _time(rec, "verified_at", now)
+    return (_str(rec, "agent_id"), platform, _str(rec, "proof_url"), True, verified_at, "verified", 1, _time(rec, "created_at", verified_at))
+
+PARSERS = {"agents": _agent, "reviews": _review, "verifications": _verification}
+
+def prepare(kind: str, items: list, first_line: int) -> tuple[list[tuple], list[int], list[dict]]:
+    """Worker side: raw JSONL lines or CSV dicts -> (records in COLUMNS order, their line numbers, rejects)."""
+    parse, now = PARSERS[kind], datetime.utcnow()
+    records, lines, rejects = [], [], []
+    for n, item in enumerate(items, first_line):
+        try:
+            if isinstance(item, str):
+                try: item = json.loads(item)
+                except ValueError: raise RowError("invalid JSON")
+                if not isinstance(item, dict): raise RowError("not an object")
+            records.append(parse(item, now))
+            lines.append(n)
+        except RowError as e:
+            rejects.append({"line": n, "error": str(e)})
+    return records, lines, rejects
+
+def read_batches(path: str, batch_size: int) -> Iterator[tuple[list, int]]:
+    """(items, line number of the first item); JSONL lines or CSV rows as dicts."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            reader = csv.DictReader(f)
+            rows = ((reader.line_num, row) for row in reader)
+        else:
+            rows = ((n, line) for n, line in enumerate(f, 1) if line.strip())
+        batch, first = [], None
+        for n, item in rows:
+            if first is None: first = n
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch, first
+                batch, first = [], None
+        if batch: yield batch, first
+
+# --- Writers ---
+async def check_batch(db, kind: str, records: list[tuple], lines: list[int], chunk_size: int = 5000) -> tuple[list[tuple], list[dict]]:
+    """Reject rows naming agents that don't exist, and drop rows already imported (by KEYS) or repeated in the batch."""
+    if kind not in KEYS or not records: return records, []
+    columns, table = COLUMNS[kind], TABLES[kind]
+    refs, key_at = [columns.index(c) for c in REFS[kind]], [columns.index(c) for c in KEYS[kind]]
+    ids = list({r[i] for r in records for i in refs})
+    keys = [tuple(r[i] for i in key_at) for r in records]
+    known, existing = set(), set()
+    for lo in range(0, len(ids), chunk_size):
+        known.update((await db.execute(select(Agent.id).where(Agent.id.in_(ids[lo:lo + chunk_size])))).scalars())
+    key_columns = [table.c[c] for c in KEYS[kind]]
+    for lo in range(0, len(keys), chunk_size):
+        existing.update(tuple(row) for row in (await db.execute(select(*key_columns).where(tuple_(*key_columns).in_(keys[lo:lo + chunk_size])))).all())
+    kept, rejects = [], []
+    for record, line, key in zip(records, lines, keys):
+        unknown = next((record[i] for i in refs if record[i] not in known), None)
+        if unknown is not None: rejects.append({"line": line, "error": f"unknown agent {unknown}"})
+        elif key not in existing:
+            existing.add(key)
+            kept.append(record)
+    return kept, rejects
+
+async def _copy(db, kind: str, records: list[tuple]) -> int:
+    raw = (await (await db.connection()).get_raw_connection()).driver_connection
+    table, columns = TABLES[kind].name, COLUMNS[kind]
+    if kind != "agents":
+        await raw.copy_records_to_table(table, records=records, columns=columns)
+        return len(records)
+    # COPY can't skip duplicates; stage the batch and insert what's new
+    await db.execute(text("CREATE TEMP TABLE IF NOT EXISTS import_agents (LIKE agents INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"))
+    await raw.copy_records_to_table("import_agents", records=records, columns=columns)
+    cols = ", ".join(columns)
+    res = await db.execute(text(f"INSERT INTO agents ({cols}) SELECT {cols} FROM import_agents ON CONFLICT (id) DO NOTHING"))
+    return res.rowcount
+
+async def _executemany(db, kind: str, records: list[tuple]) -> int:
+    table, columns = TABLES[kind], COLUMNS[kind]
+    stmt = insert(table)
+    if kind == "agents" and db.bind.dialect.name == "sqlite": stmt = sqlite.insert(table).on_conflict_do_nothing(index_elements=["id"])
+    res = await db.execute(stmt, [dict(zip(columns, r)) for r in records])
+    return res.rowcount if res.rowcount is not None and res.rowcount >= 0 else len(records)
+
+async def write_batch(db, kind: str, records: list[tuple]) -> int:
+    if not records: return 0
+    writer = _copy if db.bind.dialect.name == "postgresql" and db.bind.dialect.driver == "asyncpg" else _executemany
+    written = await writer(db, kind, records)
+    await db.commit()
+    return written
+
+# --- Pipeline ---
+async def import_file(session_factory, kind: str, path: str, batch_size: int = 5000, executor: Optional[ProcessPoolExecutor] = None,
+                      inflight: int = 4, rejects: Optional[Callable[[dict], None]] = None,
+                      progress: Optional[Callable[[str, int], None]] = None) -> dict:
+    """Stream one file into ``kind``'s table; returns counts and rows/sec."""
+    if kind not in KINDS: raise ValueError(f"Unknown import kind: {kind}")
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    stats = {"kind": kind, "file": path, "read": 0, "written": 0, "rejected": 0}
+    queue: deque = deque()
+
+    async def drain():
+        records, lines, bad = await queue.popleft()
+        async with session_factory() as db:
+            records, unknown = await check_batch(db, kind, records, lines)
+            stats["written"] += await write_batch(db, kind, records)
+        bad += unknown
+        stats["rejected"] += len(bad)
+        if rejects:
+            for r in bad: rejects({"kind": kind, "file": path, **r})
+        if progress: progress(kind, stats["read"])
+
+    for items, first in read_batches(path, batch_size):
+        stats["read"] += len(items)
+        if executor is None:
+            fut = loop.create_future()
+            fut.set_result(prepare(kind, items, first))
+        else:
+            fut = loop.run_in_executor(executor, prepare, kind, items, first)
+        queue.append(fut)
+        if len(queue) >= inflight: await drain()
+    while queue: await drain()
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_second"] = stats["read"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+async def run_import(session_factory, sources: dict, batch_size: int = 5000, workers: Optional[int] = None,
+                     rescore_after: bool = True, rejects: Optional[Callable[[dict], None]] = None,
+                     progress: Optional[Callable[[str, int], None]] = None) -> dict:
+    """Import ``{kind: [paths]}`` in load order, then rescore and index; ``workers=0`` validates inline."""
+    workers = os.cpu_count() if workers is None else workers
+    started = datetime.utcnow() # imported agents get updated_at after this
+    executor = ProcessPoolExecutor(workers) if workers > 0 else None
+    start = time.perf_counter()
+    report = {"files": []}
+    try:
+        for kind in KINDS:
+            for path in sources.get(kind, []):
+                report["files"].append(await import_file(session_factory, kind, path, batch_size, executor,
+                                                         inflight=2 * max(workers, 1), rejects=rejects, progress=progress))
+    finally:
+        if executor: executor.shutdown()
+    if rescore_after and sources.get("agents"): report["rescore"] = await rescore(session_factory)
+    if sources.get("agents"): report["search_index"] = await reindex(session_factory, updated_since=started)
+    report["seconds"] = time.perf_counter() - start
+    rows = sum(f["read"] for f in report["files"])
+    report["rows_per_second"] = rows / report["seconds"] if report["seconds"] else 0.0
+    return report
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Bulk-load agents, verifications and reviews from JSONL or CSV files")
+    for kind in KINDS: parser.add_argument(f"--{kind}", nargs="*", default=[], metavar="FILE")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None, help="validation processes (0 = inline)")
+    parser.add_argument("--rejects", default=None, help="write rejected rows to this JSONL file")
+    parser.add_argument("--no-rescore", action="store_true")
+    args = parser.parse_args()
+
+    from database import AsyncSessionLocal, engine
+    rejects_file = open(args.rejects, "w") if args.rejects else None
+    def reject(r):
+        if rejects_file: rejects_file.write(json.dumps(r) + "\n")
+    def report(kind, read):
+        print(f"\r{kind}: {read} rows", end="", flush=True)
+    try:
+        summary = await run_import(AsyncSessionLocal, {k: getattr(args, k) for k in KINDS}, args.batch_size, args.workers,
+                                   not args.no_rescore, reject, report)
+    finally:
+        await engine.dispose()
+        if rejects_file: rejects_file.close()
+    print()
+    for f in summary["files"]:
+        print(f"{f['file']} ({f['kind']}): {f['written']} written, {f['rejected']} rejected, {f['rows_per_second']:.0f} rows/s")
+    if "rescore" in summary: print(f"rescored {summary['rescore']['rescored']} agents in {summary['rescore']['seconds']:.2f}s")
+    if "search_index" in summary: print(f"indexed {summary['search_index']['indexed']} agents for search in {summary['search_index']['seconds']:.2f}s")
+    print(f"total {summary['seconds']:.2f}s ({summary['rows_per_second']:.0f} rows/s)")
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,366 @@
+"""Index AgentVault staking events into staked_amount.
+
+    uv run chain_indexer.py --rpc-url http://localhost:8545 --vault 0xVault... [--from-block N] [--once]
+
+Reads Staked / UnstakeRequested / Withdrawn / Slashed logs with eth_getLogs
+in block ranges, several ranges in flight at once, and applies each group of
+ranges in one transaction: the decoded events go into stake_events, every
+touched agent's staked_amount (and trust_score) moves by the summed deltas
+in one executemany UPDATE, and the checkpoint advances to the last block
+with its hash. A crash therefore never applies a range twice.
+
+Indexing stops `confirmations` blocks behind the head, and a group is only
+applied if the block below it and its last block still have the hashes seen
+before eth_getLogs. Every pass first compares the checkpoint's hash with the
+chain. On a mismatch (a reorg) it walks back over the block hashes recorded
+with the stake events until one is still on the chain: the events above it
+are deleted and their deltas reversed, and the blocks are indexed again from
+the new chain. Ranges that the node refuses as too large are split in half
+until they fit.
+
+The vault indexes agentId as keccak256(agentId), so logs are matched to
+agents through a hash of every registered id, kept up to date from
+Agent.updated_at. Events for ids that are not registered yet are stored with
+agent_id NULL and change no balance until the agent shows up; then they are
+attached and applied.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import bindparam, delete, func, insert, tuple_, update
+from sqlalchemy.future import select
+from models import Agent, StakeEvent, IndexerCheckpoint, trust_score_sql, SCORE_VERSION
+from leaderboard import leaderboard
+import argparse
+import asyncio
+import httpx
+import logging
+import os
+import time
+
+try:
+    from Crypto.Hash import keccak as _keccak
+except ImportError: # optional: pip install 'agentkred[chain]' (pycryptodome)
+    _keccak = None
+
+log = logging.getLogger("agentkred.chain_indexer")
+
+# --- Keccak-256 ---
+# Ethereum's hash (original Keccak padding, not hashlib's SHA3-256).
+def _require_keccak():
+    if _keccak is None: raise RuntimeError("chain_indexer needs pycryptodome (pip install 'agentkred[chain]')")
+
+def keccak256(data: bytes) -> bytes:
+    _require_keccak()
+    return _keccak.new(digest_bits=256, data=data).digest()
+
+def topic(data: str) -> str:
+    return "0x" + keccak256(data.encode()).hex()
+
+# --- AgentVault Events ---
+# topic0 -> (kind, sign of the staked_amount change)
+EVENTS = {
+    "0xe704d6dc8a9b67b1c77083755dbee778ab04711df13ef26fef8670b80467f9bc": ("staked", 1), # Staked(string,address,uint256)
+    "0x875685d6a55270c1c511593af3b6835adc38e1ec32a38ecee87c43bc7cbbf567": ("unstake_requested", -1), # UnstakeRequested(string,uint256,uint256)
+    # Withdrawn(string,uint256): already left the balance at UnstakeRequested
+    "0x62749ff237dcf6c0dbdc9a51757aae856cf998baab12f1059bd536a28e355f3d": ("withdrawn", 0),
+    "0x534c7fed2cfabeaac2888b72e03917f6a790db94e83550a33e12e6b7fa62e9e6": ("slashed", -1), # Slashed(string,uint256,string)
+}
+
+def decode_logs(logs: list[dict], agents: dict[str, str], decimals: int) -> list[dict]:
+    """eth_getLogs entries -> stake_events rows."""
+    scale = Decimal(10) ** decimals
+    rows = []
+    for entry in logs:
+        event = EVENTS.get(entry["topics"][0])
+        if event is None: continue
+        kind, sign = event
+        data = bytes.fromhex(entry["data"][2:])
+        amount = int.from_bytes(data[0:32], "big")
+        release_time = reason = None
+        if kind == "unstake_requested": release_time = int.from_bytes(data[32:64], "big")
+        elif kind == "slashed":
+            start = int.from_bytes(data[32:64], "big")
+            length = int.from_bytes(data[start:start + 32], "big")
+            reason = data[start + 32:start + 32 + length].decode("utf-8", errors="replace")
+        agent_topic = entry["topics"][1]
+        rows.append({
+            "block_number": int(entry["blockNumber"], 16), "block_hash": entry["blockHash"], "tx_hash": entry["transactionHash"],
+            "log_index": int(entry["logIndex"], 16), "kind": kind, "agent_topic": agent_topic, "agent_id": agents.get(agent_topic),
+            "amount": str(amount), "delta": float(sign * Decimal(amount) / scale), "release_time": release_time, "reason": reason,
+        })
+    return rows
+
+# --- JSON-RPC ---
+class RpcError(Exception):
+    def __init__(self, error: dict):
+        super().__init__(f"{error.get('code')}: {error.get('message')}")
+        self.code = error.get("code")
+        self.message = str(error.get("message", ""))
+
+# Node messages for an eth_getLogs range with too many results (geth, erigon, alchemy, infura, ...)
+TOO_MANY = ("more than", "too many", "limit exceeded", "response size", "range is too large", "block range", "-32005")
+
+class JsonRpc:
+    def __init__(self, url: str, timeout: float = 30.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._client = httpx.AsyncClient(timeout=timeout, transport=transport,
+                                         limits=httpx.Limits(max_connections=16, max_keepalive_connections=16))
+        self.url = url
+        self._id = 0
+        self.calls = 0
+
+    async def call(self, method: str, *params):
+        self._id += 1
+        self.calls += 1
+        resp = await self._client.post(self.url, json={"jsonrpc": "2.0", "id": self._id, "method": method, "params": list(params)})
+        resp.raise_for_status()
+        body = resp.json()
+        if body.get("error"): raise RpcError(body["error"])
+        return body["result"]
+
+    async def block_number(self) -> int:
+        return int(await self.call("eth_blockNumber"), 16)
+
+    async def block_hash(self, number: int) -> Optional[str]:
+        block = await self.call("eth_getBlockByNumber", hex(number), False)
+        return block["hash"] if block else None
+
+    async def aclose(self):
+        await self._client.aclose()
+
+# --- Indexer ---
+class ChainIndexer:
+    def __init__(self, session_factory, rpc: JsonRpc, vault: str, start_block: int = 0, confirmations: int = 12,
+                 block_range: int = 2000, concurrency: int = 4, decimals: int = 6, name: str = "agent_vault"):
+        _require_keccak()
+        self.session_factory = session_factory
+        self.rpc = rpc
+        self.vault = vault.lower()
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.block_range = block_range
+        self.concurrency = concurrency
+        self.decimals = decimals
+        self.name = name
+        self.agents: dict[str, str] = {} # keccak256(agent id) -> agent id
+        self._agents_after: tuple = (datetime.min, "")
+        self.head = 0
+        self.applied_block = start_block - 1
+        self.events = 0
+        self.unmatched = 0
+        self.reorgs = 0
+        self.rolled_back_events = 0
+        self.splits = 0
+
+    # --- State ---
+    async def sync_agents(self, db, chunk_size: int = 50_000) -> int:
+        """Hash agent ids registered (or updated) since the last call."""
+        added = 0
+        while True:
+            rows = (await db.execute(
+                select(Agent.updated_at, Agent.id).where(tuple_(Agent.updated_at, Agent.id) > tuple_(*self._agents_after))
+                .order_by(Agent.updated_at, Agent.id).limit(chunk_size)
+            )).all()
+            ids = [agent_id for _, agent_id in rows]
+            new = {topic(agent_id): agent_id for agent_id in ids}
+            self.agents.update(new)
+            if new: await self._claim_unmatched(db, new)
+            added += len(rows)
+            if rows: self._agents_after = tuple(rows[-1])
+            if len(rows) < chunk_size: return added
+
+    async def _claim_unmatched(self, db, new: dict[str, str]):
+        """Attach events stored before their agent was hashed, and apply their deltas, in one transaction."""
+        pending = (await db.execute(
+            select(StakeEvent.agent_topic, func.sum(StakeEvent.delta), func.count()).where(StakeEvent.agent_id.is_(None))
+            .group_by(StakeEvent.agent_topic)
+        )).all()
+        claimed = [(agent_topic, total, n) for agent_topic, total, n in pending if agent_topic in new]
+        if not claimed: return
+        t = StakeEvent.__table__
+        await db.execute(update(t).where(t.c.agent_topic == bindparam("_topic"), t.c.agent_id.is_(None)).values(agent_id=bindparam("_id")),
+                         [{"_topic": agent_topic, "_id": new[agent_topic]} for agent_topic, _, _ in claimed])
+        changed = await self._move_stakes(db, {new[agent_topic]: total for agent_topic, total, _ in claimed})
+        await db.commit()
+        self.unmatched = max(0, self.unmatched - sum(n for _, _, n in claimed))
+        await self._refresh_leaderboard(db, changed)
+
+    async def checkpoint(self, db) -> Optional[IndexerCheckpoint]:
+        return await db.get(IndexerCheckpoint, self.name)
+
+    async def _set_checkpoint(self, db, block_number: int, block_hash: str):
+        cp = await self.checkpoint(db)
+        if cp is None: db.add(IndexerCheckpoint(name=self.name, block_number=block_number, block_hash=block_hash))
+        else: cp.block_number, cp.block_hash = block_number, block_hash
+        self.applied_block = block_number
+
+    async def _move_stakes(self, db, deltas: dict[str, float]) -> list[str]:
+        """staked_amount += delta for many agents in one executemany UPDATE."""
+        deltas = {a: d for a, d in deltas.items() if a is not None and d}
+        if not deltas: return []
+        t = Agent.__table__
+        staked = t.c.staked_amount + bindparam("_delta")
+        stmt = update(t).where(t.c.id == bindparam("_id")).values(
+            staked_amount=staked, trust_score=trust_score_sql(t.c.verification_score, t.c.review_score, t.c.moltbook_karma, staked),
+            score_version=SCORE_VERSION, # updated_at moves too, which is how trust_graph.sync and the leaderboard see it
+        )
+        await db.execute(stmt, [{"_id": a, "_delta": d} for a, d in deltas.items()])
+        return list(deltas)
+
+    # --- Reorgs ---
+    async def _fork_point(self, db, below: int, page: int = 100) -> tuple[int, str]:
+        """Highest (block, hash) recorded with a stake event under ``below`` that is still on the chain."""
+        while True:
+            anchors = (await db.execute(
+                select(StakeEvent.block_number, StakeEvent.block_hash).where(StakeEvent.block_number < below).distinct()
+                .order_by(StakeEvent.block_number.desc()).limit(page)
+            )).all()
+            for number, block_hash in anchors:
+                if await self.rpc.block_hash(number) == block_hash: return number, block_hash
+            if len(anchors) < page: return self.start_block - 1, ""
+            below = anchors[-1][0]
+
+    async def rollback_reorg(self, db) -> int:
+        """Roll back to the last recorded block still on the chain if the checkpoint's is not; returns blocks undone."""
+        cp = await self.checkpoint(db)
+        if cp is None or cp.block_number < self.start_block: return 0
+        if await self.rpc.block_hash(cp.block_number) == cp.block_hash: return 0
+        target, target_hash = await self._fork_point(db, cp.block_number)
+        log.warning("reorg below block %d, rolling back to %d", cp.block_number, target)
+        undo = (await db.execute(
+            select(StakeEvent.agent_id, func.sum(StakeEvent.delta)).where(StakeEvent.block_number > target).group_by(StakeEvent.agent_id)
+        )).all()
+        changed = await self._move_stakes(db, {agent_id: -total for agent_id, total in undo})
+        result = await db.execute(delete(StakeEvent).where(StakeEvent.block_number > target))
+        self.rolled_back_events += result.rowcount or 0
+        await self._set_checkpoint(db, target, target_hash)
+        await db.commit()
+        await self._refresh_leaderboard(db, changed)
+        self.reorgs += 1
+        return cp.block_number - target
+
+    # --- Fetching ---
+    async def fetch_logs(self, lo: int, hi: int) -> list[dict]:
+        """eth_getLogs for [lo, hi], halving the range while the node says it is too large."""
+        try:
+            return await self.rpc.call("eth_getLogs", {"fromBlock": hex(lo), "toBlock": hex(hi), "address": self.vault, "topics": [list(EVENTS)]})
+        except RpcError as e:
+            if lo == hi or not any(s in f"{e.code} {e.message}".lower() for s in TOO_MANY): raise
+        self.splits += 1
+        mid = (lo + hi) // 2
+        return await self.fetch_logs(lo, mid) + await self.fetch_logs(mid + 1, hi)
+
+    async def _unchanged(self, parent: int, parent_hash: Optional[str], hi: int, hi_hash: str, logs: list[dict]) -> bool:
+        """After eth_getLogs: the block below the range and its last block are still the ones seen before."""
+        if await self.rpc.block_hash(hi) != hi_hash: return False
+        if parent_hash is not None and await self.rpc.block_hash(parent) != parent_hash: return False
+        return all(entry["blockHash"] == hi_hash for entry in logs if int(entry["blockNumber"], 16) == hi)
+
+    async def apply(self, db, hi: int, hi_hash: str, logs: list[dict]) -> list[str]:
+        """One transaction: events, staked_amount deltas, checkpoint at ``hi``."""
+        rows = decode_logs(logs, self.agents, self.decimals)
+        if rows: await db.execute(insert(StakeEvent), rows)
+        deltas: dict[str, float] = {}
+        for r in rows:
+            if r["agent_id"] is None: self.unmatched += 1
+            else: deltas[r["agent_id"]] = deltas.get(r["agent_id"], 0.0) + r["delta"]
+        changed = await self._move_stakes(db, deltas)
+        await self._set_checkpoint(db, hi, hi_hash)
+        await db.commit()
+        self.events += len(rows)
+        return changed
+
+    async def _refresh_leaderboard(self, db, agent_ids: list[str], chunk_size: int = 10_000):
+        # Only when running inside the API process; otherwise the API's leaderboard sync picks it up
+        if not leaderboard.ready or not agent_ids: return
+        for lo in range(0, len(agent_ids), chunk_size):
+            leaderboard.upsert(*(await db.execute(select(Agent).where(Agent.id.in_(agent_ids[lo:lo + chunk_size])))).scalars())
+
+    async def poll(self, max_blocks: Optional[int] = None) -> dict:
+        """Catch up to ``confirmations`` blocks behind the head (or ``max_blocks`` past the checkpoint)."""
+        started = time.perf_counter()
+        events_before = self.events
+        async with self.session_factory() as db:
+            await self.sync_agents(db)
+            await self.rollback_reorg(db)
+            cp = await self.checkpoint(db)
+            self.applied_block = applied_before = next_block = (cp.block_number if cp else self.start_block - 1)
+            parent_hash = cp.block_hash if cp and cp.block_number >= self.start_block else None
+            self.head = await self.rpc.block_number()
+            end = self.head - self.confirmations
+            if max_blocks is not None: end = min(end, next_block + max_blocks)
+            while next_block < end:
+                # Several ranges in flight; applied in order, one transaction per range group
+                ranges = []
+                lo = next_block + 1
+                while lo <= end and len(ranges) < self.concurrency:
+                    ranges.append((lo, min(end, lo + self.block_range - 1)))
+                    lo = ranges[-1][1] + 1
+                hi = ranges[-1][1]
+                hi_hash = await self.rpc.block_hash(hi)
+                results = await asyncio.gather(*(self.fetch_logs(a, b) for a, b in ranges))
+                logs = [entry for result in results for entry in result]
+                if not await self._unchanged(next_block, parent_hash, hi, hi_hash, logs):
+                    # Reorged while fetching: the next pass rolls back (if needed) and fetches again
+                    log.warning("chain changed while fetching blocks %d-%d", next_block + 1, hi)
+                    break
+                changed = await self.apply(db, hi, hi_hash, logs)
+                await self._refresh_leaderboard(db, changed)
+                next_block, parent_hash = hi, hi_hash
+        return {"head": self.head, "applied_block": self.applied_block, "blocks": self.applied_block - applied_before,
+                "events": self.events - events_before, "seconds": round(time.perf_counter() - started, 3)}
+
+    def stats(self) -> dict:
+        return {"head": self.head, "applied_block": self.applied_block, "lag_blocks": max(0, self.head - self.applied_block),
+                "events": self.events, "unmatched_events": self.unmatched, "reorgs": self.reorgs,
+                "rolled_back_events": self.rolled_back_events, "range_splits": self.splits, "rpc_calls": self.rpc.calls,
+                "agents_hashed": len(self.agents)}
+
+CHAIN_INDEXER = os.getenv("CHAIN_INDEXER", "off") # inprocess | off
+CHAIN_POLL_SECONDS = float(os.getenv("CHAIN_POLL_SECONDS", "12"))
+# "chain": staked_amount only comes from AgentVault events and POST /stake is refused
+STAKE_SOURCE = os.getenv("STAKE_SOURCE", "client")
+
+def build_indexer(session_factory) -> ChainIndexer:
+    return ChainIndexer(
+        session_factory, JsonRpc(os.getenv("CHAIN_RPC_URL", "http://localhost:8545")), os.getenv("AGENT_VAULT_ADDRESS", ""),
+        start_block=int(os.getenv("CHAIN_START_BLOCK", "0")), confirmations=int(os.getenv("CHAIN_CONFIRMATIONS", "12")),
+        block_range=int(os.getenv("CHAIN_BLOCK_RANGE", "2000")), concurrency=int(os.getenv("CHAIN_RANGE_CONCURRENCY", "4")),
+        decimals=int(os.getenv("STAKE_TOKEN_DECIMALS", "6")),
+    )
+
+async def run_chain_indexer(indexer: ChainIndexer, interval: float = CHAIN_POLL_SECONDS):
+    while True:
+        try:
+            stats = await indexer.poll()
+            if stats["blocks"]: log.info("chain indexer: %s", stats)
+        except Exception:
+            log.exception("chain indexer poll failed")
+        await asyncio.sleep(interval)
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Index AgentVault staking events into staked_amount")
+    parser.add_argument("--rpc-url", default=os.getenv("CHAIN_RPC_URL", "http://localhost:8545"))
+    parser.add_argument("--vault", default=os.getenv("AGENT_VAULT_ADDRESS"), required=not os.getenv("AGENT_VAULT_ADDRESS"))
+    parser.add_argument("--from-block", type=int, default=int(os.getenv("CHAIN_START_BLOCK", "0")), help="first block, if there is no checkpoint yet")
+    parser.add_argument("--confirmations", type=int, default=int(os.getenv("CHAIN_CONFIRMATIONS", "12")), help="blocks behind the head left unindexed")
+    parser.add_argument("--block-range", type=int, default=int(os.getenv("CHAIN_BLOCK_RANGE", "2000")))
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("CHAIN_RANGE_CONCURRENCY", "4")), help="eth_getLogs ranges in flight")
+    parser.add_argument("--decimals", type=int, default=int(os.getenv("STAKE_TOKEN_DECIMALS", "6")))
+    parser.add_argument("--interval", type=float, default=CHAIN_POLL_SECONDS)
+    parser.add_argument("--once", action="store_true", help="catch up to the head and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from database import AsyncSessionLocal, engine
+    rpc = JsonRpc(args.rpc_url)
+    indexer = ChainIndexer(AsyncSessionLocal, rpc, args.vault, args.from_block, args.confirmations, args.block_range, args.concurrency, args.decimals)
+    try:
+        if args.once: print(await indexer.poll(), indexer.stats())
+        else: await run_chain_indexer(indexer, args.interval)
+    finally:
+        await rpc.aclose()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import AsyncIterator
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import json
+import os
+import zlib
+
+# --- NDJSON Export ---
+# Full-table dumps as one JSON object per line, read through a server-side
+# cursor (yield_per) and written out a partition at a time, so the API
+# process holds EXPORT_BATCH_ROWS rows however large the table is. Clients
+# sending Accept-Encoding: gzip get the stream compressed on the fly.
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+
+def _default(value):
+    if isinstance(value, datetime): return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+async def ndjson_lines(db: AsyncSession, query, compress: bool = False) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None # wbits 31: gzip container
+    result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_ROWS))
+    async for rows in result.mappings().partitions():
+        chunk = "".join(json.dumps(dict(row), default=_default, separators=(",", ":")) + "\n" for row in rows).encode()
+        if compressor: chunk = compressor.compress(chunk)
+        if chunk: yield chunk
+    if compressor: yield compressor.flush()
+
+def ndjson_response(request: Request, db: AsyncSession, query) -> StreamingResponse:
+    compress = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {"Vary": "Accept-Encoding"}
+    if compress: headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(ndjson_lines(db, query, compress), media_type="application/x-ndjson", headers=headers)
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import event
+from nacl.signing import VerifyKey
+from nacl.encoding import HexEncoder
+from models import Agent
+import os
+import time
+
+# --- Public Key Cache ---
+# Maps agent ID -> decoded VerifyKey so signed requests can skip the Agent
+# lookup in verify_request_signature. Bounded by size (LRU) and age (TTL).
+
+class KeyCache:
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[VerifyKey, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, agent_id: str) -> Optional[VerifyKey]:
+        entry = self._entries.get(agent_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        key, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[agent_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(agent_id)
+        self.hits += 1
+        return key
+
+    def put(self, agent_id: str, public_key_hex: str) -> VerifyKey:
+        key = VerifyKey(public_key_hex, encoder=HexEncoder)
+        if self.maxsize <= 0: return key
+        self._entries[agent_id] = (key, time.monotonic() + self.ttl)
+        self._entries.move_to_end(agent_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return key
+
+    def invalidate(self, agent_id: str):
+        self._entries.pop(agent_id, None)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries), "maxsize": self.maxsize, "ttl": self.ttl,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+key_cache = KeyCache(
+    maxsize=int(os.getenv("KEY_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("KEY_CACHE_TTL", "300")),
+)
+
+# Any ORM write to Agent.public_key drops the cached key for that agent.
+@event.listens_for(Agent.public_key, "set")
+def _invalidate_on_key_change(target, value, oldvalue, initiator):
+    if target.id is not None: key_cache.invalidate(target.id)
@@ -0,0 +1,165 @@
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Agent
+import asyncio
+import logging
+import os
+import time
+
+# --- Leaderboard Index ---
+# One sorted list of (value, agent_id) per sort key, plus a snapshot of each
+# agent's row. Built from the DB at startup and patched by the write routes,
+# so /agents/top and rank lookups never touch the database. Lookups are
+# O(log n) bisects; an update is a bisect plus a C-level list memmove.
+#
+# The index is per process. Rows written elsewhere (other uvicorn workers,
+# rescore.py, bulk_import.py, the chain indexer CLI) are picked up every
+# LEADERBOARD_SYNC_SECONDS by sync(): agents whose updated_at moved since the
+# last pass (less a small overlap for transactions that committed late) and
+# whose version is newer than the snapshot's are re-read; past
+# RELOAD_OVER of them the whole index is rebuilt instead.
+# LEADERBOARD_REFRESH_SECONDS additionally rebuilds it on a fixed interval.
+#
+# (generation, version) identifies the index contents for ETags: every load
+# starts a new random generation, every change bumps the version.
+#
+# top_json() keeps each agent's rendered JSON (``render``, set by the app)
+# until the agent changes, so a page is a join of cached byte strings.
+
+SORT_KEYS = {
+    "trust_score": "trust_score",
+    "staked_amount": "staked_amount",
+    "review_score": "review_score",
+    "active": "last_active_at",
+}
+
+_FLOOR = {"last_active_at": datetime.min}
+log = logging.getLogger("agentkred.leaderboard")
+
+RELOAD_OVER = 50_000 # changed agents past which sync() rebuilds instead of patching
+
+def _sort_value(row: dict, column: str):
+    value = row.get(column)
+    return _FLOOR.get(column, float("-inf")) if value is None else value
+
+class Leaderboard:
+    def __init__(self, render: Optional[Callable[[dict], bytes]] = None):
+        self.ready = False
+        self.generation = os.urandom(6).hex()
+        self.version = 0
+        self.render = render
+        self._rows: dict[str, dict] = {}
+        self._json: dict[str, bytes] = {}
+        self._index: dict[str, list] = {col: [] for col in SORT_KEYS.values()}
+        self._synced_at = datetime.min
+
+    async def load(self, db: AsyncSession):
+        started = datetime.utcnow()
+        rows = {}
+        for agent in (await db.execute(select(Agent))).scalars():
+            rows[agent.id] = self._snapshot(agent)
+        self._rows = rows
+        self._index = {col: sorted((_sort_value(r, col), r["id"]) for r in rows.values()) for col in SORT_KEYS.values()}
+        self.generation, self.version = os.urandom(6).hex(), 0
+        self._json = {}
+        self._synced_at = started
+        self.ready = True
+
+    async def sync(self, db: AsyncSession, overlap: float = 5.0, chunk_size: int = 10_000) -> int:
+        """Apply agents changed by other processes since the last load or sync; returns how many."""
+        if not self.ready: return 0
+        started = datetime.utcnow()
+        seen = (await db.execute(select(Agent.id, Agent.version).where(Agent.updated_at > self._synced_at - timedelta(seconds=overlap)))).all()
+        changed = [agent_id for agent_id, version in seen if agent_id not in self._rows or (self._rows[agent_id]["version"] or 0) < version]
+        if len(changed) > RELOAD_OVER:
+            await self.load(db)
+            return len(changed)
+        for lo in range(0, len(changed), chunk_size):
+            self.upsert(*(await db.execute(select(Agent).where(Agent.id.in_(changed[lo:lo + chunk_size])))).scalars())
+        self._synced_at = started
+        return len(changed)
+
+    def reset(self):
+        self.__init__(self.render)
+
+    @staticmethod
+    def _snapshot(agent: Agent) -> dict:
+        return {c.name: getattr(agent, c.name) for c in Agent.__table__.columns}
+
+    def upsert(self, *agents: Agent):
+        """Apply the committed state of ``agents`` to every sort order."""
+        if not self.ready or not agents: return
+        self.version += 1
+        for agent in agents:
+            new = self._snapshot(agent)
+            old = self._rows.get(agent.id)
+            for col, entries in self._index.items():
+                if old is not None:
+                    old_key = (_sort_value(old, col), agent.id)
+                    new_key = (_sort_value(new, col), agent.id)
+                    if old_key == new_key: continue
+                    del entries[bisect_left(entries, old_key)]
+                insort(entries, (_sort_value(new, col), agent.id))
+            self._rows[agent.id] = new
+            self._json.pop(agent.id, None)
+
+    def patch(self, column: str, values: dict):
+        """Set a column that isn't a sort key (e.g. graph_score) on the row snapshots."""
+        if values: self.version += 1
+        for agent_id, value in values.items():
+            row = self._rows.get(agent_id)
+            if row is not None: row[column] = value
+            self._json.pop(agent_id, None)
+
+    def top(self, sort_by: str = "trust_score", limit: int = 50, after: Optional[tuple] = None) -> list[dict]:
+        """Rows in descending order; ``after`` is a (value, id) keyset cursor."""
+        entries = self._index[SORT_KEYS.get(sort_by, "trust_score")]
+        end = len(entries) if after is None else bisect_left(entries, after)
+        if limit <= 0: return []
+        return [self._rows[agent_id] for _, agent_id in reversed(entries[max(0, end - limit):end])]
+
+    def top_json(self, sort_by: str = "trust_score", limit: int = 50, after: Optional[tuple] = None) -> tuple[bytes, list[dict]]:
+        """top() rendered as a JSON array, plus the rows."""
+        rows = self.top(sort_by, limit, after)
+        parts = []
+        for row in rows:
+            part = self._json.get(row["id"])
+            if part is None: part = self._json[row["id"]] = self.render(row)
+            parts.append(part)
+        return b"[" + b",".join(parts) + b"]", rows
+
+    def rank(self, agent_id: str, sort_by: str = "trust_score") -> Optional[int]:
+        """1-based position of ``agent_id`` in descending order, or None if unknown."""
+        row = self._rows.get(agent_id)
+        if row is None: return None
+        col = SORT_KEYS.get(sort_by, "trust_score")
+        entries = self._index[col]
+        return len(entries) - bisect_left(entries, (_sort_value(row, col), agent_id))
+
+    def __len__(self):
+        return len(self._rows)
+
+leaderboard = Leaderboard()
+
+LEADERBOARD_INDEX = os.getenv("LEADERBOARD_INDEX", "1") == "1"
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "0"))
+LEADERBOARD_SYNC_SECONDS = float(os.getenv("LEADERBOARD_SYNC_SECONDS", "5"))
+
+async def run_leaderboard_sync(session_factory, board: Leaderboard = leaderboard, interval: float = LEADERBOARD_SYNC_SECONDS,
+                               refresh_every: float = LEADERBOARD_REFRESH_SECONDS):
+    """sync() every ``interval`` seconds, and a full load every ``refresh_every`` (0: never)."""
+    last_load = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        full = refresh_every > 0 and time.monotonic() - last_load >= refresh_every
+        try:
+            async with session_factory() as db:
+                if full: await board.load(db)
+                else: changed = await board.sync(db)
+            if full: last_load = time.monotonic()
+            elif changed: log.info("leaderboard: %d agents changed elsewhere", changed)
+        except Exception:
+            log.exception("leaderboard sync failed")
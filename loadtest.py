@@ -0,0 +1,235 @@
+"""Load generator for the signed AgentKred API flows.
+
+    uv run loadtest.py --agents 2000 --requests 50000 --concurrency 200 --report load.json
+    uv run loadtest.py --url http://localhost:8004 --proof-stub-port 8765 --duration 60
+
+Simulated agents have real Ed25519 keys and sign every write. They are
+registered first, then workers draw operations from --mix (relative
+weights) until --requests or --duration is reached:
+
+  register  a new agent joins         update   POST /agent/update
+  verify    POST /verify (github)     review   POST /review of a random agent
+  stake     POST /stake               top      GET /agents/top
+  profile   GET /agent/{id}
+
+Without --url the app runs in this process through ASGITransport, with its
+lifespan, on a scratch SQLite file (or DATABASE_URL). Proof checks are
+answered by a stub transport; against a URL, --proof-stub-port serves proofs
+on 127.0.0.1 so the server can verify them without GitHub. The report gives
+throughput and p50/p95/p99 latency per endpoint, meant to be diffed between
+releases. Signing runs in the same process as the load, so in-process
+numbers include the client's cost too.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Optional
+
+import httpx
+from agent_sdk import AgentSDK
+
+DEFAULT_MIX = "register=1,update=2,verify=1,review=4,stake=2,top=6,profile=4"
+STUB_HOST = "http://proof-stub.local"
+
+# --- Recording ---
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    async def call(self, name: str, request) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try: resp = await request
+        except httpx.HTTPError as e:
+            self.errors[name] += 1
+            self.statuses[name][type(e).__name__] += 1
+            return None
+        finally: self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[name][str(resp.status_code)] += 1
+        if resp.status_code >= 400: self.errors[name] += 1
+        return resp
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name in sorted(self.latencies):
+            samples = sorted(self.latencies[name])
+            pct = lambda p: round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+            endpoints[name] = {
+                "count": len(samples), "errors": self.errors[name], "rps": round(len(samples) / elapsed, 1),
+                "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "max_ms": round(samples[-1] * 1000, 3),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 3), "status": dict(self.statuses[name]),
+            }
+        total = sum(e["count"] for e in endpoints.values())
+        return {"requests": total, "errors": sum(self.errors.values()), "seconds": round(elapsed, 3),
+                "rps": round(total / elapsed, 1), "endpoints": endpoints}
+
+# --- Simulated Agents ---
+class Swarm:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, proof_base: str, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.proof_base = proof_base
+        self.rng = rng
+        self.agents: list[AgentSDK] = []
+        self.verified: list[AgentSDK] = [] # reviewers need the trust a verification brings
+        self.seq = 0
+
+    def _next(self) -> int:
+        self.seq += 1
+        return self.seq
+
+    async def post(self, name: str, agent: AgentSDK, path: str, payload: dict):
+        body = json.dumps(payload)
+        return await self.recorder.call(name, self.client.post(path, content=body, headers=agent.sign_request("POST", path, body)))
+
+    async def register(self):
+        agent = AgentSDK("load")
+        resp = await self.post("register", agent, "/register", {"id": agent.agent_id, "name": f"LoadBot {agent.agent_id}", "public_key": agent.public_key_hex})
+        if resp is not None and resp.status_code == 200: self.agents.append(agent)
+
+    async def update(self):
+        agent = self.rng.choice(self.agents)
+        await self.post("update", agent, "/agent/update", {"bio": f"Simulated agent, update {self._next()}",
+                                                            "tags": self.rng.choice([["defi"], ["coding"], ["research"], ["defi", "coding"]])})
+
+    async def verify(self):
+        agent = self.rng.choice(self.agents)
+        # A fresh URL per call, so the server's proof cache doesn't answer it
+        resp = await self.post("verify", agent, "/verify", {"agent_id": agent.agent_id, "platform": "github",
+                                                            "proof_url": f"{self.proof_base}/{agent.agent_id}/{self._next()}"})
+        if resp is not None and resp.status_code == 200 and resp.json()["status"] == "verified": self.verified.append(agent)
+
+    async def review(self):
+        reviewer, target = self.rng.choice(self.verified or self.agents), self.rng.choice(self.agents)
+        if reviewer is target: return
+        await self.post("review", reviewer, "/review", {"reviewer_id": reviewer.agent_id, "target_id": target.agent_id,
+                                                        "score": self.rng.choice([1, 1, 1, -1]), "comment": f"load {self._next()}"})
+
+    async def stake(self):
+        agent = self.rng.choice(self.agents)
+        await self.post("stake", agent, "/stake", {"agent_id": agent.agent_id, "tx_hash": f"0x{self._next():064x}",
+                                                   "amount": float(self.rng.randint(1, 100))})
+
+    async def top(self):
+        params = {"limit": self.rng.choice([10, 50, 100]), "sort_by": self.rng.choice(["trust_score", "trust_score", "staked_amount"])}
+        await self.recorder.call("top", self.client.get("/agents/top", params=params))
+
+    async def profile(self):
+        await self.recorder.call("profile", self.client.get(f"/agent/{self.rng.choice(self.agents).agent_id}"))
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {name.strip(): float(weight) for name, weight in (item.split("=") for item in spec.split(",") if item.strip())}
+    unknown = set(mix) - {"register", "update", "verify", "review", "stake", "top", "profile"}
+    if unknown: raise ValueError(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+async def drive(swarm: Swarm, agents: int, mix: dict, requests: int, duration: float, concurrency: int) -> dict:
+    """Register ``agents``, then run the mix; returns the report with the setup phase under "setup"."""
+    # Registration runs first so every other operation has agents to pick from
+    setup_start = time.perf_counter()
+    sem = asyncio.Semaphore(concurrency)
+    async def one_register():
+        async with sem: await swarm.register()
+    await asyncio.gather(*(one_register() for _ in range(agents)))
+    if len(swarm.agents) < 2: raise RuntimeError("Registration failed; is the server reachable?")
+    setup = swarm.recorder.report(time.perf_counter() - setup_start)
+    swarm.recorder = Recorder()
+
+    names, weights = list(mix), list(mix.values())
+    issued = 0
+    deadline = time.monotonic() + duration if duration else None
+    start = time.perf_counter()
+    async def worker():
+        nonlocal issued
+        while (not requests or issued < requests) and (deadline is None or time.monotonic() < deadline):
+            issued += 1
+            await getattr(swarm, swarm.rng.choices(names, weights)[0])()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    report = swarm.recorder.report(time.perf_counter() - start)
+    report["setup"] = setup
+    return report
+
+# --- Proof Stub ---
+# Proof URLs are {base}/{agent_id}/{n}; the stub answers with that agent's marker.
+def stub_proof(path: str) -> bytes:
+    return f"agent-kred-verify: {path.strip('/').split('/')[0]}".encode()
+
+def stub_transport() -> httpx.MockTransport:
+    return httpx.MockTransport(lambda request: httpx.Response(200, content=stub_proof(request.url.path)))
+
+async def serve_stub(port: int) -> asyncio.AbstractServer:
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                body = stub_proof(head.split(b" ", 2)[1].decode())
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError): pass
+        finally: writer.close()
+    return await asyncio.start_server(handle, "127.0.0.1", port)
+
+# --- Runner ---
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    if args.url:
+        stub = await serve_stub(args.proof_stub_port) if args.proof_stub_port else None
+        proof_base = f"http://127.0.0.1:{args.proof_stub_port}" if stub else STUB_HOST
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        try:
+            async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+                report = await drive(Swarm(client, Recorder(), proof_base, rng), args.agents, mix, args.requests, args.duration, args.concurrency)
+        finally:
+            if stub: stub.close()
+        target = args.url
+    else:
+        with tempfile.TemporaryDirectory() as scratch:
+            # The app reads its configuration at import time
+            os.environ.setdefault("DB_PROFILE", "test")
+            os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{scratch}/loadtest.db")
+            from main import app
+            from proof_fetcher import proof_fetcher
+            from rate_limit import rate_limiter
+            proof_fetcher.transport = stub_transport()
+            rate_limiter.enabled = args.rate_limits # thousands of calls per agent would mostly measure 429s
+            async with app.router.lifespan_context(app):
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=args.timeout) as client:
+                    report = await drive(Swarm(client, Recorder(), STUB_HOST, rng), args.agents, mix, args.requests, args.duration, args.concurrency)
+        target = os.environ["DATABASE_URL"]
+    report["config"] = {"target": target, "agents": args.agents, "mix": mix, "concurrency": args.concurrency,
+                        "requests": args.requests, "duration": args.duration, "seed": args.seed}
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive signed AgentKred API flows and report latency per endpoint.")
+    parser.add_argument("--url", help="Server to load (default: the app in this process)")
+    parser.add_argument("--agents", type=int, default=1000, help="Agents registered before the timed run")
+    parser.add_argument("--requests", type=int, default=10_000, help="Operations in the timed run (0: until --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after this many seconds (0: no limit)")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Relative weights, e.g. review=4,top=6")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--proof-stub-port", type=int, default=0, help="With --url: serve proof pages on 127.0.0.1:PORT")
+    parser.add_argument("--rate-limits", action="store_true", help="In process: keep the API rate limits on")
+    parser.add_argument("--report", help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+    if not args.requests and not args.duration: parser.error("set --requests or --duration")
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f: f.write(text + "\n")
+    print(text)
+    return 1 if report["requests"] == 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
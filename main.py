@@ -1,25 +1,61 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, Header
+from fastapi import FastAPI, HTTPException, Depends, Request, Header, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from sqlalchemy import func, or_, and_, tuple_, case, exists, insert, update
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from contextlib import asynccontextmanager
-from database import get_db, init_db
-from models import Agent, Verification, Review
+from database import get_db, init_db, engine, AsyncSessionLocal, pool_stats
+from models import Base, Agent, Verification, Review, trust_score_sql, score_update, SCORE_VERSION
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Literal, Union, Annotated, TypedDict
 import httpx
 import time
 from nacl.signing import VerifyKey
 from nacl.exceptions import BadSignatureError
 from nacl.encoding import HexEncoder
+from key_cache import key_cache
+from sig_verifier import sig_verifier
+from leaderboard import leaderboard, run_leaderboard_sync, SORT_KEYS, LEADERBOARD_INDEX, LEADERBOARD_REFRESH_SECONDS, LEADERBOARD_SYNC_SECONDS
+from pagination import encode_cursor, decode_cursor
+from export import ndjson_response
+from response_cache import response_cache
+from replay import replay_store, ReplayStoreFull, ReplayAgentFull, REPLAY_WINDOW
+from rate_limit import rate_limiter
+from profiler import profiler, ProfilerMiddleware
+from metrics import registry, Gauges, MetricsMiddleware, instrument_engine, signature_verify_seconds, METRICS
+from proof_fetcher import proof_fetcher, TWITTER_OEMBED_URL
+from verify_worker import build_worker, PLATFORM_BOOSTS, VERIFY_WORKER
+from trust_graph import trust_graph, run_trust_graph, TRUST_GRAPH
+from search import find_agents, normalize_tags, index_agents, MAX_TAGS
+from chain_indexer import build_indexer, run_chain_indexer, CHAIN_INDEXER, STAKE_SOURCE
+import asyncio
 import json
+import os
+from collections import Counter
 
 # --- Lifespan Manager ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    await proof_fetcher.start()
+    if VERIFY_WORKER == "inprocess": verification_worker.start()
+    tasks = []
+    if LEADERBOARD_INDEX:
+        async with AsyncSessionLocal() as db: await leaderboard.load(db)
+        if LEADERBOARD_SYNC_SECONDS > 0 or LEADERBOARD_REFRESH_SECONDS > 0:
+            tasks.append(asyncio.create_task(run_leaderboard_sync(AsyncSessionLocal, interval=LEADERBOARD_SYNC_SECONDS or LEADERBOARD_REFRESH_SECONDS)))
+    if TRUST_GRAPH == "inprocess": tasks.append(asyncio.create_task(run_trust_graph(AsyncSessionLocal)))
+    if chain_indexer: tasks.append(asyncio.create_task(run_chain_indexer(chain_indexer)))
     yield
+    for t in tasks: t.cancel()
+    if chain_indexer: await chain_indexer.rpc.aclose()
+    await verification_worker.stop()
+    await proof_fetcher.close()
+    sig_verifier.shutdown()
+    if replay_store: await replay_store.close()
+
+chain_indexer = build_indexer(AsyncSessionLocal) if CHAIN_INDEXER == "inprocess" else None
 
 app = FastAPI(
     title="AgentKred Protocol",
@@ -27,6 +63,7 @@ app = FastAPI(
     version="0.3.2", # Profile Update
     lifespan=lifespan
 )
+response_cache.salt = response_cache.salt or app.version # a release may change the rendered JSON
 
 # --- CORS Middleware ---
 app.add_middleware(
@@ -35,8 +72,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+app.add_middleware(ProfilerMiddleware, profiler=profiler)
+
+# --- Metrics ---
+# Outermost, so route latency covers the other middleware too
+if METRICS:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, known_tables=set(Base.metadata.tables))
+registry.register(Gauges("agentkred_db_pool", "DB connection pool", pool_stats, counters=("checkouts", "timeouts", "overflow_events")))
+
 # --- Security ---
 async def verify_request_signature(
     request: Request,
@@ -46,7 +93,7 @@ async def verify_request_signature(
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        if abs(int(time.time()) - int(x_timestamp)) > 60:
+        if abs(int(time.time()) - int(x_timestamp)) > REPLAY_WINDOW:
             raise HTTPException(403, "Request timestamp expired")
     except ValueError:
         raise HTTPException(400, "Invalid timestamp")
@@ -55,23 +102,59 @@ async def verify_request_signature(
     body_str = body_bytes.decode("utf-8")
     message = f"{request.method}{request.url.path}{x_timestamp}{body_str}".encode("utf-8")
     
-    if request.url.path == "/register":
-        try:
-            public_key_hex = json.loads(body_str).get("public_key")
-        except: raise HTTPException(400, "Invalid JSON")
-    else:
-        result = await db.execute(select(Agent).where(Agent.id == x_agent_id))
-        agent = result.scalars().first()
-        if not agent: raise HTTPException(401, "Agent not found")
-        public_key_hex = agent.public_key
-
-    if not public_key_hex: raise HTTPException(400, "Key missing")
-
     try:
-        VerifyKey(public_key_hex, encoder=HexEncoder).verify(message, bytes.fromhex(x_signature))
+        if request.url.path == "/register":
+            try:
+                public_key_hex = json.loads(body_str).get("public_key")
+            except: raise HTTPException(400, "Invalid JSON")
+            if not public_key_hex: raise HTTPException(400, "Key missing")
+            verify_key = VerifyKey(public_key_hex, encoder=HexEncoder)
+        else:
+            verify_key = key_cache.get(x_agent_id)
+            if verify_key is None:
+                result = await db.execute(select(Agent).where(Agent.id == x_agent_id))
+                agent = result.scalars().first()
+                if not agent: raise HTTPException(401, "Agent not found")
+                if not agent.public_key: raise HTTPException(400, "Key missing")
+                # Hand the row to the route so it doesn't SELECT it again
+                request.state.agent = agent
+                verify_key = key_cache.put(agent.id, agent.public_key)
+        signature = bytes.fromhex(x_signature)
+        start = time.perf_counter()
+        valid = await sig_verifier.verify(verify_key, message, signature)
+        signature_verify_seconds.observe(time.perf_counter() - start, sig_verifier.mode, "true" if valid else "false")
+    except HTTPException: raise
     except: raise HTTPException(401, "Invalid Signature")
+    if not valid: raise HTTPException(401, "Invalid Signature")
+    rate_limiter.check(request.url.path, x_agent_id)
+    # Only verified signatures within the agent's rate limit are remembered, so neither
+    # forged junk nor one agent's flood can fill the store. A request refused here gets
+    # its tokens back: resending a captured request must not drain the signer's buckets
+    if replay_store is not None:
+        try: replayed = await replay_store.seen(signature, int(x_timestamp), x_agent_id)
+        except ReplayStoreFull as e:
+            rate_limiter.refund(request.url.path, x_agent_id)
+            if isinstance(e, ReplayAgentFull): raise HTTPException(429, "Too many signed requests this second", headers={"Retry-After": "1"})
+            raise HTTPException(503, "Replay store full")
+        if replayed:
+            rate_limiter.refund(request.url.path, x_agent_id)
+            raise HTTPException(403, "Replayed request")
     return x_agent_id
 
+async def get_signed_agent(request: Request, verified_id: str = Depends(verify_request_signature), db: AsyncSession = Depends(get_db)) -> Agent:
+    """The Agent row of the request signer, reusing the one loaded during auth."""
+    agent = getattr(request.state, "agent", None)
+    if agent is None: agent = await db.get(Agent, verified_id)
+    if not agent: raise HTTPException(404, "Not Found")
+    return agent
+
+ADMIN_AGENT_IDS = set(filter(None, os.getenv("ADMIN_AGENT_IDS", "").split(",")))
+
+async def get_admin(verified_id: str = Depends(verify_request_signature)) -> str:
+    """Signed requests from an agent listed in ADMIN_AGENT_IDS; GETs are signed over an empty body."""
+    if verified_id not in ADMIN_AGENT_IDS: raise HTTPException(403, "Admin only")
+    return verified_id
+
 # --- Schemas ---
 class AgentCreate(BaseModel):
     id: str
@@ -96,6 +179,7 @@ class AgentResponse(BaseModel):
     review_score: int
     moltbook_karma: int
     staked_amount: float
+    graph_score: int = 0
     last_active_at: datetime
     created_at: datetime
     
@@ -112,6 +196,29 @@ class ReviewRequest(BaseModel):
     score: int
     comment: str = ""
 
+class ReviewItem(BaseModel):
+    reviewer_id: str
+    reviewer_name: Optional[str] = None
+    score: int
+    comment: Optional[str] = None
+    created_at: datetime
+
+# Fast list rendering: list endpoints select plain column rows and dump them
+# through TypedDict mirrors of the response models, so pydantic-core writes
+# JSON straight from dicts without ORM hydration or model instances.
+AGENT_FIELDS = tuple(AgentResponse.model_fields)
+AGENT_COLUMNS = tuple(getattr(Agent, f) for f in AGENT_FIELDS)
+AgentRow = TypedDict("AgentRow", {name: f.annotation for name, f in AgentResponse.model_fields.items()})
+ReviewRow = TypedDict("ReviewRow", {name: f.annotation for name, f in ReviewItem.model_fields.items()})
+AGENT_ROW = TypeAdapter(AgentRow)
+AGENT_ROWS = TypeAdapter(list[AgentRow])
+REVIEW_ROWS = TypeAdapter(list[ReviewRow])
+
+def render_agent(row: dict) -> bytes:
+    return AGENT_ROW.dump_json({f: row[f] for f in AGENT_FIELDS}) # field order as in AgentResponse
+
+leaderboard.render = render_agent
+
 class ReviewResponse(BaseModel):
     status: str
     score_boost: int
@@ -122,31 +229,132 @@ class VerificationRequest(BaseModel):
     agent_id: str
     platform: str
     proof_url: str
+    background: bool = False # Queue the check and return 202 with a job_id
 
 class VerificationResponse(BaseModel):
     status: str
     score_added: int
     message: str
+    job_id: Optional[int] = None
+
+class VerificationJobResponse(BaseModel):
+    job_id: int
+    agent_id: str
+    platform: str
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    verified_at: Optional[datetime] = None
+
+MAX_BATCH_OPERATIONS = 500
+
+class BatchReview(BaseModel):
+    op: Literal["review"]
+    data: ReviewRequest
+
+class BatchStake(BaseModel):
+    op: Literal["stake"]
+    data: StakeRequest
+
+class BatchUpdate(BaseModel):
+    op: Literal["update"]
+    data: AgentUpdate
+
+class BatchRequest(BaseModel):
+    operations: List[Annotated[Union[BatchReview, BatchStake, BatchUpdate], Field(discriminator="op")]] = Field(..., max_length=MAX_BATCH_OPERATIONS)
+    atomic: bool = False # All-or-nothing: any failure rolls back the whole batch
+
+class BatchItemResult(BaseModel):
+    index: int
+    op: str
+    status: str # "ok" | "error" | "rolled_back" | "skipped"
+    status_code: int
+    detail: Optional[str] = None
+    result: Optional[Dict] = None
+
+class BatchResponse(BaseModel):
+    status: str # "committed" | "aborted"
+    applied: int
+    failed: int
+    results: List[BatchItemResult]
 
 # --- Utils ---
-async def verify_github_gist(proof_url: str, agent_id: str) -> bool:
+async def verify_github_gist(proof_url: str, agent_id: str, strict: bool = False) -> bool:
     if "gist.github.com" in proof_url and "/raw" not in proof_url: raw_url = proof_url + "/raw"
     else: raw_url = proof_url
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.get(raw_url, timeout=5.0)
-            return resp.status_code == 200 and f"agent-kred-verify: {agent_id}" in resp.text
-        except: return False
+    marker = f"agent-kred-verify: {agent_id}"
+    return await proof_fetcher.check("github", proof_url, agent_id, raw_url, lambda text: marker in text, strict=strict)
 
-async def verify_twitter_tweet(proof_url: str, agent_id: str) -> bool:
+async def verify_twitter_tweet(proof_url: str, agent_id: str, strict: bool = False) -> bool:
     if "x.com" in proof_url: proof_url = proof_url.replace("x.com", "twitter.com")
-    oembed_url = f"https://publish.twitter.com/oembed?url={proof_url}"
-    async with httpx.AsyncClient() as client:
-        try:
-            headers = {"User-Agent": "Mozilla/5.0 (compatible; AgentKred)"}
-            resp = await client.get(oembed_url, headers=headers, timeout=5.0)
-            return resp.status_code == 200 and f"agent-kred-verify: {agent_id}" in resp.json().get("html", "")
-        except: return False
+    oembed_url = str(httpx.URL(TWITTER_OEMBED_URL, params={"url": proof_url}))
+    marker = f"agent-kred-verify: {agent_id}"
+    headers = {"User-Agent": "Mozilla/5.0 (compatible; AgentKred)"}
+    return await proof_fetcher.check("twitter", proof_url, agent_id, oembed_url, lambda text: marker in json.loads(text).get("html", ""), headers, strict)
+
+async def check_proof(platform: str, proof_url: str, agent_id: str, strict: bool = False) -> bool:
+    if platform == "github": return await verify_github_gist(proof_url, agent_id, strict)
+    if platform == "twitter": return await verify_twitter_tweet(proof_url, agent_id, strict)
+    return False
+
+verification_worker = build_worker(check_proof)
+
+# --- Operations ---
+# Shared by the single-operation routes and /batch. Each one runs all of its
+# checks first and then writes with a single UPDATE ... RETURNING, so a
+# rejected operation leaves the transaction unchanged.
+
+async def apply_update(db: AsyncSession, agent_id: str, req: AgentUpdate) -> Agent:
+    values = {"last_active_at": datetime.utcnow()}
+    if req.name: values["name"] = req.name
+    if req.bio: values["bio"] = req.bio
+    if req.tags: values["tags"] = ",".join(req.tags)
+    if req.social_links: values["social_links"] = json.dumps(req.social_links)
+    agent = (await db.execute(score_update(agent_id, **values))).scalars().first()
+    if not agent: raise HTTPException(404, "Not Found")
+    if req.tags or req.bio: await index_agents(db, [(agent.id, agent.tags, agent.bio)])
+    if req.name:
+        # Review pages show reviewer names and are cached by the target's version
+        reviewed = select(Review.target_id).where(Review.reviewer_id == agent.id)
+        await db.execute(update(Agent).where(Agent.id.in_(reviewed)).values(version=Agent.version + 1, updated_at=Agent.updated_at))
+    return agent
+
+async def apply_stake(db: AsyncSession, agent_id: str, req: StakeRequest) -> Agent:
+    if agent_id != req.agent_id: raise HTTPException(403, "Auth Error")
+    if STAKE_SOURCE == "chain": raise HTTPException(409, "Stakes are indexed from AgentVault events")
+    if not req.tx_hash.startswith("0x"): raise HTTPException(400, "Invalid Tx")
+    agent = (await db.execute(score_update(agent_id, staked_amount=req.amount, staking_tx_hash=req.tx_hash, last_active_at=datetime.utcnow()))).scalars().first()
+    if not agent: raise HTTPException(404, "Not Found")
+    return agent
+
+async def apply_review(db: AsyncSession, req: ReviewRequest, reviewer_trust: Optional[int], target_found: bool, reciprocal: bool) -> tuple[ReviewResponse, list[Agent]]:
+    """Insert the review and bump the target with one UPDATE ... RETURNING.
+
+    The increment happens in SQL, so concurrent reviews of one target can't
+    overwrite each other. Returns the response and the refreshed agent rows.
+    """
+    if reviewer_trust is None or not target_found: raise HTTPException(404, "Not Found")
+    if reviewer_trust < 50: raise HTTPException(403, "Score too low")
+
+    boost = int(reviewer_trust * 0.1 * (req.score) * (0.5 if reciprocal else 1.0))
+    now = datetime.utcnow()
+    await db.execute(insert(Review).values(reviewer_id=req.reviewer_id, target_id=req.target_id, score=req.score, comment=req.comment, created_at=now))
+    # Reviewer and target in one statement; the CASEs pick which row gets what
+    review_score = Agent.review_score + case((Agent.id == req.target_id, boost), else_=0)
+    stmt = (
+        update(Agent).where(Agent.id.in_({req.reviewer_id, req.target_id}))
+        .values(
+            review_score=review_score,
+            trust_score=trust_score_sql(Agent.verification_score, review_score, Agent.moltbook_karma, Agent.staked_amount),
+            score_version=SCORE_VERSION,
+            last_active_at=case((Agent.id == req.reviewer_id, now), else_=Agent.last_active_at),
+        )
+        .returning(Agent)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    agents = (await db.execute(stmt)).scalars().all()
+    target = next(a for a in agents if a.id == req.target_id)
+    return ReviewResponse(status="success", score_boost=boost, new_trust_score=target.trust_score, message="Reviewed"), agents
 
 # --- Routes ---
 
@@ -154,6 +362,50 @@ async def verify_twitter_tweet(proof_url: str, agent_id: str) -> bool:
 async def root():
     return {"status": "online", "system": "AgentKred Protocol v0.3.2 (Profile)"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text format: route, DB statement, signature and outbound latency histograms, pool gauges."""
+    return registry.response()
+
+# --- Admin: Profiler ---
+class ProfilerSettings(BaseModel):
+    enabled: Optional[bool] = None
+    sample_rate: Optional[float] = Field(None, ge=0, le=1)
+    slow_ms: Optional[int] = Field(None, ge=0) # 0: keep only sampled requests
+
+@app.post("/admin/profiler")
+async def configure_profiler(req: ProfilerSettings, admin: str = Depends(get_admin)):
+    profiler.configure(req.enabled, req.sample_rate, req.slow_ms / 1000 if req.slow_ms is not None else None)
+    return profiler.stats()
+
+@app.get("/admin/profiles")
+async def list_profiles(admin: str = Depends(get_admin)):
+    return {"profiler": profiler.stats(), "profiles": profiler.list()}
+
+@app.get("/admin/profiles/{name}")
+async def download_profile(name: str, admin: str = Depends(get_admin)):
+    """One profile in folded-stack format: flamegraph.pl profile.folded > profile.svg, or open it in speedscope."""
+    path = profiler.path(name)
+    if path is None or not os.path.exists(path): raise HTTPException(404, "Not Found")
+    with open(path, "rb") as f: return Response(f.read(), media_type="text/plain")
+
+@app.get("/stats")
+async def get_stats():
+    """Runtime counters for sizing the DB pool and the in-process caches."""
+    return {
+        "db_pool": pool_stats(),
+        "key_cache": key_cache.stats(),
+        "sig_verifier": sig_verifier.stats(),
+        "proof_fetcher": proof_fetcher.stats(),
+        "leaderboard": {"ready": leaderboard.ready, "agents": len(leaderboard)},
+        "trust_graph": trust_graph.stats(),
+        "chain_indexer": chain_indexer.stats() if chain_indexer else None,
+        "response_cache": response_cache.stats(),
+        "replay_store": replay_store.stats() if replay_store else None,
+        "rate_limiter": rate_limiter.stats(),
+        "profiler": profiler.stats(),
+    }
+
 @app.post("/register", response_model=AgentResponse)
 async def register_agent(agent_in: AgentCreate, db: AsyncSession = Depends(get_db), verified_id: str = Depends(verify_request_signature)):
     if verified_id != agent_in.id: raise HTTPException(400, "ID Mismatch")
@@ -169,104 +421,223 @@ async def register_agent(agent_in: AgentCreate, db: AsyncSession = Depends(get_d
     db.add(new_agent)
     await db.commit()
     await db.refresh(new_agent)
+    key_cache.put(new_agent.id, new_agent.public_key)
+    leaderboard.upsert(new_agent)
     return new_agent
 
 @app.post("/agent/update", response_model=AgentResponse)
 async def update_profile(req: AgentUpdate, db: AsyncSession = Depends(get_db), verified_id: str = Depends(verify_request_signature)):
-    result = await db.execute(select(Agent).where(Agent.id == verified_id))
-    agent = result.scalars().first()
-    if not agent: raise HTTPException(404, "Not Found")
-        
-    if req.name: agent.name = req.name
-    if req.bio: agent.bio = req.bio
-    if req.tags: agent.tags = ",".join(req.tags)
-    if req.social_links: agent.social_links = json.dumps(req.social_links)
-        
-    agent.last_active_at = datetime.utcnow()
+    agent = await apply_update(db, verified_id, req)
     await db.commit()
-    await db.refresh(agent)
+    leaderboard.upsert(agent)
     return agent
 
 @app.get("/agent/{agent_id}", response_model=AgentResponse)
-async def get_agent(agent_id: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Agent).where(Agent.id == agent_id))
-    agent = result.scalars().first()
+async def get_agent(agent_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    # Revalidating costs one version lookup; the row is only loaded to render a new version
+    version = (await db.execute(select(Agent.version).where(Agent.id == agent_id))).scalar()
+    if version is None: raise HTTPException(404, "Not Found")
+    cached = response_cache.check(request, ("agent", agent_id, version))
+    if cached: return cached
+    agent = (await db.execute(select(Agent).where(Agent.id == agent_id).execution_options(populate_existing=True))).scalars().first()
     if not agent: raise HTTPException(404, "Not Found")
-    agent.calculate_total_score()
-    return agent
+    body = AgentResponse.model_validate(agent).model_dump_json().encode()
+    return response_cache.put(("agent", agent_id, agent.version), body).response(request)
+
+# Keyset pages: the cursor of the last row goes out in X-Next-Cursor and comes
+# back as ?cursor=, so page N costs one index seek like page 1.
+# A new review bumps the target's version, which keys the cached pages.
+def reviews_query(agent_id: str, limit: int, cursor: Optional[str] = None):
+    query = (
+        select(Review.reviewer_id, Agent.name.label("reviewer_name"), Review.score, Review.comment, Review.created_at, Review.id)
+        .join(Agent, Review.reviewer_id == Agent.id).where(Review.target_id == agent_id)
+    )
+    if cursor:
+        query = query.where(tuple_(Review.created_at, Review.id) < tuple_(*decode_cursor(cursor, datetime, int)))
+    return query.order_by(Review.created_at.desc(), Review.id.desc()).limit(limit)
 
-@app.get("/agent/{agent_id}/reviews")
-async def get_agent_reviews(agent_id: str, db: AsyncSession = Depends(get_db)):
-    query = select(Review, Agent.name).join(Agent, Review.reviewer_id == Agent.id).where(Review.target_id == agent_id).order_by(Review.created_at.desc())
-    result = await db.execute(query)
-    return [{"reviewer_id": r.reviewer_id, "reviewer_name": name, "score": r.score, "comment": r.comment, "created_at": r.created_at} for r, name in result]
+@app.get("/agent/{agent_id}/reviews", response_model=list[ReviewItem])
+async def get_agent_reviews(agent_id: str, request: Request, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    version = (await db.execute(select(Agent.version).where(Agent.id == agent_id))).scalar()
+    if version is None: return []
+    key = ("reviews", agent_id, version, limit, cursor)
+    cached = response_cache.check(request, key)
+    if cached: return cached
+    rows = [row._asdict() for row in (await db.execute(reviews_query(agent_id, limit, cursor))).all()]
+    headers = {"X-Next-Cursor": encode_cursor(rows[-1]["created_at"], rows[-1]["id"])} if len(rows) == limit else {}
+    return response_cache.put(key, REVIEW_ROWS.dump_json(rows), headers).response(request)
+
+def top_agents_query(col: str, limit: int, after: Optional[tuple] = None):
+    sort_col = getattr(Agent, col)
+    query = select(*AGENT_COLUMNS)
+    if after: query = query.where(tuple_(sort_col, Agent.id) < tuple_(*after))
+    return query.order_by(sort_col.desc(), Agent.id.desc()).limit(limit)
+
+CURSOR_TYPES = {"trust_score": int, "staked_amount": float, "review_score": int, "last_active_at": datetime}
 
 @app.get("/agents/top", response_model=list[AgentResponse])
-async def get_top_agents(limit: int = 50, sort_by: str = "trust_score", db: AsyncSession = Depends(get_db)):
-    sort_col = Agent.trust_score
-    if sort_by == "staked_amount": sort_col = Agent.staked_amount
-    elif sort_by == "review_score": sort_col = Agent.review_score
-    elif sort_by == "active": sort_col = Agent.last_active_at
-    query = select(Agent).order_by(sort_col.desc()).limit(limit)
-    result = await db.execute(query)
-    agents = result.scalars().all()
-    for a in agents: a.calculate_total_score()
-    return agents
+async def get_top_agents(request: Request, limit: int = 50, sort_by: str = "trust_score", cursor: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    col = SORT_KEYS.get(sort_by, "trust_score")
+    after = decode_cursor(cursor, CURSOR_TYPES[col], str) if cursor else None
+    indexed = leaderboard.ready
+    if indexed:
+        # Any leaderboard change moves (generation, version), retiring every cached page
+        key = ("top", leaderboard.generation, leaderboard.version, col, limit, cursor)
+        cached = response_cache.check(request, key)
+        if cached: return cached
+        body, agents = leaderboard.top_json(sort_by, limit, after)
+    else:
+        agents = [dict(zip(AGENT_FIELDS, row)) for row in (await db.execute(top_agents_query(col, limit, after))).all()]
+        body = AGENT_ROWS.dump_json(agents)
+    headers = {"X-Next-Cursor": encode_cursor(agents[-1][col], agents[-1]["id"])} if agents and len(agents) == limit else {}
+    if indexed: return response_cache.put(key, body, headers).response(request)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/agents/search", response_model=list[AgentResponse])
+async def search_agents(tags: Optional[str] = None, match: str = "any", name: Optional[str] = None, q: Optional[str] = None,
+                        limit: int = Query(50, ge=1, le=200), cursor: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    """tags=defi,coding (match=any|all), name= prefix, q= words in the bio; by trust_score, X-Next-Cursor pages."""
+    if match not in ("any", "all"): raise HTTPException(400, "match must be any or all")
+    tag_list = normalize_tags(tags)
+    if tags and len(tags.split(",")) > MAX_TAGS: raise HTTPException(400, f"At most {MAX_TAGS} tags")
+    after = decode_cursor(cursor, int, str) if cursor else None
+    agents = [dict(zip(AGENT_FIELDS, row)) for row in await find_agents(db, AGENT_COLUMNS, tag_list, match == "all", name, q, limit, after)]
+    headers = {"X-Next-Cursor": encode_cursor(agents[-1]["trust_score"], agents[-1]["id"])} if len(agents) == limit else {}
+    return Response(AGENT_ROWS.dump_json(agents), media_type="application/json", headers=headers)
+
+@app.get("/agent/{agent_id}/rank")
+async def get_agent_rank(agent_id: str, sort_by: str = "trust_score", db: AsyncSession = Depends(get_db)):
+    if sort_by not in SORT_KEYS: raise HTTPException(400, "Invalid sort_by")
+    if leaderboard.ready:
+        rank = leaderboard.rank(agent_id, sort_by)
+        if rank is None: raise HTTPException(404, "Not Found")
+        return {"agent_id": agent_id, "sort_by": sort_by, "rank": rank, "total": len(leaderboard)}
+
+    agent = await db.get(Agent, agent_id)
+    if not agent: raise HTTPException(404, "Not Found")
+    col = getattr(Agent, SORT_KEYS[sort_by])
+    value = getattr(agent, SORT_KEYS[sort_by])
+    ahead = (await db.execute(select(func.count()).select_from(Agent).where(or_(col > value, and_(col == value, Agent.id > agent_id))))).scalar()
+    total = (await db.execute(select(func.count()).select_from(Agent))).scalar()
+    return {"agent_id": agent_id, "sort_by": sort_by, "rank": ahead + 1, "total": total}
+
+# Nightly snapshots: NDJSON streamed from a server-side cursor. Agents come in
+# (updated_at, id) order, so the last line's updated_at is the next run's
+# updated_since; reviews never change and are filtered on created_at.
+@app.get("/agents/export")
+async def export_agents(request: Request, updated_since: Optional[datetime] = None, db: AsyncSession = Depends(get_db)):
+    query = select(*AGENT_COLUMNS, Agent.updated_at)
+    if updated_since: query = query.where(Agent.updated_at >= updated_since)
+    return ndjson_response(request, db, query.order_by(Agent.updated_at, Agent.id))
+
+@app.get("/reviews/export")
+async def export_reviews(request: Request, updated_since: Optional[datetime] = None, db: AsyncSession = Depends(get_db)):
+    query = select(Review.id, Review.reviewer_id, Review.target_id, Review.score, Review.comment, Review.created_at)
+    if updated_since: query = query.where(Review.created_at >= updated_since)
+    return ndjson_response(request, db, query.order_by(Review.id))
+
+# Review rings: groups of agents with no verified or staked member that mostly
+# review each other (see trust_graph.py)
+@app.get("/trust/clusters")
+async def get_collusion_clusters(min_size: int = Query(3, ge=2), min_internal_share: float = Query(0.8, ge=0, le=1), limit: int = Query(50, ge=1, le=500)):
+    if not trust_graph.ready: raise HTTPException(503, "Trust graph not built")
+    return trust_graph.clusters(min_size, min_internal_share, limit)
 
 @app.post("/verify", response_model=VerificationResponse)
-async def verify_platform(req: VerificationRequest, db: AsyncSession = Depends(get_db), verified_id: str = Depends(verify_request_signature)):
+async def verify_platform(req: VerificationRequest, response: Response, db: AsyncSession = Depends(get_db), verified_id: str = Depends(verify_request_signature)):
     if verified_id != req.agent_id: raise HTTPException(403, "Auth Error")
-    result = await db.execute(select(Agent).where(Agent.id == req.agent_id))
-    agent = result.scalars().first()
-    if not agent: raise HTTPException(404, "Not Found")
 
-    is_valid = False
-    boost = 0
-    if req.platform == "github": is_valid = await verify_github_gist(req.proof_url, req.agent_id); boost = 50
-    elif req.platform == "twitter": is_valid = await verify_twitter_tweet(req.proof_url, req.agent_id); boost = 30
+    if req.background:
+        if req.platform not in PLATFORM_BOOSTS: raise HTTPException(400, "Unknown platform")
+        job = Verification(agent_id=req.agent_id, platform=req.platform, proof_url=req.proof_url, is_verified=False,
+                           status="pending", attempts=0, next_attempt_at=datetime.utcnow())
+        db.add(job)
+        await db.commit()
+        verification_worker.notify()
+        response.status_code = 202
+        return VerificationResponse(status="pending", score_added=0, message="Queued", job_id=job.id)
+
+    is_valid = await check_proof(req.platform, req.proof_url, req.agent_id)
+    boost = PLATFORM_BOOSTS.get(req.platform, 0)
     
     if not is_valid: return VerificationResponse(status="failed", score_added=0, message="Failed")
 
-    db.add(Verification(agent_id=req.agent_id, platform=req.platform, proof_url=req.proof_url, is_verified=True, verified_at=datetime.utcnow()))
-    agent.verification_score += boost
-    agent.last_active_at = datetime.utcnow()
-    agent.calculate_total_score()
+    now = datetime.utcnow()
+    await db.execute(insert(Verification).values(agent_id=req.agent_id, platform=req.platform, proof_url=req.proof_url, is_verified=True, verified_at=now, status="verified", attempts=1, created_at=now))
+    agent = (await db.execute(score_update(req.agent_id, verification_score=boost, last_active_at=now))).scalars().first()
+    if not agent: raise HTTPException(404, "Not Found")
     await db.commit()
+    leaderboard.upsert(agent)
     return VerificationResponse(status="verified", score_added=boost, message="Verified")
 
+@app.get("/verify/{job_id}", response_model=VerificationJobResponse)
+async def get_verification_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    # Unauthenticated, so no proof_url: it can point at a private gist
+    job = await db.get(Verification, job_id)
+    if not job: raise HTTPException(404, "Not Found")
+    return VerificationJobResponse(job_id=job.id, agent_id=job.agent_id, platform=job.platform,
+                                   status=job.status, attempts=job.attempts or 0, last_error=job.last_error, verified_at=job.verified_at)
+
 @app.post("/review", response_model=ReviewResponse)
 async def create_review(req: ReviewRequest, db: AsyncSession = Depends(get_db), verified_id: str = Depends(verify_request_signature)):
     if verified_id != req.reviewer_id: raise HTTPException(403, "Auth Error")
-    r_res = await db.execute(select(Agent).where(Agent.id == req.reviewer_id))
-    reviewer = r_res.scalars().first()
-    t_res = await db.execute(select(Agent).where(Agent.id == req.target_id))
-    target = t_res.scalars().first()
-    
-    if not reviewer or not target: raise HTTPException(404, "Not Found")
-    if reviewer.trust_score < 50: raise HTTPException(403, "Score too low")
-    
-    recip = (await db.execute(select(Review).where(Review.reviewer_id==req.target_id, Review.target_id==req.reviewer_id))).scalars().first()
-    boost = int(reviewer.trust_score * 0.1 * (req.score) * (0.5 if recip else 1.0))
-    
-    db.add(Review(reviewer_id=req.reviewer_id, target_id=req.target_id, score=req.score, comment=req.comment, created_at=datetime.utcnow()))
-    target.review_score += boost
-    target.calculate_total_score()
-    reviewer.last_active_at = datetime.utcnow()
+    # Both agents and the reciprocal check (index on reviewer_id, target_id) in one query
+    recip = exists().where(Review.reviewer_id == req.target_id, Review.target_id == req.reviewer_id)
+    rows = (await db.execute(select(Agent.id, Agent.trust_score, recip.label("recip")).where(Agent.id.in_({req.reviewer_id, req.target_id})))).all()
+    scores = {r.id: r.trust_score for r in rows}
+    resp, agents = await apply_review(db, req, scores.get(req.reviewer_id), req.target_id in scores, bool(rows and rows[0].recip))
+    await db.commit()
+    leaderboard.upsert(*agents)
+    return resp
+
+BATCH_RATE_PATHS = {"review": "/review", "stake": "/stake", "update": "/agent/update"}
+
+@app.post("/batch", response_model=BatchResponse)
+async def run_batch(req: BatchRequest, db: AsyncSession = Depends(get_db), signer: Agent = Depends(get_signed_agent)):
+    """Apply an ordered list of review/stake/update operations in one transaction."""
+    # Each operation costs what the single request would, before any of them runs
+    counts = Counter(o.op for o in req.operations)
+    for op, path in BATCH_RATE_PATHS.items(): rate_limiter.check(path, signer.id, counts[op])
+    # One IN (...) query for every agent the batch touches, one for reciprocal reviews.
+    # Stakes and updates always apply to the signer, which is already loaded; the
+    # UPDATE ... RETURNING of each operation refreshes these rows in place.
+    targets = {o.data.target_id for o in req.operations if o.op == "review"}
+    agents = {a.id: a for a in (await db.execute(select(Agent).where(Agent.id.in_(targets)))).scalars()} if targets else {}
+    agents[signer.id] = signer
+    reciprocal = set((await db.execute(select(Review.reviewer_id).where(Review.reviewer_id.in_(targets), Review.target_id == signer.id))).scalars()) if targets else set()
+
+    results = []
+    for i, o in enumerate(req.operations):
+        try:
+            if o.op == "review":
+                if o.data.reviewer_id != signer.id: raise HTTPException(403, "Auth Error")
+                resp, _ = await apply_review(db, o.data, signer.trust_score, o.data.target_id in agents, o.data.target_id in reciprocal)
+                out = resp.model_dump()
+            elif o.op == "stake":
+                agent = await apply_stake(db, signer.id, o.data)
+                out = {"staked_amount": agent.staked_amount, "trust_score": agent.trust_score}
+            else:
+                agent = await apply_update(db, signer.id, o.data)
+                out = {"id": agent.id}
+            results.append(BatchItemResult(index=i, op=o.op, status="ok", status_code=200, result=out))
+        except HTTPException as e:
+            results.append(BatchItemResult(index=i, op=o.op, status="error", status_code=e.status_code, detail=e.detail))
+            if req.atomic:
+                await db.rollback()
+                for r in results[:-1]: r.status, r.status_code, r.result = "rolled_back", 409, None
+                results += [BatchItemResult(index=j, op=p.op, status="skipped", status_code=409) for j, p in enumerate(req.operations) if j > i]
+                return BatchResponse(status="aborted", applied=0, failed=1, results=results)
+
     await db.commit()
-    return ReviewResponse(status="success", score_boost=boost, new_trust_score=target.trust_score, message="Reviewed")
+    leaderboard.upsert(*agents.values())
+    failed = sum(r.status == "error" for r in results)
+    return BatchResponse(status="committed", applied=len(results) - failed, failed=failed, results=results)
 
 @app.post("/stake", response_model=AgentResponse)
 async def stake_funds(req: StakeRequest, db: AsyncSession = Depends(get_db), verified_id: str = Depends(verify_request_signature)):
-    if verified_id != req.agent_id: raise HTTPException(403, "Auth Error")
-    result = await db.execute(select(Agent).where(Agent.id == req.agent_id))
-    agent = result.scalars().first()
-    if not req.tx_hash.startswith("0x"): raise HTTPException(400, "Invalid Tx")
-    agent.staked_amount += req.amount
-    agent.staking_tx_hash = req.tx_hash
-    agent.last_active_at = datetime.utcnow()
-    agent.calculate_total_score()
+    agent = await apply_stake(db, verified_id, req)
     await db.commit()
-    await db.refresh(agent)
+    leaderboard.upsert(agent)
     return agent
 
 if __name__ == "__main__":
@@ -0,0 +1,188 @@
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+from fastapi import Response
+from sqlalchemy import event
+import os
+import re
+import time
+
+# --- Metrics ---
+# Prometheus text exposition for GET /metrics. A histogram child holds a
+# preallocated list of per-bucket counts plus sum and count; observe() is one
+# bisect over the bucket bounds and three in-place additions, with no lock.
+# Everything is recorded on the event loop thread (SQLAlchemy's cursor events
+# fire there too, inside its greenlet), so nothing races; cumulative bucket
+# counts are only computed when /metrics is scraped. Label values are kept to
+# small fixed sets (route templates, statement verbs and tables, hosts) so the
+# number of children stays bounded.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._children: dict[tuple, HistogramChild] = {}
+
+    def labels(self, *values) -> HistogramChild:
+        child = self._children.get(values)
+        if child is None: child = self._children[values] = HistogramChild(self.buckets)
+        return child
+
+    def observe(self, value: float, *values):
+        self.labels(*values).observe(value)
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for values, child in sorted(self._children.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, values)} {_num(child.sum)}"
+            yield f"{self.name}_count{_labels(self.labelnames, values)} {child.count}"
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *values, amount: float = 1):
+        self._values[values] = self._values.get(values, 0) + amount
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for values, v in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, values)} {_num(v)}"
+
+class Gauges:
+    """Gauges (or counters) read from a stats callback at scrape time: {metric suffix: value}."""
+
+    def __init__(self, prefix: str, help: str, read: Callable[[], dict], counters: tuple = ()):
+        self.prefix = prefix
+        self.help = help
+        self.read = read
+        self.counters = counters # keys that only ever grow
+
+    def collect(self) -> Iterable[str]:
+        for key, v in self.read().items():
+            if isinstance(v, bool) or not isinstance(v, (int, float)): continue
+            name = f"{self.prefix}_{key}" + ("_total" if key in self.counters else "")
+            yield f"# HELP {name} {self.help}: {key}"
+            yield f"# TYPE {name} {'counter' if key in self.counters else 'gauge'}"
+            yield f"{name} {_num(v)}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> bytes:
+        lines = [line for m in self._metrics for line in m.collect()]
+        return ("\n".join(lines) + "\n").encode()
+
+    def response(self) -> Response:
+        return Response(self.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+registry = Registry()
+
+http_request_seconds = registry.register(Histogram(
+    "agentkred_http_request_seconds", "Request latency by route template", ("method", "route", "status")))
+db_statement_seconds = registry.register(Histogram(
+    "agentkred_db_statement_seconds", "Cursor execution time by statement verb and table", ("operation", "table")))
+signature_verify_seconds = registry.register(Histogram(
+    "agentkred_signature_verify_seconds", "Ed25519 request signature check, including any executor hand-off", ("mode", "valid"), FAST_BUCKETS))
+outbound_request_seconds = registry.register(Histogram(
+    "agentkred_outbound_request_seconds", "Outbound proof fetches by host and outcome", ("host", "outcome")))
+
+# --- Route Timing ---
+class MetricsMiddleware:
+    """Pure ASGI middleware: times each HTTP request under its route template (so /agent/{agent_id}, not each id)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start": status = message["status"]
+            await send(message)
+        try: await self.app(scope, receive, send_status)
+        finally:
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't grow the series
+            http_request_seconds.observe(time.perf_counter() - start, scope["method"], getattr(route, "path", "<unmatched>"), status)
+
+# --- DB Statement Timing ---
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+[\"`]?(\w+)", re.IGNORECASE)
+
+def statement_labels(statement: str) -> tuple:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    if verb not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY"): verb = "OTHER"
+    m = _TABLE.search(statement)
+    return verb, m.group(1).lower() if m else ""
+
+def instrument_engine(engine, histogram: Histogram = db_statement_seconds, known_tables: Optional[set] = None):
+    """Time every cursor execution of ``engine`` (an AsyncEngine or Engine)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    labels_cache: dict[str, tuple] = {} # statements are few and repeat; parse each once
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["_metrics_start"].pop()
+        labels = labels_cache.get(statement)
+        if labels is None:
+            labels = statement_labels(statement)
+            if known_tables is not None and labels[1] not in known_tables: labels = (labels[0], "")
+            if len(labels_cache) < 4096: labels_cache[statement] = labels
+        histogram.observe(elapsed, *labels)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("_metrics_start") if context.connection is not None else None
+        if stack: stack.pop()
+
+METRICS = os.getenv("METRICS", "1") == "1" # 0: no middleware or engine events at all
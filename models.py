@@ -1,11 +1,65 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey, Float, Text
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Boolean, ForeignKey, Float, Text, Index, UniqueConstraint, DDL, case, event, func, literal_column, update, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from dataclasses import dataclass
 from datetime import datetime
+import os
 
 Base = declarative_base()
 
+# --- SQL-side scoring ---
+class trunc_int(FunctionElement):
+    """int(x) in SQL: truncate toward zero (Postgres CAST rounds, SQLite CAST truncates)."""
+    type = Integer()
+    inherit_cache = True
+
+@compiles(trunc_int)
+def _trunc_int_default(element, compiler, **kw):
+    return "CAST(%s AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+@compiles(trunc_int, "postgresql")
+def _trunc_int_pg(element, compiler, **kw):
+    return "CAST(TRUNC(%s) AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+# --- Score Formulas ---
+# trust_score = base + verification + review + int(karma * karma_weight) + min(int(stake), stake_cap)
+# Each formula is versioned; rows record the version they were scored with
+# (Agent.score_version) so rescore.py can migrate the table to a new one.
+@dataclass(frozen=True)
+class ScoreFormula:
+    version: int
+    base: int = 10
+    karma_weight: float = 0.5
+    stake_cap: int = 1000
+
+    def compute(self, verification_score, review_score, moltbook_karma, staked_amount) -> int:
+        stake_points = min(int(staked_amount), self.stake_cap)
+        return self.base + verification_score + review_score + int(moltbook_karma * self.karma_weight) + stake_points
+
+    def sql(self, verification_score, review_score, moltbook_karma, staked_amount):
+        stake_points = trunc_int(staked_amount)
+        return (self.base + verification_score + review_score + trunc_int(moltbook_karma * self.karma_weight)
+                + case((stake_points > self.stake_cap, self.stake_cap), else_=stake_points))
+
+    def vectorized(self, verification_score, review_score, moltbook_karma, staked_amount):
+        """Same formula over NumPy column arrays."""
+        import numpy as np
+        stake_points = np.minimum(np.trunc(staked_amount), self.stake_cap)
+        return (self.base + verification_score + review_score + np.trunc(moltbook_karma * self.karma_weight) + stake_points).astype(np.int64)
+
+SCORE_FORMULAS = {1: ScoreFormula(1)}
+SCORE_VERSION = int(os.getenv("SCORE_FORMULA_VERSION", "1"))
+
+def current_formula() -> ScoreFormula:
+    return SCORE_FORMULAS[SCORE_VERSION]
+
+def trust_score_sql(verification_score, review_score, moltbook_karma, staked_amount):
+    """SQL mirror of Agent.calculate_total_score, for atomic UPDATE ... SET trust_score = ..."""
+    return current_formula().sql(verification_score, review_score, moltbook_karma, staked_amount)
+
 class Agent(Base):
     __tablename__ = "agents"
 
@@ -27,18 +81,36 @@ class Agent(Base):
     staked_amount = Column(Float, default=0.0)
     staking_tx_hash = Column(String, nullable=True)
     last_active_at = Column(DateTime, default=datetime.utcnow)
+    score_version = Column(Integer, default=lambda ctx: SCORE_VERSION) # ScoreFormula that produced trust_score
+    graph_score = Column(Integer, default=0) # Propagated trust over the review graph (trust_graph.py)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) # any write, for incremental exports
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1")) # bumped by every UPDATE; ETags
     
     # Relationships
     verifications = relationship("Verification", back_populates="agent")
     reviews_given = relationship("Review", foreign_keys="Review.reviewer_id", back_populates="reviewer")
     reviews_received = relationship("Review", foreign_keys="Review.target_id", back_populates="target")
 
+    # Keyset pagination for /agents/top: (sort column, id) per sort key
+    __table_args__ = (
+        Index("ix_agents_trust_score_id", "trust_score", "id"),
+        Index("ix_agents_staked_amount_id", "staked_amount", "id"),
+        Index("ix_agents_review_score_id", "review_score", "id"),
+        Index("ix_agents_last_active_at_id", "last_active_at", "id"),
+        # GET /agents/export?updated_since=
+        Index("ix_agents_updated_at_id", "updated_at", "id"),
+        # /agents/search name prefix (LIKE on Postgres needs text_pattern_ops) and bio words (search.py)
+        Index("ix_agents_name_lower", func.lower(name).label("name_lower"), postgresql_ops={"name_lower": "text_pattern_ops"}),
+        Index("ix_agents_bio_tsv", func.to_tsvector(literal_column("'simple'"), func.coalesce(bio, literal_column("''"))),
+              postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+    # Read the bumped version back with RETURNING instead of expiring it
+    __mapper_args__ = {"eager_defaults": True}
+
     def calculate_total_score(self):
-        base = 10
-        karma_points = int(self.moltbook_karma * 0.5)
-        stake_points = int(self.staked_amount)
-        if stake_points > 1000: stake_points = 1000
-        self.trust_score = base + self.verification_score + self.review_score + karma_points + stake_points
+        formula = current_formula()
+        self.trust_score = formula.compute(self.verification_score, self.review_score, self.moltbook_karma, self.staked_amount)
+        self.score_version = formula.version
         return self.trust_score
 
 class Verification(Base):
@@ -49,8 +121,17 @@ class Verification(Base):
     proof_url = Column(String)
     is_verified = Column(Boolean, default=False)
     verified_at = Column(DateTime, nullable=True)
+
+    # Job state for asynchronous checks (see verify_worker.py)
+    status = Column(String, default="verified") # pending | running | verified | failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, nullable=True) # retry time, or lease expiry while running
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
     agent = relationship("Agent", back_populates="verifications")
 
+    __table_args__ = (Index("ix_verifications_status_next", "status", "next_attempt_at"),)
+
 class Review(Base):
     __tablename__ = "reviews"
     id = Column(Integer, primary_key=True, index=True)
@@ -61,3 +142,77 @@ class Review(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     reviewer = relationship("Agent", foreign_keys=[reviewer_id], back_populates="reviews_given")
     target = relationship("Agent", foreign_keys=[target_id], back_populates="reviews_received")
+
+    __table_args__ = (
+        # Keyset pagination for /agent/{id}/reviews
+        Index("ix_reviews_target_created", "target_id", "created_at", "id"),
+        # Reciprocal-review check in /review
+        Index("ix_reviews_reviewer_target", "reviewer_id", "target_id"),
+        # trust_graph.sync picks new reviews up by time
+        Index("ix_reviews_created", "created_at"),
+    )
+
+# --- Search (search.py) ---
+class AgentTag(Base):
+    """Agent.tags normalized, one row per (agent, tag); rewritten with the agent's tags."""
+    __tablename__ = "agent_tags"
+    agent_id = Column(String, ForeignKey("agents.id"), primary_key=True)
+    tag = Column(String, primary_key=True) # lowercase
+
+    __table_args__ = (Index("ix_agent_tags_tag", "tag", "agent_id"),)
+
+# SQLite has no GIN: bio words live in an FTS5 table, rowid derived from the agent id
+event.listen(Base.metadata, "after_create", DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS agent_bio_fts USING fts5(agent_id UNINDEXED, bio, tokenize='unicode61 remove_diacritics 0')"
+).execute_if(dialect="sqlite"))
+event.listen(Base.metadata, "before_drop", DDL("DROP TABLE IF EXISTS agent_bio_fts").execute_if(dialect="sqlite"))
+
+# --- On-chain Staking (chain_indexer.py) ---
+class StakeEvent(Base):
+    """One decoded AgentVault log. agent_id is NULL when no registered agent hashes to agent_topic."""
+    __tablename__ = "stake_events"
+    id = Column(Integer, primary_key=True)
+    block_number = Column(BigInteger, nullable=False)
+    block_hash = Column(String, nullable=False)
+    tx_hash = Column(String, nullable=False)
+    log_index = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False) # staked | unstake_requested | withdrawn | slashed
+    agent_topic = Column(String, nullable=False) # keccak256(agentId), as indexed in the log
+    agent_id = Column(String, ForeignKey("agents.id"), nullable=True)
+    amount = Column(String, nullable=False) # uint256 in token base units, as a decimal string
+    delta = Column(Float, nullable=False) # change to staked_amount, in whole tokens
+    release_time = Column(BigInteger, nullable=True)
+    reason = Column(String, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("tx_hash", "log_index", name="uq_stake_events_log"),
+        # Reorg rollback deletes everything above a block
+        Index("ix_stake_events_block", "block_number"),
+        Index("ix_stake_events_agent", "agent_id", "block_number"),
+    )
+
+class IndexerCheckpoint(Base):
+    """Last block an indexer has fully applied, with its hash to detect reorgs."""
+    __tablename__ = "indexer_checkpoints"
+    name = Column(String, primary_key=True)
+    block_number = Column(BigInteger, nullable=False)
+    block_hash = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+def score_update(agent_id: str, verification_score: int = 0, staked_amount: float = 0.0, **values):
+    """UPDATE agents SET col = col + delta, trust_score = <formula> WHERE id = :id RETURNING *.
+
+    One atomic round trip; concurrent writers can't overwrite each other's
+    increments. Extra plain assignments go in ``values``. Executing it
+    refreshes the Agent already in the session, if any.
+    """
+    verification = Agent.verification_score + verification_score
+    staked = Agent.staked_amount + staked_amount
+    return (
+        update(Agent).where(Agent.id == agent_id)
+        .values(verification_score=verification, staked_amount=staked,
+                trust_score=trust_score_sql(verification, Agent.review_score, Agent.moltbook_karma, staked),
+                score_version=SCORE_VERSION, **values)
+        .returning(Agent)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
@@ -0,0 +1,22 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import datetime
+from fastapi import HTTPException
+import json
+
+# --- Keyset Cursors ---
+# A cursor is the sort key of the last row on a page, e.g. (trust_score, id),
+# serialized as url-safe base64 JSON. Clients treat it as opaque and pass it
+# back as ?cursor= to get the rows strictly after it.
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Inverse of encode_cursor; ``types`` gives the Python type of each key part."""
+    try:
+        values = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types): raise ValueError
+        return tuple(datetime.fromisoformat(v) if t is datetime else t(v) for v, t in zip(values, types))
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
@@ -0,0 +1,191 @@
+from collections import Counter, deque
+from typing import Optional
+import asyncio
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+# --- Slow-Request Profiler ---
+# A sampling profiler for requests, off unless PROFILER=1 or switched on with
+# a signed POST /admin/profiler. While on, requests are registered with a
+# sampler thread that wakes every interval and records, for each one, either
+# the stack the event loop thread is running inside it, or, if the request is
+# suspended, its chain of awaiting coroutines ending in "[await <what>]"
+# (a DB round trip shows up as an await under the SQLAlchemy frames).
+#
+# A request is kept if it was picked by sample_rate or took slow_ms or more;
+# with slow_ms set every request is sampled, since slowness is only known at
+# the end. Kept profiles are written in folded-stack format (one
+# "frame;frame;frame count" line per stack, for flamegraph.pl or speedscope)
+# to a ring of max_files files in PROFILER_DIR, listed and downloaded through
+# /admin/profiles. When off, the middleware does one attribute check and no
+# thread runs.
+
+class Recording:
+    __slots__ = ("task", "anchor", "thread_id", "samples")
+
+    def __init__(self, task: asyncio.Task, anchor, thread_id: int):
+        self.task = task
+        self.anchor = anchor # the middleware's frame: stacks start there
+        self.thread_id = thread_id
+        self.samples: Counter = Counter()
+
+class SamplingProfiler:
+    def __init__(self, directory: str = "profiles", max_files: int = 200, interval: float = 0.005,
+                 sample_rate: float = 0.0, slow_seconds: float = 1.0, enabled: bool = False):
+        self.directory = directory
+        self.max_files = max_files
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.enabled = False
+        self._active: dict[int, Recording] = {}
+        self._lock = threading.Lock() # held by the sampler for a whole pass over _active
+        self._labels: dict = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._save_lock = threading.Lock()
+        self._files: Optional[deque] = None
+        self._seq = 0
+        self.profiled = 0
+        self.saved = 0
+        self.samples = 0
+        if enabled: self.configure(enabled=True)
+
+    # --- Control ---
+    def configure(self, enabled: Optional[bool] = None, sample_rate: Optional[float] = None, slow_seconds: Optional[float] = None):
+        if sample_rate is not None: self.sample_rate = sample_rate
+        if slow_seconds is not None: self.slow_seconds = slow_seconds
+        if enabled is None or enabled == self.enabled: return
+        self.enabled = enabled
+        if enabled:
+            if self._thread is not None: self._thread.join() # the previous sampler sees _stop within one interval
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+        else:
+            self._stop.set()
+            with self._lock: self._active.clear()
+
+    def wants(self) -> bool:
+        """Whether to record the request that is starting."""
+        return self.slow_seconds > 0 or random.random() < self.sample_rate
+
+    def begin(self, anchor) -> Recording:
+        rec = Recording(asyncio.current_task(), anchor, threading.get_ident())
+        with self._lock: self._active[id(rec)] = rec
+        return rec
+
+    def end(self, rec: Recording):
+        """Stop sampling ``rec``; once this returns the sampler no longer touches it, so it can be saved from another thread."""
+        with self._lock: self._active.pop(id(rec), None)
+
+    # --- Sampling ---
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for rec in self._active.values():
+                    stack = self._running_stack(frames.get(rec.thread_id), rec) or self._awaiting_stack(rec)
+                    if stack:
+                        rec.samples[stack] += 1
+                        self.samples += 1
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _running_stack(self, frame, rec: Recording) -> Optional[str]:
+        stack = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            if frame is rec.anchor: return ";".join(reversed(stack))
+            frame = frame.f_back
+        return None # the loop is running something else
+
+    def _awaiting_stack(self, rec: Recording) -> Optional[str]:
+        obj, stack, started = rec.task.get_coro(), [], False
+        while obj is not None:
+            frame = getattr(obj, "cr_frame", None) or getattr(obj, "gi_frame", None) or getattr(obj, "ag_frame", None)
+            if frame is None: break
+            started = started or frame is rec.anchor
+            if started: stack.append(self._label(frame.f_code))
+            obj = getattr(obj, "cr_await", None) or getattr(obj, "gi_yieldfrom", None) or getattr(obj, "ag_await", None)
+        if not stack: return None
+        if obj is not None: stack.append(f"[await {type(obj).__name__}]")
+        return ";".join(stack)
+
+    # --- Storage ---
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(".folded"))
+        self._files = deque(names)
+        self._seq = int(names[-1].split("_", 1)[0]) + 1 if names else 0
+
+    def save(self, rec: Recording, method: str, route: str, seconds: float) -> Optional[str]:
+        """Write ``rec`` as a folded-stack file; returns its name."""
+        if not rec.samples: return None
+        with self._save_lock: return self._save(rec, method, route, seconds)
+
+    def _save(self, rec: Recording, method: str, route: str, seconds: float) -> str:
+        if self._files is None: self._load()
+        name = f"{self._seq:08d}_{int(time.time())}_{method}_{re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'}_{int(seconds * 1000)}ms.folded"
+        self._seq += 1
+        with open(os.path.join(self.directory, name), "w") as f:
+            f.writelines(f"{stack} {n}\n" for stack, n in rec.samples.most_common())
+        self._files.append(name)
+        while len(self._files) > self.max_files:
+            try: os.remove(os.path.join(self.directory, self._files.popleft()))
+            except FileNotFoundError: pass
+        self.saved += 1
+        return name
+
+    def list(self) -> list[str]:
+        if self._files is None: self._load()
+        return list(reversed(self._files))
+
+    def path(self, name: str) -> Optional[str]:
+        if self._files is None: self._load()
+        return os.path.join(self.directory, name) if name in self._files else None
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "sample_rate": self.sample_rate, "slow_ms": int(self.slow_seconds * 1000),
+                "interval_ms": self.interval * 1000, "in_flight": len(self._active), "profiled": self.profiled,
+                "saved": self.saved, "samples": self.samples}
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware feeding SamplingProfiler; a pass-through while it is off."""
+
+    def __init__(self, app, profiler: "SamplingProfiler"):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        profiler = self.profiler
+        if not profiler.enabled or scope["type"] != "http" or not profiler.wants():
+            return await self.app(scope, receive, send)
+        sampled = profiler.slow_seconds <= 0 or random.random() < profiler.sample_rate
+        rec = profiler.begin(sys._getframe())
+        start = time.perf_counter()
+        try: await self.app(scope, receive, send)
+        finally:
+            profiler.end(rec)
+            profiler.profiled += 1
+            elapsed = time.perf_counter() - start
+            if sampled or elapsed >= profiler.slow_seconds:
+                route = getattr(scope.get("route"), "path", scope["path"])
+                await asyncio.to_thread(profiler.save, rec, scope["method"], route, elapsed)
+
+profiler = SamplingProfiler(
+    directory=os.getenv("PROFILER_DIR", "profiles"),
+    max_files=int(os.getenv("PROFILER_MAX_FILES", "200")),
+    interval=float(os.getenv("PROFILER_INTERVAL_MS", "5")) / 1000,
+    sample_rate=float(os.getenv("PROFILER_SAMPLE_RATE", "0")),
+    slow_seconds=float(os.getenv("PROFILER_SLOW_MS", "1000")) / 1000,
+    enabled=os.getenv("PROFILER", "0") == "1",
+)
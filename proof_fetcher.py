@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from typing import Callable, Optional
+from urllib.parse import urlsplit, urlunsplit
+import asyncio
+from metrics import outbound_request_seconds
+import httpx
+import os
+import time
+
+# --- Proof Fetcher ---
+# One pooled httpx client for GitHub/Twitter proof checks, started and closed
+# by the app lifespan. Results are cached per (platform, normalized URL,
+# agent_id): confirmed proofs for POSITIVE_TTL, definite failures (non-200,
+# missing marker, oversized body) for NEGATIVE_TTL. Transport errors and 5xx
+# are not cached so a flaky upstream can be retried right away.
+
+class ProofFetchError(Exception):
+    """The proof could not be fetched for a transient reason (timeout, 5xx)."""
+
+class ProofFetcher:
+    def __init__(self, max_connections: int = 100, per_host: int = 8, timeout: float = 5.0, max_bytes: int = 256 * 1024,
+                 positive_ttl: float = 3600.0, negative_ttl: float = 60.0, cache_size: int = 10_000,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.cache_size = cache_size
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: dict[str, list] = {} # host -> [semaphore, fetches holding or waiting for it]
+        self._cache: "OrderedDict[tuple, tuple[bool, float]]" = OrderedDict()
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.oversized = 0
+        self.fetch_seconds_total = 0.0
+        self.fetch_seconds_max = 0.0
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                transport=self.transport,
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def normalize(url: str) -> str:
+        parts = urlsplit(url.strip())
+        host = parts.netloc.lower()
+        if host in ("x.com", "www.x.com", "www.twitter.com"): host = "twitter.com"
+        return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip("/"), parts.query, ""))
+
+    async def check(self, platform: str, proof_url: str, agent_id: str, fetch_url: str, accept: Callable[[str], bool], headers: Optional[dict] = None, strict: bool = False) -> bool:
+        """Fetch ``fetch_url`` and run ``accept`` on the body, with caching and request coalescing.
+
+        With ``strict``, a transient failure raises ProofFetchError instead of returning False.
+        """
+        key = (platform, self.normalize(proof_url), agent_id)
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry[1] >= time.monotonic():
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return entry[0]
+            del self._cache[key]
+        self.cache_misses += 1
+
+        # Identical checks already in flight share one upstream request
+        if key in self._inflight and not strict: return await asyncio.shield(self._inflight[key])
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            text, definite = await self.fetch(fetch_url, headers)
+            try: ok = text is not None and accept(text)
+            except Exception: ok = False
+            if definite or ok: self._remember(key, ok)
+            fut.set_result(ok)
+            if strict and not definite and not ok: raise ProofFetchError(f"Transient failure fetching the {platform} proof") # no URL: last_error is public
+            return ok
+        except BaseException:
+            if not fut.done(): fut.set_result(False) # waiters see an uncached failure
+            raise
+        finally:
+            if self._inflight.get(key) is fut: del self._inflight[key]
+
+    def _remember(self, key: tuple, ok: bool):
+        if self.cache_size <= 0: return
+        self._cache[key] = (ok, time.monotonic() + (self.positive_ttl if ok else self.negative_ttl))
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+
+    async def fetch(self, url: str, headers: Optional[dict] = None) -> tuple[Optional[str], bool]:
+        """GET ``url`` -> (body or None, whether the outcome is definite enough to cache)."""
+        await self.start()
+        host = urlsplit(url).netloc.lower()
+        # Only hosts with a fetch in progress keep an entry, so arbitrary proof hosts can't grow the map
+        slot = self._host_limits.get(host)
+        if slot is None: slot = self._host_limits[host] = [asyncio.Semaphore(self.per_host), 0]
+        slot[1] += 1
+        self.fetches += 1
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with slot[0], self._client.stream("GET", url, headers=headers) as resp:
+                outcome = f"{resp.status_code // 100}xx"
+                if resp.status_code >= 500: return None, False
+                if resp.status_code != 200: return None, True
+                if int(resp.headers.get("content-length") or 0) > self.max_bytes:
+                    self.oversized += 1
+                    outcome = "oversized"
+                    return None, True
+                body = bytearray()
+                async for chunk in resp.aiter_bytes():
+                    body += chunk
+                    if len(body) > self.max_bytes:
+                        self.oversized += 1
+                        outcome = "oversized"
+                        return None, True
+                return body.decode(resp.encoding or "utf-8", errors="replace"), True
+        except httpx.HTTPError:
+            self.fetch_errors += 1
+            outcome = "error"
+            return None, False
+        finally:
+            slot[1] -= 1
+            if not slot[1]: del self._host_limits[host]
+            elapsed = time.perf_counter() - start
+            self.fetch_seconds_total += elapsed
+            self.fetch_seconds_max = max(self.fetch_seconds_max, elapsed)
+            outbound_request_seconds.observe(elapsed, host, outcome)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "cache_size": len(self._cache), "cache_hits": self.cache_hits, "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "fetches": self.fetches, "fetch_errors": self.fetch_errors, "oversized": self.oversized,
+            "fetch_seconds_avg": self.fetch_seconds_total / self.fetches if self.fetches else 0.0,
+            "fetch_seconds_max": self.fetch_seconds_max,
+        }
+
+proof_fetcher = ProofFetcher(
+    max_connections=int(os.getenv("PROOF_FETCH_MAX_CONNECTIONS", "100")),
+    per_host=int(os.getenv("PROOF_FETCH_PER_HOST", "8")),
+    timeout=float(os.getenv("PROOF_FETCH_TIMEOUT", "5")),
+    max_bytes=int(os.getenv("PROOF_FETCH_MAX_BYTES", str(256 * 1024))),
+    positive_ttl=float(os.getenv("PROOF_CACHE_TTL", "3600")),
+    negative_ttl=float(os.getenv("PROOF_CACHE_NEGATIVE_TTL", "60")),
+)
+
+TWITTER_OEMBED_URL = os.getenv("TWITTER_OEMBED_URL", "https://publish.twitter.com/oembed")
@@ -0,0 +1,136 @@
+from fastapi import HTTPException
+from math import ceil
+from typing import NamedTuple, Optional
+import os
+import time
+
+# --- Rate Limiting ---
+# Token buckets per (endpoint, agent) and per endpoint across all agents,
+# checked after the signature so only real agents spend tokens. A bucket is
+# [tokens, last update, time it will be full again]; refill is computed lazily
+# on access. A bucket that has refilled completely is indistinguishable from
+# a missing one, so a sweep drops those, one shard every SWEEP_EVERY checks,
+# and memory tracks the number of recently active agents.
+#
+# Everything runs on the event loop between awaits, so the buckets need no
+# locks; the shards only keep each sweep short. Limits are per process: with
+# N workers an agent gets up to N times the configured rate.
+#
+# RATE_LIMITS / RATE_LIMITS_GLOBAL: "path=count/seconds[:burst],..."
+# RATE_LIMIT_AGENTS: "agent_id=multiplier,..." (scales rate and burst)
+
+class Limit(NamedTuple):
+    rate: float # tokens per second
+    burst: float # bucket size
+
+def parse_limits(spec: str) -> dict[str, Limit]:
+    limits = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        path, rule = item.split("=")
+        count, _, rest = rule.partition("/")
+        seconds, _, burst = rest.partition(":")
+        limits[path.strip()] = Limit(float(count) / float(seconds or 1), float(burst or count))
+    return limits
+
+class TokenBuckets:
+    def __init__(self, shards: int = 256, sweep_every: int = 1024):
+        self._shards: list[dict] = [{} for _ in range(shards)]
+        self.sweep_every = sweep_every
+        self._ops = 0
+        self._next_sweep = 0
+        self.evictions = 0
+
+    def take(self, key, limit: Limit, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Spend ``cost`` tokens; returns 0.0 if allowed, else seconds until it would be."""
+        if now is None: now = time.monotonic()
+        self._ops += 1
+        if self._ops % self.sweep_every == 0: self.sweep(now)
+        shard = self._shards[hash(key) % len(self._shards)]
+        bucket = shard.get(key)
+        tokens = limit.burst if bucket is None else min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+        wait = 0.0
+        if tokens >= cost: tokens -= cost
+        else: wait = (cost - tokens) / limit.rate if limit.rate > 0 else float("inf")
+        full_at = now + (limit.burst - tokens) / limit.rate if limit.rate > 0 else float("inf")
+        if bucket is None: shard[key] = [tokens, now, full_at]
+        else: bucket[0], bucket[1], bucket[2] = tokens, now, full_at
+        return wait
+
+    def refund(self, key, cost: float = 1.0):
+        bucket = self._shards[hash(key) % len(self._shards)].get(key)
+        if bucket is not None: bucket[0] += cost
+
+    def sweep(self, now: Optional[float] = None):
+        """Drop the full buckets of the next shard."""
+        if now is None: now = time.monotonic()
+        shard = self._shards[self._next_sweep]
+        self._next_sweep = (self._next_sweep + 1) % len(self._shards)
+        full = [key for key, bucket in shard.items() if bucket[2] <= now]
+        for key in full: del shard[key]
+        self.evictions += len(full)
+
+    def __len__(self):
+        return sum(len(s) for s in self._shards)
+
+class RateLimiter:
+    def __init__(self, limits: dict[str, Limit], global_limits: Optional[dict[str, Limit]] = None,
+                 agent_multipliers: Optional[dict[str, float]] = None, enabled: bool = True):
+        self.limits = limits
+        self.global_limits = global_limits or {}
+        self.agent_multipliers = agent_multipliers or {}
+        self.enabled = enabled
+        self.buckets = TokenBuckets()
+        self.allowed = 0
+        self.limited = 0
+
+    def _agent_limit(self, endpoint: str, agent_id: str) -> Optional[Limit]:
+        limit = self.limits.get(endpoint)
+        m = self.agent_multipliers.get(agent_id)
+        if limit is None or m is None: return limit
+        return Limit(limit.rate * m, limit.burst * m)
+
+    def check(self, endpoint: str, agent_id: str, cost: float = 1.0):
+        """Spend ``cost`` from the agent's and the endpoint's buckets, or raise 429."""
+        if not self.enabled or cost <= 0: return
+        now = time.monotonic()
+        limit = self._agent_limit(endpoint, agent_id)
+        if limit is not None:
+            if cost > limit.burst: self._reject(None, "Request exceeds rate limit burst")
+            wait = self.buckets.take((endpoint, agent_id), limit, cost, now)
+            if wait: self._reject(wait)
+        total = self.global_limits.get(endpoint)
+        if total is not None:
+            wait = self.buckets.take(endpoint, total, cost, now)
+            if wait:
+                if limit is not None: self.buckets.refund((endpoint, agent_id), cost)
+                self._reject(wait)
+        self.allowed += 1
+
+    def refund(self, endpoint: str, agent_id: str, cost: float = 1.0):
+        """Give back what check() spent, for a request refused after it (e.g. a replay)."""
+        if not self.enabled or cost <= 0: return
+        if self.limits.get(endpoint) is not None: self.buckets.refund((endpoint, agent_id), cost)
+        if self.global_limits.get(endpoint) is not None: self.buckets.refund(endpoint, cost)
+        self.allowed -= 1
+
+    def _reject(self, wait: Optional[float], detail: str = "Rate limit exceeded"):
+        self.limited += 1
+        headers = {"Retry-After": str(max(1, ceil(wait)))} if wait is not None and wait != float("inf") else None
+        raise HTTPException(429, detail, headers=headers)
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "buckets": len(self.buckets), "evictions": self.buckets.evictions,
+                "allowed": self.allowed, "limited": self.limited}
+
+# Batched operations are charged to their own endpoints, so a burst also caps
+# how many of one kind a single batch may carry.
+DEFAULT_RATE_LIMITS = "/review=120/60,/stake=120/60,/agent/update=60/60,/batch=30/60,/verify=10/60:5"
+# /verify makes outbound GitHub/Twitter calls whoever asks
+DEFAULT_GLOBAL_RATE_LIMITS = "/verify=20/1:50"
+
+rate_limiter = RateLimiter(
+    parse_limits(os.getenv("RATE_LIMITS", DEFAULT_RATE_LIMITS)),
+    parse_limits(os.getenv("RATE_LIMITS_GLOBAL", DEFAULT_GLOBAL_RATE_LIMITS)),
+    {k: float(v) for k, v in (item.split("=") for item in filter(None, os.getenv("RATE_LIMIT_AGENTS", "").split(",")))},
+    enabled=os.getenv("RATE_LIMIT", "1") == "1",
+)
@@ -0,0 +1,120 @@
+from typing import Optional
+import os
+
+try:
+    import redis.asyncio as aioredis
+except ImportError: # optional: pip install redis
+    aioredis = None
+
+# --- Replay Protection ---
+# A signed request is valid for REPLAY_WINDOW seconds either side of its
+# X-Timestamp. Within that window its signature is remembered, and a second
+# request carrying the same signature is rejected. Ed25519 signatures are
+# deterministic, so this catches byte-for-byte replays; a retried request
+# needs a fresh timestamp (wait a second) to get through.
+#
+# LocalReplayStore keeps one set per timestamp second in a ring of
+# 2 * window + 2 slots. A slot is reused only by a timestamp one full ring
+# later, by which point its old second is outside the window, so expiry is
+# dropping one set. Entries are the first 16 bytes of the signature as an
+# int. Per-second sets are capped at max_entries / slots; a full second
+# rejects further requests rather than forgetting what it has seen. One
+# agent may fill at most agent_share of a second, so a single signer (rate
+# limits off, or many endpoints at once) is refused on its own (429)
+# before it can lock everyone else out (503).
+#
+# With several uvicorn workers use REPLAY_STORE=redis so they share state
+# (SET NX EX per signature).
+
+REPLAY_WINDOW = int(os.getenv("REPLAY_WINDOW", "60"))
+
+class ReplayStoreFull(Exception):
+    """No room to remember this signature; the request must be refused."""
+
+class ReplayAgentFull(ReplayStoreFull):
+    """This agent has used its share of the second."""
+
+class LocalReplayStore:
+    def __init__(self, window: int = REPLAY_WINDOW, max_entries: int = 2_000_000, agent_share: float = 0.1):
+        self.window = window
+        self.slots = 2 * window + 2
+        self.max_entries = max_entries
+        self.per_second = max(1, max_entries // self.slots)
+        self.per_agent = max(1, int(self.per_second * agent_share))
+        self._seconds: list[Optional[int]] = [None] * self.slots
+        self._seen: list[set] = [set() for _ in range(self.slots)]
+        self._agents: list[dict] = [{} for _ in range(self.slots)] # agent id -> signatures this second
+        self.checks = 0
+        self.replays = 0
+        self.rejected_full = 0
+        self.rejected_agent = 0
+
+    async def seen(self, signature: bytes, timestamp: int, agent_id: str = "") -> bool:
+        """Record ``signature``; True if it was already recorded for this window."""
+        self.checks += 1
+        slot = timestamp % self.slots
+        bucket, agents = self._seen[slot], self._agents[slot]
+        if self._seconds[slot] != timestamp:
+            self._seconds[slot] = timestamp
+            bucket, agents = self._seen[slot], self._agents[slot] = set(), {}
+        key = int.from_bytes(signature[:16], "big")
+        if key in bucket:
+            self.replays += 1
+            return True
+        used = agents.get(agent_id, 0)
+        if used >= self.per_agent:
+            self.rejected_agent += 1
+            raise ReplayAgentFull()
+        if len(bucket) >= self.per_second:
+            self.rejected_full += 1
+            raise ReplayStoreFull()
+        bucket.add(key)
+        agents[agent_id] = used + 1
+        return False
+
+    def clear(self):
+        self._seconds = [None] * self.slots
+        self._seen = [set() for _ in range(self.slots)]
+        self._agents = [{} for _ in range(self.slots)]
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "local", "entries": sum(len(s) for s in self._seen), "max_entries": self.max_entries,
+                "checks": self.checks, "replays": self.replays, "rejected_full": self.rejected_full, "rejected_agent": self.rejected_agent}
+
+class RedisReplayStore:
+    def __init__(self, url: str, window: int = REPLAY_WINDOW, prefix: str = "agentkred:replay:"):
+        if aioredis is None: raise RuntimeError("REPLAY_STORE=redis needs the redis package (pip install redis)")
+        self.window = window
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url)
+        self.checks = 0
+        self.replays = 0
+
+    async def seen(self, signature: bytes, timestamp: int, agent_id: str = "") -> bool:
+        self.checks += 1
+        # Keys outlive the request's whole acceptance window, then Redis drops them
+        fresh = await self._redis.set(self.prefix + signature[:16].hex(), 1, nx=True, ex=2 * self.window + 1)
+        if fresh: return False
+        self.replays += 1
+        return True
+
+    def clear(self):
+        pass
+
+    async def close(self):
+        await self._redis.aclose()
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "checks": self.checks, "replays": self.replays}
+
+REPLAY_STORE = os.getenv("REPLAY_STORE", "local") # local | redis | off
+
+def build_replay_store():
+    if REPLAY_STORE == "off": return None
+    if REPLAY_STORE == "redis": return RedisReplayStore(os.getenv("REPLAY_REDIS_URL", "redis://localhost:6379/0"))
+    return LocalReplayStore(max_entries=int(os.getenv("REPLAY_MAX_ENTRIES", "2000000")), agent_share=float(os.getenv("REPLAY_AGENT_SHARE", "0.1")))
+
+replay_store = build_replay_store()
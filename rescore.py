@@ -0,0 +1,112 @@
+from typing import Callable, Optional
+from sqlalchemy import select, update, func, or_, bindparam
+from models import Agent, SCORE_FORMULAS, SCORE_VERSION
+import argparse
+import asyncio
+import time
+
+# --- Bulk Rescore ---
+# Recomputes agents.trust_score with a ScoreFormula across the whole table,
+# one chunk of ids per transaction. Every rescored row is stamped with the
+# formula version, and only rows on another version are selected, so an
+# interrupted run picks up where it stopped when started again.
+#
+# Rolling out a new formula: add it to models.SCORE_FORMULAS, deploy with
+# SCORE_FORMULA_VERSION=<new> (so live writes use it), then run
+#   python rescore.py --version <new>
+# API processes pick the rescored rows up (their updated_at moves) within
+# LEADERBOARD_SYNC_SECONDS.
+#
+# method="sql" runs one UPDATE ... SET trust_score = <formula> per chunk.
+# method="numpy" reads the score columns of a chunk, computes the formula as
+# array arithmetic and writes back with executemany; each row's UPDATE only
+# applies if its inputs haven't changed since they were read.
+
+def _stale(version: int):
+    return or_(Agent.score_version.is_(None), Agent.score_version != version)
+
+async def _count_stale(session_factory, version: int) -> int:
+    async with session_factory() as db:
+        return (await db.execute(select(func.count()).select_from(Agent).where(_stale(version)))).scalar()
+
+async def _sql_chunk(db, formula, after: str, chunk_size: int) -> tuple[int, Optional[str]]:
+    ids = select(Agent.id).where(Agent.id > after, _stale(formula.version)).order_by(Agent.id)
+    upper = (await db.execute(ids.offset(chunk_size - 1).limit(1))).scalar()
+    bounds = [Agent.id > after] + ([Agent.id <= upper] if upper is not None else [])
+    res = await db.execute(
+        update(Agent).where(*bounds, _stale(formula.version))
+        .values(trust_score=formula.sql(Agent.verification_score, Agent.review_score, Agent.moltbook_karma, Agent.staked_amount),
+                score_version=formula.version)
+        .execution_options(synchronize_session=False)
+    )
+    return res.rowcount, upper
+
+async def _numpy_chunk(db, formula, after: str, chunk_size: int) -> tuple[int, Optional[str]]:
+    import numpy as np
+    cols = (Agent.id, Agent.verification_score, Agent.review_score, Agent.moltbook_karma, Agent.staked_amount)
+    rows = (await db.execute(select(*cols).where(Agent.id > after, _stale(formula.version)).order_by(Agent.id).limit(chunk_size))).all()
+    if not rows: return 0, None
+    ids, verif, review, karma, stake = zip(*rows)
+    scores = formula.vectorized(np.array(verif, dtype=np.int64), np.array(review, dtype=np.int64),
+                                np.array(karma, dtype=np.int64), np.array(stake, dtype=np.float64))
+    t = Agent.__table__
+    stmt = (
+        update(t)
+        .where(t.c.id == bindparam("_id"), t.c.verification_score == bindparam("_v"), t.c.review_score == bindparam("_r"),
+               t.c.moltbook_karma == bindparam("_k"), t.c.staked_amount == bindparam("_s"))
+        .values(trust_score=bindparam("_score"), score_version=formula.version)
+    )
+    params = [{"_id": i, "_v": v, "_r": r, "_k": k, "_s": s, "_score": int(score)}
+              for i, v, r, k, s, score in zip(ids, verif, review, karma, stake, scores.tolist())]
+    await db.execute(stmt, params)
+    # Rows written concurrently were rescored by their writer; count the chunk as done
+    return len(rows), ids[-1] if len(rows) == chunk_size else None
+
+METHODS = {"sql": _sql_chunk, "numpy": _numpy_chunk}
+
+async def rescore(session_factory, version: int = SCORE_VERSION, chunk_size: int = 10_000, method: str = "sql",
+                  progress: Optional[Callable[[int, int], None]] = None, max_chunks: Optional[int] = None) -> dict:
+    """Rescore every agent not yet on ``version``; returns a summary dict.
+
+    ``progress(done, total)`` is called after each committed chunk. ``max_chunks``
+    stops early (the next call resumes).
+    """
+    if version not in SCORE_FORMULAS: raise ValueError(f"Unknown score formula version: {version}")
+    if method not in METHODS: raise ValueError(f"Unknown rescore method: {method}")
+    formula, run_chunk = SCORE_FORMULAS[version], METHODS[method]
+    total = await _count_stale(session_factory, version)
+    start = time.perf_counter()
+    done, chunks, after = 0, 0, ""
+    while done < total and (max_chunks is None or chunks < max_chunks):
+        async with session_factory() as db:
+            n, after = await run_chunk(db, formula, after, chunk_size)
+            await db.commit()
+        done += n
+        chunks += 1
+        if progress: progress(done, total)
+        if after is None: break
+    seconds = time.perf_counter() - start
+    return {"version": version, "method": method, "rescored": done, "total": total, "chunks": chunks,
+            "remaining": await _count_stale(session_factory, version), "seconds": seconds,
+            "rows_per_second": done / seconds if seconds else 0.0}
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Recompute trust_score for every agent with a versioned formula")
+    parser.add_argument("--version", type=int, default=SCORE_VERSION)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--method", choices=sorted(METHODS), default="sql")
+    parser.add_argument("--max-chunks", type=int, default=None)
+    args = parser.parse_args()
+
+    from database import AsyncSessionLocal, engine
+    def report(done, total):
+        print(f"\rrescored {done}/{total}", end="", flush=True)
+    try:
+        summary = await rescore(AsyncSessionLocal, args.version, args.chunk_size, args.method, report, args.max_chunks)
+    finally:
+        await engine.dispose()
+    print(f"\n{summary['rescored']} agents in {summary['chunks']} chunks, {summary['seconds']:.2f}s "
+          f"({summary['rows_per_second']:.0f} rows/s); {summary['remaining']} remaining")
+
+if __name__ == "__main__":
+    asyncio.run(_main())
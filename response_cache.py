@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Request, Response
+import hashlib
+import os
+
+# --- Rendered Response Cache ---
+# GET responses keyed by what they were rendered from: a route name, its
+# parameters and a version (Agent.version for profiles, the leaderboard's
+# generation and version for /agents/top). The key also yields a strong
+# ETag, so a client revalidating an unchanged page gets a 304 without the
+# body being rendered, and a changed-but-already-rendered page is served
+# from memory. Versions only move forward, so stale entries simply stop
+# being asked for and age out of the LRU.
+
+class CachedResponse:
+    __slots__ = ("etag", "body", "headers")
+
+    def __init__(self, etag: str, body: bytes, headers: dict):
+        self.etag = etag
+        self.body = body
+        self.headers = headers
+
+    def response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache", **self.headers}
+        if etag_matches(request, self.etag): return Response(status_code=304, headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header: return False
+    if header.strip() == "*": return True
+    # If-None-Match uses weak comparison: ignore W/ prefixes
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+class ResponseCache:
+    def __init__(self, max_size: int = 2048, salt: str = ""):
+        self.max_size = max_size
+        self.salt = salt # bump to invalidate every ETag, e.g. when the response schema changes
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def etag(self, key: tuple) -> str:
+        digest = hashlib.blake2b(repr((self.salt,) + key).encode(), digest_size=12).hexdigest()
+        return f'"{digest}"'
+
+    def check(self, request: Request, key: tuple) -> Optional[Response]:
+        """A 304, or the cached 200, for ``key`` if there is one; None means render it."""
+        if etag_matches(request, self.etag(key)):
+            self.not_modified += 1
+            return Response(status_code=304, headers={"ETag": self.etag(key), "Cache-Control": "no-cache"})
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.response(request)
+
+    def put(self, key: tuple, body: bytes, headers: Optional[dict] = None) -> CachedResponse:
+        entry = CachedResponse(self.etag(key), body, headers or {})
+        if self.max_size > 0:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size: self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses,
+                "not_modified": self.not_modified, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+response_cache = ResponseCache(
+    max_size=int(os.getenv("RESPONSE_CACHE_SIZE", "2048")),
+    salt=os.getenv("RESPONSE_CACHE_SALT", ""),
+)
@@ -0,0 +1,189 @@
+from datetime import datetime
+from hashlib import blake2b
+from typing import Iterable, Optional
+from fastapi import HTTPException
+from sqlalchemy import select, delete, exists, insert, func, bindparam, literal_column, text, tuple_
+from models import Agent, AgentTag
+import argparse
+import asyncio
+import re
+import time
+
+# --- Agent Search ---
+# GET /agents/search filters agents by tags (any or all of them), a name
+# prefix and words in the bio, highest trust_score first, with the same
+# keyset cursors as /agents/top. Each filter is an index lookup:
+#
+#   tags   agent_tags (tag, agent_id), rewritten by index_agents() whenever an
+#          agent's tags are written
+#   name   the lower(name) expression index: a range scan on SQLite, LIKE
+#          'prefix%' over text_pattern_ops on Postgres
+#   bio    Postgres: the GIN index on to_tsvector('simple', bio), kept by
+#          Postgres itself. SQLite: the agent_bio_fts FTS5 table, written
+#          by index_agents() like the tags
+#
+# Words match whole tokens, case insensitive, no stemming, all of them
+# required. Rows written outside the API (bulk_import.py, older
+# databases) are indexed with reindex():
+#
+#   python search.py [--since 2026-01-01T00:00:00]
+
+MAX_TAGS = 32 # per agent and per query
+MAX_TAG_LENGTH = 64
+FTS_PROBE = 4 # rowid slots tried per agent id; a hash collision takes the next one
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> list[str]:
+    """Lowercase, stripped, unique, in order; "coding, DeFi,,defi" -> ["coding", "defi"]."""
+    if isinstance(tags, str): tags = tags.split(",")
+    out = []
+    for tag in tags or ():
+        tag = tag.strip().lower()[:MAX_TAG_LENGTH]
+        if tag and tag not in out: out.append(tag)
+    return out[:MAX_TAGS]
+
+def words(query: str) -> list[str]:
+    """Tokens as FTS5's unicode61 tokenizer splits them: letters and digits."""
+    return re.findall(r"[^\W_]+", query.lower())
+
+def doc_rowid(agent_id: str) -> int:
+    return int.from_bytes(blake2b(agent_id.encode(), digest_size=8).digest(), "big") >> 2 # leaves room for the probe slots
+
+# --- Indexing ---
+async def index_agents(db, docs: list[tuple[str, Optional[str], Optional[str]]], chunk_size: int = 2000):
+    """(agent_id, tags, bio) rows: replace their tags and, on SQLite, their bio document. Doesn't commit."""
+    sqlite = db.bind.dialect.name == "sqlite"
+    for lo in range(0, len(docs), chunk_size):
+        chunk = docs[lo:lo + chunk_size]
+        ids = [agent_id for agent_id, _, _ in chunk]
+        await db.execute(delete(AgentTag).where(AgentTag.agent_id.in_(ids)))
+        tags = [{"agent_id": agent_id, "tag": tag} for agent_id, t, _ in chunk for tag in normalize_tags(t)]
+        if tags: await db.execute(insert(AgentTag), tags)
+        if sqlite: await _index_bios(db, [(agent_id, bio) for agent_id, _, bio in chunk])
+
+_FTS_TAKEN = text("SELECT rowid, agent_id FROM agent_bio_fts WHERE rowid IN :rowids").bindparams(bindparam("rowids", expanding=True))
+_FTS_DELETE = text("DELETE FROM agent_bio_fts WHERE rowid IN :rowids").bindparams(bindparam("rowids", expanding=True))
+_FTS_INSERT = text("INSERT INTO agent_bio_fts (rowid, agent_id, bio) VALUES (:rowid, :agent_id, :bio)")
+
+async def _index_bios(db, docs: list[tuple[str, Optional[str]]]):
+    slots = {agent_id: doc_rowid(agent_id) for agent_id, _ in docs}
+    taken = dict((await db.execute(_FTS_TAKEN, {"rowids": [s + k for s in slots.values() for k in range(FTS_PROBE)]})).all())
+    old = [rowid for rowid, agent_id in taken.items() if agent_id in slots]
+    if old: await db.execute(_FTS_DELETE, {"rowids": old})
+    for rowid in old: del taken[rowid]
+    rows = []
+    for agent_id, bio in docs:
+        if not bio: continue
+        rowid = slots[agent_id]
+        while rowid in taken: rowid += 1
+        taken[rowid] = agent_id
+        rows.append({"rowid": rowid, "agent_id": agent_id, "bio": bio})
+    if rows: await db.execute(_FTS_INSERT, rows)
+
+async def reindex(session_factory, updated_since: Optional[datetime] = None, chunk_size: int = 2000) -> dict:
+    """Index every agent (or those updated since ``updated_since``), one chunk per transaction."""
+    start = time.perf_counter()
+    done, after = 0, ""
+    while True:
+        async with session_factory() as db:
+            query = select(Agent.id, Agent.tags, Agent.bio).where(Agent.id > after)
+            if updated_since: query = query.where(Agent.updated_at >= updated_since)
+            docs = [tuple(row) for row in (await db.execute(query.order_by(Agent.id).limit(chunk_size))).all()]
+            if not docs: break
+            await index_agents(db, docs, chunk_size)
+            await db.commit()
+        done, after = done + len(docs), docs[-1][0]
+    return {"indexed": done, "seconds": time.perf_counter() - start}
+
+# --- Queries ---
+# Postgres gets one statement and its planner picks between scanning the
+# trust_score index and starting from the GIN/tag index. SQLite would
+# materialize every match and sort it (a common tag over 1M agents: ~1s), so
+# the choice is made here: each filter is probed for up to SELECTIVE ids, the
+# smallest candidate set under that drives the query, and with no selective
+# filter the trust_score index is walked in batches. Bio words not used as
+# the driver are checked on the fetched rows.
+SELECTIVE = 5000
+SCAN_BATCH = 2000
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _has_tag(*tags):
+    return exists().where(AgentTag.agent_id == Agent.id, AgentTag.tag.in_(tags))
+
+def _row_filters(dialect: str, tags: list[str], match_all: bool, name: Optional[str]) -> list:
+    out = [_has_tag(t) for t in tags] if match_all else [_has_tag(*tags)] if tags else []
+    if name:
+        prefix, lower_name = name.lower(), func.lower(Agent.name)
+        if dialect == "postgresql": out.append(lower_name.like(_escape_like(prefix) + "%", escape="\\"))
+        else: out += [lower_name >= prefix, lower_name < prefix + "\U0010ffff"]
+    return out
+
+def _page(query, limit: Optional[int], after: Optional[tuple]):
+    if after: query = query.where(tuple_(Agent.trust_score, Agent.id) < tuple_(*after))
+    query = query.order_by(Agent.trust_score.desc(), Agent.id.desc())
+    return query.limit(limit) if limit else query
+
+def search_query(columns, tags: list[str] = (), match_all: bool = False, name: Optional[str] = None,
+                 terms: list[str] = (), limit: int = 50, after: Optional[tuple] = None):
+    """The Postgres statement."""
+    query = select(*columns).where(*_row_filters("postgresql", tags, match_all, name))
+    if terms:
+        tsv = func.to_tsvector(literal_column("'simple'"), func.coalesce(Agent.bio, literal_column("''")))
+        query = query.where(tsv.op("@@")(func.plainto_tsquery(literal_column("'simple'"), " ".join(terms))))
+    return _page(query, limit, after)
+
+_FTS_MATCH = text("SELECT agent_id FROM agent_bio_fts WHERE agent_bio_fts MATCH :fts LIMIT :n")
+
+async def _sqlite_search(db, columns, tags: list[str], match_all: bool, name: Optional[str], terms: list[str],
+                         limit: int, after: Optional[tuple]) -> list:
+    probes = [select(AgentTag.agent_id).where(AgentTag.tag == t) for t in tags] if match_all else \
+             [select(AgentTag.agent_id).where(AgentTag.tag.in_(tags)).distinct()] if tags else []
+    if name: probes.append(select(Agent.id).where(*_row_filters("sqlite", [], False, name)))
+    candidates = None
+    for probe in probes:
+        ids = (await db.execute(probe.limit(SELECTIVE))).scalars().all()
+        if len(ids) < SELECTIVE and (candidates is None or len(ids) < len(candidates)): candidates = ids
+    by_bio = False
+    if terms:
+        ids = (await db.execute(_FTS_MATCH, {"fts": " ".join(f'"{t}"' for t in terms), "n": SELECTIVE})).scalars().all()
+        if len(ids) < SELECTIVE and (candidates is None or len(ids) < len(candidates)): candidates, by_bio = ids, True
+    check_bio = bool(terms) and not by_bio
+    query = select(*columns, Agent.bio).where(*_row_filters("sqlite", tags, match_all, name))
+    if candidates is not None:
+        # At most SELECTIVE rows; without the bio check they're paged in SQL
+        rows = (await db.execute(_page(query.where(Agent.id.in_(candidates)), None if check_bio else limit, after))).all()
+        return [row[:-1] for row in rows if not check_bio or set(terms) <= set(words(row[-1] or ""))][:limit]
+    out = []
+    while len(out) < limit:
+        batch = (await db.execute(_page(query, SCAN_BATCH if check_bio else limit, after))).all()
+        out += [row[:-1] for row in batch if not check_bio or set(terms) <= set(words(row[-1] or ""))]
+        if not check_bio or len(batch) < SCAN_BATCH: break
+        after = (batch[-1].trust_score, batch[-1].id)
+    return out[:limit]
+
+async def find_agents(db, columns, tags: list[str] = (), match_all: bool = False, name: Optional[str] = None,
+                      q: Optional[str] = None, limit: int = 50, after: Optional[tuple] = None) -> list:
+    """Rows of ``columns`` (which must include trust_score and id) for GET /agents/search."""
+    terms = words(q) if q else []
+    if q and not terms: raise HTTPException(400, "Query has no words")
+    if len(tags) < 2: match_all = False
+    if db.bind.dialect.name == "postgresql":
+        return (await db.execute(search_query(columns, tags, match_all, name, terms, limit, after))).all()
+    return await _sqlite_search(db, columns, list(tags), match_all, name, terms, limit, after)
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Build the /agents/search index (agent_tags, and agent_bio_fts on SQLite)")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="only agents updated since (ISO time)")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    from database import AsyncSessionLocal, engine
+    try:
+        stats = await reindex(AsyncSessionLocal, args.since, args.chunk_size)
+    finally:
+        await engine.dispose()
+    print(f"indexed {stats['indexed']} agents in {stats['seconds']:.2f}s")
+
+if __name__ == "__main__":
+    asyncio.run(_main())
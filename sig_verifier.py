@@ -0,0 +1,99 @@
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Union
+from nacl.signing import VerifyKey
+from nacl.exceptions import BadSignatureError
+import asyncio
+import os
+
+# --- Signature Verification Executor ---
+# Moves Ed25519 checks off the event loop. Modes:
+#   inline  - verify on the loop (lowest latency, blocks other coroutines)
+#   thread  - thread pool; libsodium releases the GIL so checks run in parallel
+#   process - like thread, but bodies >= process_min_bytes go to a process pool
+# Verifications that arrive in the same loop iteration are flushed together (up
+# to batch_size) to amortise the hand-off cost, split into one job per worker
+# thread so a burst uses the whole pool.
+
+MODES = ("inline", "thread", "process")
+
+def _verify_one(key: Union[VerifyKey, bytes], message: bytes, signature: bytes) -> bool:
+    try:
+        if isinstance(key, bytes): key = VerifyKey(key)
+        key.verify(message, signature)
+        return True
+    except (BadSignatureError, ValueError, TypeError):
+        return False
+
+def _verify_batch(items: list) -> list[bool]:
+    return [_verify_one(*item) for item in items]
+
+class SignatureVerifier:
+    def __init__(self, mode: str = "inline", workers: int = 4, batch_size: int = 64, process_min_bytes: int = 256 * 1024):
+        if mode not in MODES: raise ValueError(f"Unknown signature verification mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.batch_size = batch_size
+        self.process_min_bytes = process_min_bytes
+        self._threads: Optional[Executor] = None
+        self._processes: Optional[Executor] = None
+        self._pending: list = []
+        self._flush_scheduled = False
+        self.verified = 0
+        self.batches = 0
+        self.jobs = 0
+
+    async def verify(self, key: VerifyKey, message: bytes, signature: bytes) -> bool:
+        self.verified += 1
+        if self.mode == "inline":
+            return _verify_one(key, message, signature)
+        if self.mode == "process" and len(message) >= self.process_min_bytes:
+            # Large bodies: pickling cost is dwarfed by hashing, ship them alone
+            if self._processes is None: self._processes = ProcessPoolExecutor(self.workers)
+            self.batches += 1
+            return await asyncio.get_running_loop().run_in_executor(self._processes, _verify_one, bytes(key), message, signature)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((fut, (key, message, signature)))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+        return await fut
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if not self._pending: return
+        batch, self._pending = self._pending, []
+        if self._threads is None: self._threads = ThreadPoolExecutor(self.workers, thread_name_prefix="sigverify")
+        self.batches += 1
+        loop = asyncio.get_running_loop()
+        size = -(-len(batch) // self.workers)
+        for lo in range(0, len(batch), size):
+            part = batch[lo:lo + size]
+            self.jobs += 1
+            job = loop.run_in_executor(self._threads, _verify_batch, [item for _, item in part])
+            job.add_done_callback(lambda job, part=part: self._resolve(part, job))
+
+    @staticmethod
+    def _resolve(part: list, job: asyncio.Future):
+        exc = job.exception()
+        for i, (fut, _) in enumerate(part):
+            if fut.done(): continue
+            if exc: fut.set_exception(exc)
+            else: fut.set_result(job.result()[i])
+
+    def shutdown(self):
+        for pool in (self._threads, self._processes):
+            if pool is not None: pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "workers": self.workers, "verified": self.verified, "batches": self.batches, "jobs": self.jobs}
+
+sig_verifier = SignatureVerifier(
+    mode=os.getenv("SIG_VERIFY_MODE", "inline"),
+    workers=int(os.getenv("SIG_VERIFY_WORKERS", str(min(8, os.cpu_count() or 1)))),
+    batch_size=int(os.getenv("SIG_VERIFY_BATCH", "64")),
+    process_min_bytes=int(os.getenv("SIG_VERIFY_PROCESS_MIN_BYTES", str(256 * 1024))),
+)
@@ -0,0 +1,68 @@
+import pytest
+import httpx
+import time
+from email.utils import formatdate
+from httpx import ASGITransport
+from agent_sdk import AgentSDK, AgentClient, AgentKredError
+from main import app
+
+@pytest.mark.asyncio
+async def test_client_runs_signed_flows(client):
+    agents = [AgentSDK() for _ in range(5)]
+    # The test app shares one session, so calls go one at a time
+    async with AgentClient("http://test", transport=ASGITransport(app=app), concurrency=1) as api:
+        for i, a in enumerate(agents): await api.register(a, f"Fleet {i}")
+        profile = await api.update_profile(agents[0], bio="Fleet lead", tags=["defi"])
+        assert profile["bio"] == "Fleet lead"
+        staked = [await api.stake(a, f"0x{i:064x}", 10.0) for i, a in enumerate(agents)]
+        assert all(s["staked_amount"] == 10.0 for s in staked)
+        assert (await api.get_agent(agents[0].agent_id))["tags"] == "defi"
+        with pytest.raises(AgentKredError) as e: await api.review(agents[1], agents[0].agent_id, 1)
+        assert e.value.status_code == 403 # review needs trust 50
+
+@pytest.mark.asyncio
+async def test_retries_are_re_signed_and_clock_follows_server():
+    seen = []
+    server_skew = 120
+    def handler(request: httpx.Request):
+        seen.append((request.headers["x-timestamp"], request.headers["x-signature"]))
+        date = {"date": formatdate(time.time() + server_skew, usegmt=True)}
+        if len(seen) == 1: return httpx.Response(503, headers={"retry-after": "0", **date})
+        if abs(int(request.headers["x-timestamp"]) - (time.time() + server_skew)) > 60:
+            return httpx.Response(403, json={"detail": "Request timestamp expired"}, headers=date)
+        return httpx.Response(200, json={"ok": True}, headers=date)
+
+    async with AgentClient("http://api", transport=httpx.MockTransport(handler), backoff=0.01) as api:
+        assert await api.call("POST", "/stake", {"amount": 1}, AgentSDK()) == {"ok": True}
+    assert len(seen) == 2 and seen[0] != seen[1]
+    assert int(seen[1][0]) - int(seen[0][0]) >= server_skew - 2 # retried with the server's clock
+    assert abs(api.clock_offset - server_skew) < 2
+
+@pytest.mark.asyncio
+async def test_gives_up_after_retries():
+    calls = 0
+    def handler(request):
+        nonlocal calls
+        calls += 1
+        return httpx.Response(429, json={"detail": "Rate limit exceeded"})
+    async with AgentClient("http://api", transport=httpx.MockTransport(handler), retries=2, backoff=0.001) as api:
+        resp = await api.request("GET", "/agents/top")
+    assert resp.status_code == 429 and calls == 3 and api.retried == 2
+
+@pytest.mark.asyncio
+async def test_writes_are_retried_only_when_unprocessed():
+    calls = []
+    def handler(request):
+        calls.append(request.method)
+        if request.url.path == "/timeout": raise httpx.ReadTimeout("no answer", request=request)
+        if request.url.path == "/refused": raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(500, json={"detail": "boom"})
+    async with AgentClient("http://api", transport=httpx.MockTransport(handler), retries=2, backoff=0.001) as api:
+        assert (await api.request("POST", "/stake", {"amount": 1}, AgentSDK())).status_code == 500
+        assert calls == ["POST"]
+        with pytest.raises(httpx.ReadTimeout): await api.request("POST", "/timeout", {}, AgentSDK())
+        assert len(calls) == 2
+        with pytest.raises(httpx.ConnectError): await api.request("POST", "/refused", {}, AgentSDK())
+        assert len(calls) == 5
+        with pytest.raises(httpx.ReadTimeout): await api.request("GET", "/timeout")
+        assert len(calls) == 8
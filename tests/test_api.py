@@ -1,26 +1,7 @@
 import pytest
 import time
 import json
-from nacl.signing import SigningKey
-from nacl.encoding import HexEncoder
-
-class AgentSDK:
-    def __init__(self):
-        self.signing_key = SigningKey.generate()
-        self.verify_key = self.signing_key.verify_key
-        self.public_key_hex = self.verify_key.encode(encoder=HexEncoder).decode('utf-8')
-        self.agent_id = f"test_agent_{self.public_key_hex[:8]}"
-        
-    def sign_request(self, method, path, body_str, timestamp_override=None):
-        timestamp = str(int(time.time())) if timestamp_override is None else str(timestamp_override)
-        message = f"{method}{path}{timestamp}{body_str}".encode("utf-8")
-        signature = self.signing_key.sign(message).signature.hex()
-        return {
-            "X-Agent-ID": self.agent_id,
-            "X-Signature": signature,
-            "X-Timestamp": timestamp,
-            "Content-Type": "application/json"
-        }
+from agent_sdk import AgentSDK
 
 @pytest.mark.asyncio
 async def test_root(client):
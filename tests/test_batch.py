@@ -0,0 +1,59 @@
+import pytest
+import json
+from models import Agent
+from agent_sdk import AgentSDK
+
+async def signed_post(client, agent, path, payload):
+    body = json.dumps(payload)
+    return await client.post(path, content=body, headers=agent.sign_request("POST", path, body))
+
+async def register(client, db_session, agent, trust_score=None):
+    resp = await signed_post(client, agent, "/register", {"id": agent.agent_id, "name": "BatchBot", "public_key": agent.public_key_hex})
+    assert resp.status_code == 200
+    if trust_score is not None:
+        row = await db_session.get(Agent, agent.agent_id)
+        row.verification_score = trust_score - 10
+        row.calculate_total_score()
+        await db_session.commit()
+
+@pytest.mark.asyncio
+async def test_batch_applies_items_independently(client, db_session):
+    alice, bob = AgentSDK(), AgentSDK()
+    await register(client, db_session, alice, trust_score=100)
+    await register(client, db_session, bob)
+
+    resp = await signed_post(client, alice, "/batch", {"operations": [
+        {"op": "update", "data": {"bio": "batched"}},
+        {"op": "stake", "data": {"agent_id": alice.agent_id, "tx_hash": "0xabc", "amount": 20.0}},
+        {"op": "stake", "data": {"agent_id": bob.agent_id, "tx_hash": "0xdef", "amount": 5.0}},
+        {"op": "review", "data": {"reviewer_id": alice.agent_id, "target_id": bob.agent_id, "score": 5}},
+    ]})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["status"] == "committed"
+    assert [r["status"] for r in data["results"]] == ["ok", "ok", "error", "ok"]
+    assert data["results"][2]["status_code"] == 403
+    assert data["results"][3]["result"]["score_boost"] == 60  # trust 120 after the stake above
+
+    alice_row = (await client.get(f"/agent/{alice.agent_id}")).json()
+    assert alice_row["bio"] == "batched"
+    assert alice_row["staked_amount"] == 20.0
+    assert (await client.get(f"/agent/{bob.agent_id}")).json()["review_score"] == 60
+
+@pytest.mark.asyncio
+async def test_batch_atomic_rolls_back_everything(client, db_session):
+    alice = AgentSDK()
+    await register(client, db_session, alice)
+
+    resp = await signed_post(client, alice, "/batch", {"atomic": True, "operations": [
+        {"op": "stake", "data": {"agent_id": alice.agent_id, "tx_hash": "0xabc", "amount": 20.0}},
+        {"op": "stake", "data": {"agent_id": alice.agent_id, "tx_hash": "bad", "amount": 5.0}},
+        {"op": "update", "data": {"bio": "never"}},
+    ]})
+    data = resp.json()
+    assert data["status"] == "aborted"
+    assert [r["status"] for r in data["results"]] == ["rolled_back", "error", "skipped"]
+
+    row = (await client.get(f"/agent/{alice.agent_id}")).json()
+    assert row["staked_amount"] == 0.0
+    assert row["bio"] is None
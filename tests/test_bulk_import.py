@@ -0,0 +1,82 @@
+import csv
+import json
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from nacl.signing import SigningKey
+from nacl.encoding import HexEncoder
+from models import Base, Agent, Review, Verification, current_formula
+from bulk_import import run_import
+
+@pytest_asyncio.fixture
+async def import_db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'import.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+def write_files(tmp_path, n=40):
+    agents = tmp_path / "agents.jsonl"
+    with agents.open("w") as f:
+        for i in range(n):
+            key = SigningKey.generate().verify_key.encode(encoder=HexEncoder).decode()
+            f.write(json.dumps({"id": f"imp-{i}", "name": f"Bot {i}", "public_key": key, "tags": ["defi"], "staked_amount": i * 50.0, "review_score": i}) + "\n")
+        f.write(json.dumps({"id": "bad-key", "name": "Bad", "public_key": "ff" * 32}) + "\n") # not a curve point
+        f.write("{not json\n")
+    reviews = tmp_path / "reviews.csv"
+    with reviews.open("w", newline="") as f:
+        w = csv.DictWriter(f, ["reviewer_id", "target_id", "score", "comment", "created_at"])
+        w.writeheader()
+        for i in range(n):
+            w.writerow({"reviewer_id": f"imp-{i}", "target_id": f"imp-{(i + 1) % n}", "score": 4, "comment": "ok, fine", "created_at": "2025-01-02T03:04:05Z"})
+        w.writerow({"reviewer_id": "imp-1", "target_id": "imp-1", "score": 5})
+    verifications = tmp_path / "verifications.jsonl"
+    verifications.write_text(json.dumps({"agent_id": "imp-0", "platform": "github", "proof_url": "https://gist.github.com/x"}) + "\n"
+                             + json.dumps({"agent_id": "imp-0", "platform": "myspace", "proof_url": "u"}) + "\n")
+    return {"agents": [str(agents)], "reviews": [str(reviews)], "verifications": [str(verifications)]}
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [0, 2])
+async def test_import_validates_writes_and_rescores(import_db, tmp_path, workers):
+    rejected = []
+    report = await run_import(import_db, write_files(tmp_path), batch_size=7, workers=workers, rejects=rejected.append)
+    by_kind = {f["kind"]: f for f in report["files"]}
+    assert by_kind["agents"]["written"] == 40 and by_kind["reviews"]["written"] == 40 and by_kind["verifications"]["written"] == 1
+    assert sorted((r["kind"], r["line"], r["error"]) for r in rejected) == [
+        ("agents", 41, "invalid public_key"), ("agents", 42, "invalid JSON"),
+        ("reviews", 42, "self review"), ("verifications", 2, "unknown platform myspace"),
+    ]
+    assert report["rescore"]["rescored"] == 40 and report["search_index"]["indexed"] == 40
+    async with import_db() as db:
+        formula = current_formula()
+        for a in (await db.execute(select(Agent))).scalars():
+            assert a.trust_score == formula.compute(a.verification_score, a.review_score, a.moltbook_karma, a.staked_amount)
+        review = (await db.execute(select(Review).where(Review.reviewer_id == "imp-0"))).scalars().one()
+        assert review.comment == "ok, fine" and review.created_at.isoformat() == "2025-01-02T03:04:05"
+        assert (await db.execute(select(Verification.status))).scalar() == "verified"
+
+@pytest.mark.asyncio
+async def test_reimport_skips_existing_agents(import_db, tmp_path):
+    sources = write_files(tmp_path, n=5)
+    await run_import(import_db, {"agents": sources["agents"]}, workers=0)
+    report = await run_import(import_db, {"agents": sources["agents"]}, workers=0)
+    assert report["files"][0]["written"] == 0 and report["rescore"]["rescored"] == 0
+    async with import_db() as db:
+        assert (await db.execute(select(func.count()).select_from(Agent))).scalar() == 5
+
+@pytest.mark.asyncio
+async def test_reimport_skips_existing_rows_and_rejects_unknown_agents(import_db, tmp_path):
+    sources = write_files(tmp_path, n=5)
+    with open(sources["reviews"][0], "a", newline="") as f:
+        csv.writer(f).writerow(["imp-0", "ghost", 3, "", "2025-01-02T03:04:05Z"])
+    await run_import(import_db, sources, workers=0)
+    rejected = []
+    report = await run_import(import_db, sources, workers=0, rejects=rejected.append)
+    assert [f["written"] for f in report["files"]] == [0, 0, 0]
+    assert ("reviews", 8, "unknown agent ghost") in [(r["kind"], r["line"], r["error"]) for r in rejected]
+    async with import_db() as db:
+        assert (await db.execute(select(func.count()).select_from(Review))).scalar() == 5
+        assert (await db.execute(select(func.count()).select_from(Verification))).scalar() == 1
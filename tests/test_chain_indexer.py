@@ -0,0 +1,207 @@
+import json
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Agent, StakeEvent
+from chain_indexer import ChainIndexer, JsonRpc, keccak256, topic, decode_logs, EVENTS
+pytest.importorskip("Crypto.Hash.keccak")
+
+VAULT = "0x" + "ab" * 20
+KIND_TOPIC = {kind: t for t, (kind, _) in EVENTS.items()}
+
+def word(n: int) -> str:
+    return n.to_bytes(32, "big").hex()
+
+class FakeChain:
+    """eth_blockNumber / eth_getBlockByNumber / eth_getLogs over an in-memory chain."""
+
+    def __init__(self, blocks: int, max_logs: int = 1000):
+        self.fork = 0
+        self.hashes = [self._hash(n) for n in range(blocks)]
+        self.logs: list[dict] = []
+        self.max_logs = max_logs
+        self.get_logs = 0
+        self.after_get_logs = None # called once, after the next eth_getLogs answer is built
+
+    def _hash(self, n: int) -> str:
+        return "0x" + keccak256(f"{self.fork}:{n}".encode()).hex()
+
+    def emit(self, block: int, kind: str, agent_id: str, amount: int, extra: str = ""):
+        self.logs.append({
+            "address": VAULT, "topics": [KIND_TOPIC[kind], topic(agent_id)], "data": "0x" + word(amount) + extra,
+            "blockNumber": hex(block), "blockHash": self.hashes[block], "logIndex": hex(len(self.logs)),
+            "transactionHash": "0x" + keccak256(f"{self.hashes[block]}:{len(self.logs)}:{agent_id}".encode()).hex(),
+        })
+
+    def reorg(self, from_block: int):
+        self.fork += 1
+        self.hashes[from_block:] = [self._hash(n) for n in range(from_block, len(self.hashes))]
+        self.logs = [entry for entry in self.logs if int(entry["blockNumber"], 16) < from_block]
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        req = json.loads(request.content)
+        method, params = req["method"], req["params"]
+        if method == "eth_blockNumber": result = hex(len(self.hashes) - 1)
+        elif method == "eth_getBlockByNumber":
+            n = int(params[0], 16)
+            result = {"number": params[0], "hash": self.hashes[n]} if n < len(self.hashes) else None
+        else:
+            self.get_logs += 1
+            lo, hi = int(params[0]["fromBlock"], 16), int(params[0]["toBlock"], 16)
+            result = [entry for entry in self.logs if lo <= int(entry["blockNumber"], 16) <= hi and entry["topics"][0] in params[0]["topics"][0]]
+            if len(result) > self.max_logs:
+                return httpx.Response(200, json={"jsonrpc": "2.0", "id": req["id"], "error": {"code": -32005, "message": f"query returned more than {self.max_logs} results"}})
+            hook, self.after_get_logs = self.after_get_logs, None
+            if hook: hook()
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": req["id"], "result": result})
+
+@pytest_asyncio.fixture
+async def sessions():
+    # Own database: a rollback deletes every stake event above the target block
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn: await conn.run_sync(Base.metadata.create_all)
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+def indexer_for(sessions, chain: FakeChain, **kwargs) -> ChainIndexer:
+    rpc = JsonRpc("http://chain.test", transport=httpx.MockTransport(chain.handle))
+    return ChainIndexer(sessions, rpc, VAULT, **kwargs)
+
+async def add_agents(sessions, *agent_ids):
+    async with sessions() as db:
+        db.add_all([Agent(id=a, name="Bot", public_key="00") for a in agent_ids])
+        await db.commit()
+
+async def stakes(sessions) -> dict:
+    async with sessions() as db: return dict((await db.execute(select(Agent.id, Agent.staked_amount))).all())
+
+def test_keccak256_vectors():
+    assert keccak256(b"").hex() == "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    assert topic("Transfer(address,address,uint256)") == "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+    assert keccak256(b"abc").hex() == "4e03657aea45a94fc7d47ba826c8d667c0d1e6e33a64a036ec44f58fa12d6c45"
+    signatures = ["Staked(string,address,uint256)", "UnstakeRequested(string,uint256,uint256)", "Withdrawn(string,uint256)", "Slashed(string,uint256,string)"]
+    assert list(EVENTS) == [topic(s) for s in signatures]
+
+def test_decode_slashed_reason_and_unknown_agents():
+    chain = FakeChain(2)
+    reason = "double review".encode()
+    chain.emit(1, "slashed", "known", 2_500_000, word(64) + word(len(reason)) + reason.hex().ljust(64, "0"))
+    chain.emit(1, "unstake_requested", "stranger", 1_000_000, word(1_700_000_000))
+    slashed, unstake = decode_logs(chain.logs, {topic("known"): "known"}, decimals=6)
+    assert (slashed["kind"], slashed["agent_id"], slashed["delta"], slashed["reason"]) == ("slashed", "known", -2.5, "double review")
+    assert (unstake["agent_id"], unstake["delta"], unstake["release_time"], unstake["amount"]) == (None, -1.0, 1_700_000_000, "1000000")
+
+@pytest.mark.asyncio
+async def test_backlog_is_indexed_in_ranges(sessions):
+    await add_agents(sessions, "ci-0", "ci-1", "ci-2")
+    chain = FakeChain(60)
+    for block in range(5, 55, 5): chain.emit(block, "staked", f"ci-{block % 3}", 10_000_000)
+    chain.emit(40, "unstake_requested", "ci-1", 4_000_000, word(0))
+    chain.emit(45, "withdrawn", "ci-1", 4_000_000)
+    chain.emit(50, "staked", "unregistered", 1_000_000)
+    indexer = indexer_for(sessions, chain, confirmations=0, block_range=10, concurrency=3)
+
+    stats = await indexer.poll()
+    assert stats["applied_block"] == 59 and stats["events"] == 13
+    assert chain.get_logs == 6
+    assert await stakes(sessions) == {"ci-0": 30.0, "ci-1": 26.0, "ci-2": 40.0}
+    assert indexer.stats()["unmatched_events"] == 1
+
+    # Nothing new: the checkpoint holds, no logs are fetched
+    assert (await indexer.poll())["blocks"] == 0 and chain.get_logs == 6
+    # A fresh process resumes from the checkpoint
+    assert (await indexer_for(sessions, chain, confirmations=0, block_range=10).poll())["blocks"] == 0
+    assert await stakes(sessions) == {"ci-0": 30.0, "ci-1": 26.0, "ci-2": 40.0}
+
+@pytest.mark.asyncio
+async def test_reorg_rolls_back_to_last_block_on_chain(sessions):
+    await add_agents(sessions, "reorg-a")
+    chain = FakeChain(30)
+    chain.emit(10, "staked", "reorg-a", 5_000_000)
+    chain.emit(25, "staked", "reorg-a", 7_000_000)
+    indexer = indexer_for(sessions, chain, confirmations=0)
+    async with sessions() as db: active = await db.scalar(select(Agent.last_active_at))
+    await indexer.poll()
+    assert await stakes(sessions) == {"reorg-a": 12.0}
+
+    # Block 25 is replaced; on the new branch the stake lands in block 27
+    chain.reorg(22)
+    chain.emit(27, "staked", "reorg-a", 1_000_000)
+    stats = await indexer.poll()
+    assert indexer.reorgs == 1 and indexer.rolled_back_events == 1 and stats["events"] == 1
+    assert await stakes(sessions) == {"reorg-a": 6.0}
+    async with sessions() as db:
+        assert (await db.execute(select(StakeEvent.block_number).order_by(StakeEvent.block_number))).scalars().all() == [10, 27]
+        # Chain events and rollbacks aren't agent activity
+        assert await db.scalar(select(Agent.last_active_at)) == active
+
+@pytest.mark.asyncio
+async def test_reorg_deeper_than_confirmations(sessions):
+    await add_agents(sessions, "deep-a")
+    chain = FakeChain(30)
+    chain.emit(10, "staked", "deep-a", 5_000_000)
+    indexer = indexer_for(sessions, chain, confirmations=8)
+    assert (await indexer.poll())["applied_block"] == 21
+    assert await stakes(sessions) == {"deep-a": 5.0}
+
+    # Forks below every recorded block: everything is undone and indexed again
+    chain.reorg(5)
+    chain.emit(7, "staked", "deep-a", 1_000_000)
+    await indexer.poll()
+    assert indexer.reorgs == 1 and indexer.rolled_back_events == 1 and indexer.applied_block == 21
+    assert await stakes(sessions) == {"deep-a": 1.0}
+
+@pytest.mark.asyncio
+async def test_reorg_while_fetching_is_not_applied(sessions):
+    await add_agents(sessions, "race-a")
+    chain = FakeChain(30)
+    chain.emit(29, "staked", "race-a", 5_000_000)
+    chain.after_get_logs = lambda: chain.reorg(29)
+    indexer = indexer_for(sessions, chain, confirmations=0)
+    assert (await indexer.poll())["blocks"] == 0
+    stats = await indexer.poll()
+    assert stats["applied_block"] == 29 and stats["events"] == 0
+    assert await stakes(sessions) == {"race-a": 0.0}
+
+@pytest.mark.asyncio
+async def test_stakes_before_registration_are_applied_later(sessions):
+    chain = FakeChain(20)
+    chain.emit(5, "staked", "late-a", 2_000_000)
+    chain.emit(9, "staked", "late-a", 3_000_000)
+    indexer = indexer_for(sessions, chain, confirmations=0)
+    await indexer.poll()
+    assert indexer.stats()["unmatched_events"] == 2
+
+    await add_agents(sessions, "late-a")
+    await indexer.poll()
+    assert await stakes(sessions) == {"late-a": 5.0}
+    assert indexer.stats()["unmatched_events"] == 0
+    async with sessions() as db:
+        assert (await db.execute(select(StakeEvent.agent_id))).scalars().all() == ["late-a", "late-a"]
+
+@pytest.mark.asyncio
+async def test_oversized_ranges_are_split(sessions):
+    await add_agents(sessions, "split-a")
+    chain = FakeChain(64, max_logs=4)
+    for block in range(64): chain.emit(block, "staked", "split-a", 1_000_000)
+    indexer = indexer_for(sessions, chain, confirmations=0, block_range=64, concurrency=1)
+    assert (await indexer.poll())["events"] == 64
+    assert indexer.splits > 0
+    assert await stakes(sessions) == {"split-a": 64.0}
+
+async def signed_post(client, agent, path, payload):
+    body = json.dumps(payload)
+    return await client.post(path, content=body, headers=agent.sign_request("POST", path, body))
+
+@pytest.mark.asyncio
+async def test_client_stakes_refused_in_chain_mode(client, monkeypatch):
+    import main
+    from agent_sdk import AgentSDK
+    agent = AgentSDK("chain")
+    assert (await signed_post(client, agent, "/register", {"id": agent.agent_id, "name": "Staker", "public_key": agent.public_key_hex})).status_code == 200
+    monkeypatch.setattr(main, "STAKE_SOURCE", "chain")
+    resp = await signed_post(client, agent, "/stake", {"agent_id": agent.agent_id, "tx_hash": "0x1", "amount": 100.0})
+    assert resp.status_code == 409 and resp.json()["detail"] == "Stakes are indexed from AgentVault events"
@@ -0,0 +1,77 @@
+import pytest
+import pytest_asyncio
+import asyncio
+import json
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from main import app
+from rate_limit import rate_limiter
+from database import get_db
+from models import Base, Agent
+from agent_sdk import AgentSDK
+
+N_WRITERS = 200
+
+def seed(agent_id, public_key="00", trust=10):
+    return Agent(id=agent_id, name=agent_id, public_key=public_key, trust_score=trust, verification_score=trust - 10,
+                 review_score=0, moltbook_karma=0, staked_amount=0.0)
+
+@pytest_asyncio.fixture
+async def pooled(tmp_path, monkeypatch):
+    """A file database with a real pool, so every request has its own connection."""
+    monkeypatch.setattr(rate_limiter, "enabled", False) # one agent writes far beyond its limit here
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/concurrency.db", connect_args={"timeout": 60})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with Session() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield Session, client
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+async def signed_post(client, agent, path, payload):
+    body = json.dumps(payload)
+    return await client.post(path, content=body, headers=agent.sign_request("POST", path, body))
+
+@pytest.mark.asyncio
+async def test_concurrent_reviews_do_not_lose_updates(pooled):
+    Session, client = pooled
+    reviewers = [AgentSDK() for _ in range(N_WRITERS)]
+    async with Session() as db:
+        db.add(seed("hot_target"))
+        db.add_all(seed(r.agent_id, r.public_key_hex, trust=100) for r in reviewers)
+        await db.commit()
+
+    responses = await asyncio.gather(*(
+        signed_post(client, r, "/review", {"reviewer_id": r.agent_id, "target_id": "hot_target", "score": 1}) for r in reviewers
+    ))
+    assert [r.status_code for r in responses] == [200] * N_WRITERS
+    target = (await client.get("/agent/hot_target")).json()
+
+    # Every reviewer has trust 100, so each review adds int(100 * 0.1 * 1) = 10
+    assert target["review_score"] == 10 * N_WRITERS
+    assert target["trust_score"] == 10 + 10 * N_WRITERS
+
+@pytest.mark.asyncio
+async def test_concurrent_stakes_from_one_agent_all_count(pooled):
+    Session, client = pooled
+    agent = AgentSDK()
+    async with Session() as db:
+        db.add(seed(agent.agent_id, agent.public_key_hex))
+        await db.commit()
+
+    # Distinct bodies so every request carries a different signature
+    responses = await asyncio.gather(*(
+        signed_post(client, agent, "/stake", {"agent_id": agent.agent_id, "tx_hash": f"0x{i:x}", "amount": 2.5}) for i in range(N_WRITERS)
+    ))
+    assert [r.status_code for r in responses] == [200] * N_WRITERS
+    row = (await client.get(f"/agent/{agent.agent_id}")).json()
+    assert row["staked_amount"] == 2.5 * N_WRITERS
+    assert row["trust_score"] == 10 + min(int(2.5 * N_WRITERS), 1000)
@@ -0,0 +1,42 @@
+import pytest
+import asyncio
+from sqlalchemy import text
+from database import make_engine, init_db, pool_stats, profile_settings, InstrumentedPool
+
+def test_prod_profile_env_overrides(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    settings = profile_settings("prod")
+    assert settings["pool_size"] == 3 and settings["pool_pre_ping"] and not settings["echo"]
+    with pytest.raises(ValueError):
+        profile_settings("staging")
+
+@pytest.mark.asyncio
+async def test_prod_schema_check_and_pool_stats(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "1")
+    engine = make_engine(f"sqlite+aiosqlite:///{tmp_path}/prod.db", "prod")
+    try:
+        assert isinstance(engine.pool, InstrumentedPool)
+        with pytest.raises(RuntimeError, match="missing tables"):
+            await init_db(engine, "prod")
+        await init_db(engine, "test") # creates the tables
+        await init_db(engine, "prod") # now passes the check
+
+        # A table from before a release that added columns
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE agents DROP COLUMN version"))
+        with pytest.raises(RuntimeError, match=r"missing columns.*agents\.version"):
+            await init_db(engine, "prod")
+
+        async def hold():
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await asyncio.sleep(0.05)
+        await asyncio.gather(hold(), hold())
+        stats = pool_stats(engine)
+        assert stats["checkouts"] >= 2
+        assert stats["peak_in_use"] == 2
+        assert stats["overflow_events"] >= 1
+        assert stats["in_use"] == 0
+    finally:
+        await engine.dispose()
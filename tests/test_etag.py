@@ -0,0 +1,74 @@
+import pytest
+import pytest_asyncio
+import json
+from sqlalchemy import event
+from leaderboard import leaderboard
+from response_cache import response_cache
+from agent_sdk import AgentSDK
+
+async def signed_post(client, agent, path, payload):
+    body = json.dumps(payload)
+    return await client.post(path, content=body, headers=agent.sign_request("POST", path, body))
+
+async def register(client, name):
+    agent = AgentSDK()
+    await signed_post(client, agent, "/register", {"id": agent.agent_id, "name": name, "public_key": agent.public_key_hex})
+    return agent
+
+@pytest_asyncio.fixture
+async def indexed(db_session):
+    await leaderboard.load(db_session)
+    yield
+    leaderboard.reset()
+    response_cache.clear()
+
+@pytest.mark.asyncio
+async def test_profile_revalidates_with_one_small_query(client, db_engine):
+    agent = await register(client, "EtagBot")
+    first = await client.get(f"/agent/{agent.agent_id}")
+    etag = first.headers["etag"]
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        resp = await client.get(f"/agent/{agent.agent_id}", headers={"If-None-Match": etag})
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", listener)
+    assert resp.status_code == 304 and resp.headers["etag"] == etag and resp.content == b""
+    assert len(statements) == 1 and "agents.version" in statements[0]
+
+    # Every write path moves the version, so the old tag stops matching
+    await signed_post(client, agent, "/agent/update", {"bio": "new"})
+    resp = await client.get(f"/agent/{agent.agent_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.json()["bio"] == "new" and resp.headers["etag"] != etag
+    etag = resp.headers["etag"]
+    await signed_post(client, agent, "/stake", {"agent_id": agent.agent_id, "tx_hash": "0x1", "amount": 100.0})
+    resp = await client.get(f"/agent/{agent.agent_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.json()["staked_amount"] == 100.0
+
+@pytest.mark.asyncio
+async def test_reviews_page_changes_when_a_review_arrives(client):
+    target, reviewer = await register(client, "Target"), await register(client, "Reviewer")
+    await signed_post(client, reviewer, "/stake", {"agent_id": reviewer.agent_id, "tx_hash": "0x2", "amount": 500.0})
+    first = await client.get(f"/agent/{target.agent_id}/reviews")
+    assert first.json() == []
+    assert (await client.get(f"/agent/{target.agent_id}/reviews", headers={"If-None-Match": first.headers["etag"]})).status_code == 304
+    await signed_post(client, reviewer, "/review", {"reviewer_id": reviewer.agent_id, "target_id": target.agent_id, "score": 5})
+    resp = await client.get(f"/agent/{target.agent_id}/reviews", headers={"If-None-Match": first.headers["etag"]})
+    assert resp.status_code == 200 and resp.json()[0]["reviewer_name"] == "Reviewer"
+
+    # Renaming the reviewer retires the target's cached pages too
+    await signed_post(client, reviewer, "/agent/update", {"name": "Renamed"})
+    again = await client.get(f"/agent/{target.agent_id}/reviews", headers={"If-None-Match": resp.headers["etag"]})
+    assert again.status_code == 200 and again.json()[0]["reviewer_name"] == "Renamed"
+
+@pytest.mark.asyncio
+async def test_top_pages_cached_per_leaderboard_version(client, indexed):
+    first = await client.get("/agents/top?limit=5")
+    etag = first.headers["etag"]
+    hits = response_cache.hits
+    again = await client.get("/agents/top?limit=5")
+    assert again.content == first.content and response_cache.hits == hits + 1
+    assert (await client.get("/agents/top?limit=5", headers={"If-None-Match": f'W/{etag}, "other"'})).status_code == 304
+    await register(client, "Newcomer")
+    assert (await client.get("/agents/top?limit=5", headers={"If-None-Match": etag})).status_code == 200
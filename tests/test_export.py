@@ -0,0 +1,39 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from models import Agent, Review
+import export
+
+def parse(resp):
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+@pytest.mark.asyncio
+async def test_export_streams_every_agent_in_batches(client, db_session, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 3)
+    old = datetime.utcnow() - timedelta(days=2)
+    db_session.add_all([Agent(id=f"exp-{i}", name="Exp", public_key="00", updated_at=old) for i in range(10)])
+    await db_session.commit()
+
+    rows = [r for r in parse(await client.get("/agents/export")) if r["id"].startswith("exp-")]
+    assert [r["id"] for r in rows] == [f"exp-{i}" for i in range(10)]
+    assert {"trust_score", "graph_score", "updated_at", "public_key"} <= set(rows[0])
+
+    since = datetime.utcnow() - timedelta(days=1)
+    agent = await db_session.get(Agent, "exp-4")
+    agent.bio = "changed"
+    await db_session.commit()
+    rows = parse(await client.get("/agents/export", params={"updated_since": since.isoformat()}))
+    assert "exp-4" in [r["id"] for r in rows] and "exp-3" not in [r["id"] for r in rows]
+
+@pytest.mark.asyncio
+async def test_review_export_gzip(client, db_session):
+    db_session.add_all([Agent(id="exp-r1", name="A", public_key="00"), Agent(id="exp-r2", name="B", public_key="00")])
+    db_session.add(Review(reviewer_id="exp-r1", target_id="exp-r2", score=4, comment="solid"))
+    await db_session.commit()
+
+    resp = await client.get("/reviews/export", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    rows = parse(resp) # httpx inflates the body
+    assert {"reviewer_id": "exp-r1", "target_id": "exp-r2", "score": 4, "comment": "solid"}.items() <= rows[-1].items()
+    assert parse(await client.get("/reviews/export", params={"updated_since": "2999-01-01T00:00:00"})) == []
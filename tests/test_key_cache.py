@@ -0,0 +1,52 @@
+import pytest
+import json
+from nacl.signing import SigningKey
+from nacl.encoding import HexEncoder
+from key_cache import KeyCache, key_cache
+from models import Agent
+from agent_sdk import AgentSDK
+
+async def register(client, agent):
+    body = json.dumps({"id": agent.agent_id, "name": "CacheBot", "public_key": agent.public_key_hex})
+    resp = await client.post("/register", content=body, headers=agent.sign_request("POST", "/register", body))
+    assert resp.status_code == 200
+
+def test_lru_and_ttl():
+    keys = [SigningKey.generate().verify_key.encode(encoder=HexEncoder).decode() for _ in range(3)]
+    cache = KeyCache(maxsize=2, ttl=60)
+    cache.put("a", keys[0]); cache.put("b", keys[1])
+    assert cache.get("a") is not None  # "a" is now most recently used
+    cache.put("c", keys[2])
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    cache = KeyCache(maxsize=2, ttl=-1)
+    cache.put("a", keys[0])
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+@pytest.mark.asyncio
+async def test_register_fills_cache_and_signed_write_hits(client):
+    agent = AgentSDK()
+    await register(client, agent)
+    assert key_cache.get(agent.agent_id) is not None
+
+    hits = key_cache.hits
+    body = json.dumps({"bio": "cached"})
+    resp = await client.post("/agent/update", content=body, headers=agent.sign_request("POST", "/agent/update", body))
+    assert resp.status_code == 200
+    assert key_cache.hits == hits + 1
+
+@pytest.mark.asyncio
+async def test_key_change_invalidates(client, db_session):
+    agent = AgentSDK()
+    await register(client, agent)
+    row = await db_session.get(Agent, agent.agent_id)
+    row.public_key = AgentSDK().public_key_hex
+    await db_session.commit()
+    assert key_cache.get(agent.agent_id) is None
+
+    # The old key no longer verifies once the cache has been refreshed from the DB
+    body = json.dumps({"bio": "stale key"})
+    resp = await client.post("/agent/update", content=body, headers=agent.sign_request("POST", "/agent/update", body))
+    assert resp.status_code == 401
@@ -0,0 +1,106 @@
+import pytest
+import pytest_asyncio
+import json
+from datetime import datetime
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from leaderboard import Leaderboard, leaderboard
+from models import Agent
+from rescore import rescore
+from agent_sdk import AgentSDK
+
+def make_agent(agent_id, trust, stake=0.0):
+    a = Agent(id=agent_id, name=agent_id, public_key="00", trust_score=trust, verification_score=0, review_score=0,
+              moltbook_karma=0, staked_amount=stake, last_active_at=datetime(2026, 1, 1), created_at=datetime(2026, 1, 1))
+    return a
+
+def test_upsert_reorders_and_ranks():
+    board = Leaderboard()
+    board.ready = True
+    agents = [make_agent("a", 10), make_agent("b", 30, stake=5.0), make_agent("c", 20)]
+    board.upsert(*agents)
+    assert [r["id"] for r in board.top("trust_score", 10)] == ["b", "c", "a"]
+    assert [r["id"] for r in board.top("staked_amount", 1)] == ["b"]
+    assert board.rank("c") == 2
+
+    agents[0].trust_score = 99
+    board.upsert(agents[0])
+    assert [r["id"] for r in board.top("trust_score", 2)] == ["a", "b"]
+    assert board.rank("a") == 1 and board.rank("c") == 3
+    assert board.rank("missing") is None
+    assert len(board) == 3
+
+@pytest_asyncio.fixture
+async def loaded_leaderboard(db_session):
+    await leaderboard.load(db_session)
+    yield leaderboard
+    leaderboard.reset()
+
+@pytest.mark.asyncio
+async def test_top_served_from_index_without_queries(client, db_engine, loaded_leaderboard):
+    agent = AgentSDK()
+    body = json.dumps({"id": agent.agent_id, "name": "RankBot", "public_key": agent.public_key_hex})
+    await client.post("/register", content=body, headers=agent.sign_request("POST", "/register", body))
+    body = json.dumps({"agent_id": agent.agent_id, "tx_hash": "0x1", "amount": 5000.0})
+    await client.post("/stake", content=body, headers=agent.sign_request("POST", "/stake", body))
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        top = (await client.get("/agents/top?sort_by=staked_amount&limit=1")).json()
+        rank = (await client.get(f"/agent/{agent.agent_id}/rank?sort_by=staked_amount")).json()
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", listener)
+    assert statements == []
+    assert top[0]["id"] == agent.agent_id
+    assert rank["rank"] == 1
+
+@pytest.mark.asyncio
+async def test_rank_sql_fallback(client):
+    agent = AgentSDK()
+    body = json.dumps({"id": agent.agent_id, "name": "RankBot", "public_key": agent.public_key_hex})
+    await client.post("/register", content=body, headers=agent.sign_request("POST", "/register", body))
+    resp = await client.get(f"/agent/{agent.agent_id}/rank")
+    assert resp.status_code == 200
+    assert 1 <= resp.json()["rank"] <= resp.json()["total"]
+
+@pytest.mark.asyncio
+async def test_index_and_sql_paths_render_identical_json(client, db_session):
+    agent = AgentSDK()
+    body = json.dumps({"id": agent.agent_id, "name": "JsonBot", "public_key": agent.public_key_hex})
+    await client.post("/register", content=body, headers=agent.sign_request("POST", "/register", body))
+    sql = await client.get("/agents/top?limit=20&sort_by=active")
+    await leaderboard.load(db_session)
+    try:
+        indexed = await client.get("/agents/top?limit=20&sort_by=active")
+        assert indexed.content == sql.content
+        assert indexed.headers.get("x-next-cursor") == sql.headers.get("x-next-cursor")
+
+        # A rendered row is dropped as soon as the agent changes
+        body = json.dumps({"name": "Renamed"})
+        await client.post("/agent/update", content=body, headers=agent.sign_request("POST", "/agent/update", body))
+        top = (await client.get("/agents/top?limit=1&sort_by=active")).json()
+        assert top[0]["id"] == agent.agent_id and top[0]["name"] == "Renamed"
+    finally:
+        leaderboard.reset()
+
+@pytest.mark.asyncio
+async def test_rescore_reaches_top_after_sync(client, db_engine, db_session, loaded_leaderboard):
+    # Imported with a stale score, as bulk_import.py leaves agents until rescore.py runs
+    await db_session.execute(insert(Agent.__table__), [
+        {"id": "rescored-bot", "name": "Rescored", "public_key": "00", "trust_score": 0, "moltbook_karma": 10 ** 7, "score_version": None},
+        {"id": "rescored-rival", "name": "Rival", "public_key": "00", "trust_score": 50, "moltbook_karma": 80, "score_version": 1},
+    ])
+    await db_session.commit()
+    await loaded_leaderboard.load(db_session)
+    assert (await client.get("/agents/top?limit=1")).json()[0]["id"] != "rescored-bot"
+
+    report = await rescore(sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False))
+    assert report["rescored"] >= 1
+    assert await loaded_leaderboard.sync(db_session) >= 1
+    top = (await client.get("/agents/top?limit=1")).json()[0]
+    assert top["id"] == "rescored-bot" and top["trust_score"] > 10 ** 6
+    assert (await client.get("/agent/rescored-bot/rank")).json()["rank"] == 1
+    assert await loaded_leaderboard.sync(db_session) == 0
@@ -0,0 +1,22 @@
+import pytest
+import random
+from loadtest import Recorder, Swarm, drive, parse_mix, stub_proof
+
+def test_parse_mix_and_stub():
+    assert parse_mix("review=4, top=0,stake=1") == {"review": 4.0, "stake": 1.0}
+    with pytest.raises(ValueError): parse_mix("delete=1")
+    assert stub_proof("/load_ab12cd34/7") == b"agent-kred-verify: load_ab12cd34"
+
+def test_report_percentiles():
+    recorder = Recorder()
+    recorder.latencies["top"] = [i / 1000 for i in range(1, 101)]
+    report = recorder.report(2.0)["endpoints"]["top"]
+    assert (report["count"], report["rps"], report["p50_ms"], report["p99_ms"], report["max_ms"]) == (100, 50.0, 51.0, 100.0, 100.0)
+
+@pytest.mark.asyncio
+async def test_drive_runs_the_signed_flows(client):
+    swarm = Swarm(client, Recorder(), "http://proof-stub.local", random.Random(1))
+    report = await drive(swarm, 4, parse_mix("register=1,update=1,stake=1,top=1,profile=1"), 25, 0, 1)
+    assert report["setup"]["endpoints"]["register"]["status"] == {"200": 4}
+    assert report["requests"] == 25 and report["errors"] == 0
+    assert set(report["endpoints"]) <= {"register", "update", "stake", "top", "profile"}
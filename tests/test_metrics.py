@@ -0,0 +1,41 @@
+import pytest
+import json
+from sqlalchemy import select
+from metrics import Histogram, instrument_engine, statement_labels
+from models import Agent
+from agent_sdk import AgentSDK
+
+def test_histogram_buckets_are_cumulative_on_render():
+    h = Histogram("t_seconds", "test", ("route",), buckets=(0.01, 0.1))
+    for v in (0.005, 0.01, 0.05, 3.0): h.observe(v, "/x")
+    lines = list(h.collect())
+    assert 't_seconds_bucket{route="/x",le="0.01"} 2' in lines
+    assert 't_seconds_bucket{route="/x",le="0.1"} 3' in lines
+    assert 't_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 't_seconds_count{route="/x"} 4' in lines
+
+def test_statement_labels():
+    assert statement_labels('SELECT agents.id FROM agents WHERE agents.id = ?') == ("SELECT", "agents")
+    assert statement_labels('INSERT INTO reviews (score) VALUES (?)') == ("INSERT", "reviews")
+    assert statement_labels('PRAGMA table_info("agents")') == ("OTHER", "")
+
+@pytest.mark.asyncio
+async def test_engine_events_time_statements(db_engine, db_session):
+    h = Histogram("t_db_seconds", "test", ("operation", "table"))
+    instrument_engine(db_engine, h, known_tables={"agents"})
+    await db_session.execute(select(Agent.id).limit(1))
+    assert h.labels("SELECT", "agents").count >= 1
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client):
+    agent = AgentSDK()
+    body = json.dumps({"id": agent.agent_id, "name": "MetricsBot", "public_key": agent.public_key_hex})
+    assert (await client.post("/register", content=body, headers=agent.sign_request("POST", "/register", body))).status_code == 200
+    await client.get(f"/agent/{agent.agent_id}")
+    await client.get("/no/such/path")
+    resp = await client.get("/metrics")
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/plain")
+    text = resp.text
+    assert 'agentkred_http_request_seconds_count{method="GET",route="/agent/{agent_id}",status="200"}' in text
+    assert 'route="<unmatched>",status="404"' in text
+    assert 'agentkred_signature_verify_seconds_count{mode="inline",valid="true"}' in text
@@ -0,0 +1,54 @@
+import pytest
+import uuid
+from datetime import datetime, timedelta
+from models import Agent, Review
+from leaderboard import leaderboard
+
+async def seed_agents(db_session, n=7):
+    for i in range(n):
+        a = Agent(id=f"page_{uuid.uuid4().hex[:8]}", name="PageBot", public_key="00", verification_score=i % 3,
+                  review_score=0, moltbook_karma=0, staked_amount=0.0, last_active_at=datetime.utcnow())
+        a.calculate_total_score()
+        db_session.add(a)
+    await db_session.commit()
+
+async def walk(client, url):
+    rows, cursor = [], None
+    while True:
+        resp = await client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert resp.status_code == 200
+        rows += resp.json()
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor: return rows
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("indexed", [False, True])
+async def test_agents_top_keyset_pages_match_full_listing(client, db_session, indexed):
+    await seed_agents(db_session)
+    if indexed: await leaderboard.load(db_session)
+    try:
+        for sort_by in ("trust_score", "active"):
+            full = (await client.get(f"/agents/top?sort_by={sort_by}&limit=100000")).json()
+            paged = await walk(client, f"/agents/top?sort_by={sort_by}&limit=3")
+            assert [a["id"] for a in paged] == [a["id"] for a in full]
+    finally:
+        leaderboard.reset()
+
+@pytest.mark.asyncio
+async def test_reviews_keyset_pagination(client, db_session):
+    await seed_agents(db_session, 1)
+    target = f"target_{uuid.uuid4().hex[:8]}"
+    db_session.add(Agent(id=target, name="Target", public_key="00"))
+    reviewer = (await client.get("/agents/top?limit=1")).json()[0]["id"]
+    now = datetime.utcnow()
+    for i in range(5):
+        # two reviews share a timestamp so the id tie-breaker is exercised
+        db_session.add(Review(reviewer_id=reviewer, target_id=target, score=i, created_at=now - timedelta(seconds=i // 2)))
+    await db_session.commit()
+
+    paged = await walk(client, f"/agent/{target}/reviews?limit=2")
+    assert len(paged) == 5
+    assert sorted(r["score"] for r in paged) == [0, 1, 2, 3, 4]
+
+    resp = await client.get(f"/agent/{target}/reviews?cursor=not-a-cursor")
+    assert resp.status_code == 400
@@ -0,0 +1,86 @@
+import pytest
+import asyncio
+import json
+import sys
+import time
+import main
+from profiler import SamplingProfiler, Recording, profiler
+from agent_sdk import AgentSDK
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end: pass
+
+async def handler():
+    busy(0.05)
+    await asyncio.sleep(0.05)
+
+@pytest.mark.asyncio
+async def test_samples_running_and_awaiting_stacks(tmp_path):
+    p = SamplingProfiler(directory=str(tmp_path), max_files=2, interval=0.001, slow_seconds=0)
+    p.configure(enabled=True)
+    try:
+        rec = p.begin(sys._getframe())
+        await handler()
+        p.end(rec)
+    finally: p.configure(enabled=False)
+    stacks = "\n".join(rec.samples)
+    assert "test_samples_running_and_awaiting_stacks" in stacks and "busy" in stacks # running, from the anchor down
+    assert "handler" in stacks and "[await " in stacks # suspended in asyncio.sleep
+
+    names = [p.save(rec, "GET", "/agents/top", 0.1) for _ in range(3)]
+    assert p.list() == names[:0:-1] # ring of two, newest first
+    assert sorted(f.name for f in tmp_path.iterdir()) == sorted(names[1:])
+    line = (tmp_path / names[-1]).read_text().splitlines()[0]
+    assert line.rsplit(" ", 1)[1].isdigit() # folded: "a;b;c count"
+
+@pytest.mark.asyncio
+async def test_ended_recording_is_not_sampled_while_saving(tmp_path):
+    import threading
+    p = SamplingProfiler(directory=str(tmp_path), interval=0.001, slow_seconds=0)
+    in_pass = threading.Event()
+    def slow_stack(frame, rec):
+        in_pass.set()
+        time.sleep(0.05) # end() lands in the middle of a sampling pass
+        return "a;b"
+    p._running_stack = slow_stack
+    rec = p.begin(sys._getframe())
+    p.configure(enabled=True)
+    try:
+        in_pass.wait(1)
+        p.end(rec)
+        before = dict(rec.samples)
+        time.sleep(0.1) # longer than the pass end() interrupted
+        assert dict(rec.samples) == before
+    finally: p.configure(enabled=False)
+
+async def signed(client, agent, method, path, payload=None):
+    body = json.dumps(payload) if payload is not None else ""
+    return await client.request(method, path, content=body, headers=agent.sign_request(method, path, body))
+
+@pytest.mark.asyncio
+async def test_admin_toggle_and_download(client, tmp_path, monkeypatch):
+    admin, other = AgentSDK(), AgentSDK()
+    for a in (admin, other):
+        assert (await signed(client, a, "POST", "/register", {"id": a.agent_id, "name": "Ops", "public_key": a.public_key_hex})).status_code == 200
+    monkeypatch.setattr(main, "ADMIN_AGENT_IDS", {admin.agent_id})
+    monkeypatch.setattr(profiler, "directory", str(tmp_path))
+    monkeypatch.setattr(profiler, "_files", None)
+
+    assert (await signed(client, other, "POST", "/admin/profiler", {"enabled": True})).status_code == 403
+    try:
+        resp = await signed(client, admin, "POST", "/admin/profiler", {"enabled": True, "sample_rate": 1.0, "slow_ms": 0})
+        assert resp.status_code == 200 and resp.json()["enabled"] is True
+        await client.get("/agents/top")
+        assert profiler.profiled >= 1
+    finally: profiler.configure(enabled=False)
+
+    rec = Recording(None, None, 0)
+    rec.samples["a;b"] = 3
+    name = profiler.save(rec, "GET", "/agents/top", 1.5)
+    assert "_GET_agents-top_1500ms" in name
+    listed = (await signed(client, admin, "GET", "/admin/profiles")).json()
+    assert name in listed["profiles"] and listed["profiler"]["enabled"] is False
+    resp = await signed(client, admin, "GET", f"/admin/profiles/{name}")
+    assert resp.text == "a;b 3\n"
+    assert (await signed(client, admin, "GET", "/admin/profiles/..%2Fmain.py")).status_code == 404
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+import pytest_asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import main
+from proof_fetcher import ProofFetcher
+
+class StubHandler(BaseHTTPRequestHandler):
+    hits = []
+
+    def do_GET(self):
+        StubHandler.hits.append(self.path)
+        url = urlsplit(self.path)
+        if url.path == "/gist/ok/raw": body = b"agent-kred-verify: bot_1"
+        elif url.path == "/gist/big/raw": body = b"agent-kred-verify: bot_1" + b"x" * 10_000
+        elif url.path == "/oembed":
+            tweet = parse_qs(url.query)["url"][0]
+            body = json.dumps({"html": "<p>agent-kred-verify: bot_1</p>" if tweet.endswith("/1") else "<p>hi</p>"}).encode()
+        else:
+            self.send_response(404); self.end_headers(); return
+        self.send_response(200)
+        self.end_headers() # no Content-Length: the size cap must hold while streaming
+        self.wfile.write(body)
+        self.close_connection = True
+
+    def log_message(self, *args): pass
+
+@pytest.fixture(scope="module")
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+@pytest_asyncio.fixture
+async def fetcher(monkeypatch, stub_server):
+    f = ProofFetcher(max_bytes=1024)
+    monkeypatch.setattr(main, "proof_fetcher", f)
+    monkeypatch.setattr(main, "TWITTER_OEMBED_URL", f"{stub_server}/oembed")
+    StubHandler.hits.clear()
+    yield f
+    await f.close()
+
+@pytest.mark.asyncio
+async def test_github_positive_result_is_cached(fetcher, stub_server):
+    assert await main.verify_github_gist(f"{stub_server}/gist/ok/raw", "bot_1")
+    assert await main.verify_github_gist(f"{stub_server}/gist/ok/raw/", "bot_1") # same proof, normalized
+    assert not await main.verify_github_gist(f"{stub_server}/gist/ok/raw", "bot_2")
+    assert len(StubHandler.hits) == 2
+    assert fetcher.stats()["cache_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_missing_and_oversized_proofs_fail(fetcher, stub_server):
+    assert not await main.verify_github_gist(f"{stub_server}/gist/missing/raw", "bot_1")
+    assert not await main.verify_github_gist(f"{stub_server}/gist/big/raw", "bot_1")
+    assert fetcher.stats()["oversized"] == 1
+
+@pytest.mark.asyncio
+async def test_twitter_oembed(fetcher, stub_server):
+    assert await main.verify_twitter_tweet("https://x.com/bot/status/1", "bot_1")
+    assert not await main.verify_twitter_tweet("https://x.com/bot/status/2", "bot_1")
+    assert StubHandler.hits[0].startswith("/oembed?url=https%3A%2F%2Ftwitter.com")
+
+@pytest.mark.asyncio
+async def test_unreachable_host_is_not_cached():
+    f = ProofFetcher(timeout=0.5)
+    try:
+        url = "http://127.0.0.1:9/raw"
+        assert not await f.check("github", url, "bot_1", url, lambda t: True)
+        assert f.stats()["fetch_errors"] == 1 and f.stats()["cache_size"] == 0
+    finally:
+        await f.close()
+
+@pytest.mark.asyncio
+async def test_host_limits_are_dropped_when_idle(stub_server):
+    f = ProofFetcher(per_host=2)
+    try:
+        urls = [f"{stub_server}/gist/ok/raw?n={i}" for i in range(6)] + [f"http://127.0.0.{i}:9/raw" for i in range(2, 6)]
+        results = await asyncio.gather(*(f.fetch(u) for u in urls))
+        assert all(body for body, _ in results[:6]) # six fetches through one 2-slot semaphore
+        assert f._host_limits == {}
+    finally:
+        await f.close()
@@ -0,0 +1,97 @@
+import pytest
+import json
+from rate_limit import Limit, RateLimiter, TokenBuckets, parse_limits, rate_limiter
+from agent_sdk import AgentSDK
+from fastapi import HTTPException
+
+def test_parse_limits():
+    assert parse_limits("/review=120/60, /verify=10/60:5") == {"/review": Limit(2.0, 120.0), "/verify": Limit(10 / 60, 5.0)}
+
+def test_bucket_refills_lazily():
+    buckets = TokenBuckets()
+    limit = Limit(rate=2.0, burst=3)
+    assert [buckets.take("a", limit, now=100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take("a", limit, now=100.0) == pytest.approx(0.5)
+    assert buckets.take("a", limit, now=100.5) == 0.0 # one token back after half a second
+    assert buckets.take("b", limit, now=100.5) == 0.0 # other keys are independent
+
+def test_full_buckets_are_evicted():
+    buckets = TokenBuckets(shards=4, sweep_every=10**9)
+    limit = Limit(rate=1.0, burst=5)
+    for i in range(1000): buckets.take(f"agent-{i}", limit, now=0.0)
+    buckets.take("busy", limit, cost=5, now=9.0)
+    assert len(buckets) == 1001
+    for _ in range(4): buckets.sweep(now=10.0)
+    # Every idle bucket has refilled (and so is dropped); the one spent at t=9 has not
+    assert len(buckets) == 1 and buckets.evictions == 1000
+
+def test_limiter_429_with_retry_after_and_agent_override():
+    limiter = RateLimiter({"/review": Limit(1 / 60, 2)}, agent_multipliers={"trusted": 10})
+    limiter.check("/review", "bot")
+    limiter.check("/review", "bot")
+    with pytest.raises(HTTPException) as e: limiter.check("/review", "bot")
+    assert e.value.status_code == 429 and e.value.headers == {"Retry-After": "60"}
+    for _ in range(20): limiter.check("/review", "trusted")
+    limiter.check("/stake", "bot") # no limit configured
+    with pytest.raises(HTTPException) as e: limiter.check("/review", "other", cost=3)
+    assert e.value.detail == "Request exceeds rate limit burst" and e.value.headers is None
+
+def test_global_limit_refunds_the_agent():
+    limiter = RateLimiter({"/verify": Limit(1.0, 2)}, {"/verify": Limit(1 / 60, 1)})
+    limiter.check("/verify", "a")
+    with pytest.raises(HTTPException): limiter.check("/verify", "b")
+    # b's own bucket was not charged for the rejected request
+    assert limiter.buckets.take(("/verify", "b"), Limit(1e-9, 2), cost=2) == 0.0
+
+async def signed_post(client, agent, path, payload):
+    body = json.dumps(payload)
+    return await client.post(path, content=body, headers=agent.sign_request("POST", path, body))
+
+@pytest.mark.asyncio
+async def test_signed_writes_are_limited_per_agent(client, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "limits", {"/agent/update": Limit(1 / 60, 2), "/review": Limit(1 / 60, 3)})
+    monkeypatch.setattr(rate_limiter, "buckets", TokenBuckets())
+    agent, other = AgentSDK(), AgentSDK()
+    for a in (agent, other):
+        assert (await signed_post(client, a, "/register", {"id": a.agent_id, "name": "Limited", "public_key": a.public_key_hex})).status_code == 200
+    for bio in ("a", "b"):
+        assert (await signed_post(client, agent, "/agent/update", {"bio": bio})).status_code == 200
+    resp = await signed_post(client, agent, "/agent/update", {"bio": "c"})
+    assert resp.status_code == 429 and int(resp.headers["retry-after"]) > 0
+    assert (await signed_post(client, other, "/agent/update", {"bio": "c"})).status_code == 200
+
+    # Batched operations spend the buckets of their own endpoints
+    review = {"op": "review", "data": {"reviewer_id": other.agent_id, "target_id": agent.agent_id, "score": 1}}
+    resp = await signed_post(client, other, "/batch", {"operations": [review] * 4})
+    assert resp.status_code == 429 and resp.json()["detail"] == "Request exceeds rate limit burst"
+    resp = await signed_post(client, other, "/batch", {"operations": [{"op": "update", "data": {"bio": "d"}}] * 2})
+    assert resp.status_code == 429
+
+@pytest.mark.asyncio
+async def test_limited_requests_do_not_reach_the_replay_store(client, monkeypatch):
+    import main
+    from replay import LocalReplayStore
+    monkeypatch.setattr(rate_limiter, "limits", {"/agent/update": Limit(1 / 60, 1)})
+    monkeypatch.setattr(rate_limiter, "buckets", TokenBuckets())
+    monkeypatch.setattr(main, "replay_store", LocalReplayStore())
+    agent = AgentSDK()
+    assert (await signed_post(client, agent, "/register", {"id": agent.agent_id, "name": "Flood", "public_key": agent.public_key_hex})).status_code == 200
+    assert (await signed_post(client, agent, "/agent/update", {"bio": "a"})).status_code == 200
+    for bio in "bcd": assert (await signed_post(client, agent, "/agent/update", {"bio": bio})).status_code == 429
+    assert main.replay_store.stats()["entries"] == 2
+
+@pytest.mark.asyncio
+async def test_replays_do_not_spend_the_signers_tokens(client, monkeypatch):
+    import main
+    from replay import LocalReplayStore
+    monkeypatch.setattr(rate_limiter, "limits", {"/agent/update": Limit(1 / 60, 2)})
+    monkeypatch.setattr(rate_limiter, "buckets", TokenBuckets())
+    monkeypatch.setattr(main, "replay_store", LocalReplayStore())
+    agent = AgentSDK()
+    assert (await signed_post(client, agent, "/register", {"id": agent.agent_id, "name": "Victim", "public_key": agent.public_key_hex})).status_code == 200
+    body = json.dumps({"bio": "captured"})
+    headers = agent.sign_request("POST", "/agent/update", body)
+    assert (await client.post("/agent/update", content=body, headers=headers)).status_code == 200
+    for _ in range(5):
+        assert (await client.post("/agent/update", content=body, headers=headers)).status_code == 403
+    assert (await signed_post(client, agent, "/agent/update", {"bio": "fresh"})).status_code == 200
@@ -0,0 +1,75 @@
+import pytest
+import json
+import types
+import replay
+from replay import LocalReplayStore, RedisReplayStore, ReplayStoreFull, ReplayAgentFull
+from agent_sdk import AgentSDK
+
+class FakeRedis:
+    """The SET NX EX subset of redis.asyncio that RedisReplayStore uses."""
+
+    def __init__(self):
+        self.keys: dict[str, int] = {}
+        self.closed = False
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys: return None
+        self.keys[key] = ex
+        return True
+
+    async def aclose(self):
+        self.closed = True
+
+@pytest.mark.asyncio
+async def test_local_store_rejects_repeats_and_expires_by_slot():
+    store = LocalReplayStore(window=2, max_entries=600)
+    sig = bytes(range(64))
+    assert not await store.seen(sig, 1000)
+    assert await store.seen(sig, 1000)
+    assert not await store.seen(sig, 1001) # a different timestamp is a different message anyway
+    # One full ring later the slot starts over
+    assert not await store.seen(sig, 1000 + store.slots)
+    assert store.stats()["replays"] == 1
+
+@pytest.mark.asyncio
+async def test_local_store_refuses_when_a_second_is_full():
+    store = LocalReplayStore(window=1, max_entries=8, agent_share=1) # 2 per second
+    await store.seen(b"\x01" * 64, 50, "a")
+    await store.seen(b"\x02" * 64, 50, "b")
+    with pytest.raises(ReplayStoreFull):
+        await store.seen(b"\x03" * 64, 50, "c")
+    assert not await store.seen(b"\x03" * 64, 51, "c")
+
+@pytest.mark.asyncio
+async def test_local_store_bounds_each_agent():
+    store = LocalReplayStore(window=1, max_entries=40, agent_share=0.2) # 10 per second, 2 per agent
+    await store.seen(b"\x01" * 64, 50, "flood")
+    await store.seen(b"\x02" * 64, 50, "flood")
+    with pytest.raises(ReplayAgentFull):
+        await store.seen(b"\x03" * 64, 50, "flood")
+    assert not await store.seen(b"\x04" * 64, 50, "other") # the rest of the second is still there
+    assert store.stats()["rejected_agent"] == 1 and store.stats()["rejected_full"] == 0
+
+@pytest.mark.asyncio
+async def test_redis_store_sets_each_signature_once(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(replay, "aioredis", types.SimpleNamespace(from_url=lambda url: fake))
+    store = RedisReplayStore("redis://test", window=30)
+    sig = bytes(range(64))
+    assert not await store.seen(sig, 1000, "a")
+    assert await store.seen(sig, 1000, "a")
+    assert fake.keys == {"agentkred:replay:" + sig[:16].hex(): 61}
+    assert store.stats() == {"backend": "redis", "checks": 2, "replays": 1}
+    await store.close()
+    assert fake.closed
+
+@pytest.mark.asyncio
+async def test_replayed_request_is_rejected(client):
+    agent = AgentSDK()
+    body = json.dumps({"id": agent.agent_id, "name": "ReplayBot", "public_key": agent.public_key_hex})
+    assert (await client.post("/register", content=body, headers=agent.sign_request("POST", "/register", body))).status_code == 200
+    body = json.dumps({"bio": "hello"})
+    headers = agent.sign_request("POST", "/agent/update", body)
+    assert (await client.post("/agent/update", content=body, headers=headers)).status_code == 200
+    resp = await client.post("/agent/update", content=body, headers=headers)
+    assert resp.status_code == 403 and resp.json()["detail"] == "Replayed request"
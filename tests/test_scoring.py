@@ -0,0 +1,72 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, literal
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+import models
+from models import Agent, Base, ScoreFormula, trust_score_sql
+from rescore import rescore
+
+CASES = [(0, 0, 0, 0.0), (50, 30, 7, 99.9), (0, 0, 3, 1000.5), (5, 0, 0, 25000.0)]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("verif,review,karma,stake", CASES)
+async def test_sql_formula_matches_python(db_session, verif, review, karma, stake):
+    expected = Agent(verification_score=verif, review_score=review, moltbook_karma=karma, staked_amount=stake).calculate_total_score()
+    expr = trust_score_sql(literal(verif), literal(review), literal(karma), literal(stake))
+    assert (await db_session.execute(select(expr))).scalar() == expected
+
+def test_postgres_truncates_instead_of_rounding():
+    sql = str(trust_score_sql(Agent.verification_score, Agent.review_score, Agent.moltbook_karma, Agent.staked_amount).compile(dialect=postgresql.dialect()))
+    assert "CAST(TRUNC(agents.staked_amount) AS INTEGER)" in sql
+
+# --- Bulk rescore ---
+V2 = ScoreFormula(2, base=0, karma_weight=2.0, stake_cap=100)
+
+@pytest_asyncio.fixture
+async def scored_db(monkeypatch):
+    # Own database: rescoring rewrites every row in the table
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as db:
+        for i in range(25):
+            agent = Agent(id=f"agent-{i:03d}", name="Bot", public_key="00", verification_score=i, review_score=2 * i, moltbook_karma=i % 7, staked_amount=i * 13.7)
+            agent.calculate_total_score()
+            db.add(agent)
+        await db.commit()
+    monkeypatch.setitem(models.SCORE_FORMULAS, 2, V2)
+    yield factory
+    await engine.dispose()
+
+async def assert_all_scored(factory, formula):
+    async with factory() as db:
+        for a in (await db.execute(select(Agent))).scalars():
+            assert a.score_version == formula.version
+            assert a.trust_score == formula.compute(a.verification_score, a.review_score, a.moltbook_karma, a.staked_amount)
+
+@pytest.mark.asyncio
+async def test_rescore_applies_new_formula_in_chunks(scored_db):
+    seen = []
+    summary = await rescore(scored_db, version=2, chunk_size=10, progress=lambda done, total: seen.append((done, total)))
+    assert summary["rescored"] == 25 and summary["chunks"] == 3 and summary["remaining"] == 0
+    assert seen == [(10, 25), (20, 25), (25, 25)]
+    await assert_all_scored(scored_db, V2)
+    assert (await rescore(scored_db, version=2))["rescored"] == 0
+
+@pytest.mark.asyncio
+async def test_rescore_resumes_after_interruption(scored_db):
+    first = await rescore(scored_db, version=2, chunk_size=10, max_chunks=1)
+    assert first["rescored"] == 10 and first["remaining"] == 15
+    second = await rescore(scored_db, version=2, chunk_size=10)
+    assert second["total"] == 15 and second["remaining"] == 0
+    await assert_all_scored(scored_db, V2)
+
+@pytest.mark.asyncio
+async def test_numpy_rescore_matches_formula(scored_db):
+    pytest.importorskip("numpy")
+    summary = await rescore(scored_db, version=2, chunk_size=7, method="numpy")
+    assert summary["rescored"] == 25 and summary["remaining"] == 0
+    await assert_all_scored(scored_db, V2)
@@ -0,0 +1,63 @@
+import json
+import pytest
+from sqlalchemy import update
+from agent_sdk import AgentSDK
+from models import Agent
+from search import normalize_tags
+
+async def signed_post(client, agent, path, payload):
+    body = json.dumps(payload)
+    return await client.post(path, content=body, headers=agent.sign_request("POST", path, body))
+
+async def make_agent(client, db_session, name, trust_score, **profile):
+    agent = AgentSDK("srch")
+    assert (await signed_post(client, agent, "/register", {"id": agent.agent_id, "name": name, "public_key": agent.public_key_hex})).status_code == 200
+    assert (await signed_post(client, agent, "/agent/update", profile)).status_code == 200
+    await db_session.execute(update(Agent).where(Agent.id == agent.agent_id).values(trust_score=trust_score))
+    await db_session.commit()
+    return agent
+
+async def search(client, **params):
+    resp = await client.get("/agents/search", params=params)
+    assert resp.status_code == 200, resp.text
+    return [a["name"] for a in resp.json()]
+
+def test_normalize_tags():
+    assert normalize_tags("coding, DeFi,,defi") == ["coding", "defi"]
+    assert normalize_tags(["Art "]) == ["art"] and normalize_tags(None) == []
+
+@pytest.mark.asyncio
+async def test_search_by_tags_name_and_bio(client, db_session):
+    await make_agent(client, db_session, "Oracle Prime", 300, tags=["zq-defi", "zq-oracles"], bio="Price feeds for lending markets")
+    await make_agent(client, db_session, "Oracle Lite", 200, tags=["zq-defi"], bio="Cheap price feeds, best effort")
+    await make_agent(client, db_session, "Painter", 100, tags=["zq-art", "ZQ-DeFi"], bio="Generative art for NFT markets")
+
+    assert await search(client, tags="zq-defi") == ["Oracle Prime", "Oracle Lite", "Painter"]
+    assert await search(client, tags="zq-oracles,zq-art") == ["Oracle Prime", "Painter"]
+    assert await search(client, tags="zq-defi,zq-oracles", match="all") == ["Oracle Prime"]
+    assert await search(client, tags="zq-defi", name="oracle l") == ["Oracle Lite"]
+    assert await search(client, tags="zq-defi", q="PRICE feeds") == ["Oracle Prime", "Oracle Lite"]
+    assert await search(client, tags="zq-defi", q="markets", name="p") == ["Painter"]
+    assert await search(client, name="oracle_") == []
+
+    # Keyset pages by trust_score
+    first = await client.get("/agents/search", params={"tags": "zq-defi", "limit": 2})
+    assert [a["name"] for a in first.json()] == ["Oracle Prime", "Oracle Lite"]
+    assert await search(client, tags="zq-defi", limit=2, cursor=first.headers["X-Next-Cursor"]) == ["Painter"]
+
+@pytest.mark.asyncio
+async def test_profile_update_reindexes(client, db_session):
+    agent = await make_agent(client, db_session, "Shifter", 50, tags=["zr-old"], bio="Writes solidity audits")
+    assert await search(client, tags="zr-old", q="solidity") == ["Shifter"]
+    assert (await signed_post(client, agent, "/agent/update", {"tags": ["zr-new"], "bio": "Rust tooling"})).status_code == 200
+    assert await search(client, tags="zr-old") == [] and await search(client, tags="zr-new", q="solidity") == []
+    assert await search(client, tags="zr-new", q="rust") == ["Shifter"]
+    # A name-only update leaves the index alone
+    assert (await signed_post(client, agent, "/agent/update", {"name": "Shifter II"})).status_code == 200
+    assert await search(client, tags="zr-new", q="tooling") == ["Shifter II"]
+
+@pytest.mark.asyncio
+async def test_search_rejects_bad_params(client):
+    assert (await client.get("/agents/search", params={"match": "some"})).status_code == 400
+    assert (await client.get("/agents/search", params={"q": "!!"})).status_code == 400
+    assert (await client.get("/agents/search", params={"tags": ",".join(f"t{i}" for i in range(40))})).status_code == 400
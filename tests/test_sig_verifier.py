@@ -0,0 +1,50 @@
+import pytest
+import asyncio
+from nacl.signing import SigningKey
+from sig_verifier import SignatureVerifier
+
+def signed(message: bytes):
+    sk = SigningKey.generate()
+    return sk.verify_key, message, sk.sign(message).signature
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+async def test_modes_accept_good_and_reject_bad(mode):
+    verifier = SignatureVerifier(mode=mode, workers=2, process_min_bytes=1024)
+    try:
+        for body in (b"small", b"x" * 4096):
+            key, msg, sig = signed(body)
+            assert await verifier.verify(key, msg, sig)
+            assert not await verifier.verify(key, msg + b"!", sig)
+    finally:
+        verifier.shutdown()
+
+@pytest.mark.asyncio
+async def test_concurrent_checks_are_batched():
+    verifier = SignatureVerifier(mode="thread", workers=2, batch_size=16)
+    items = [signed(f"msg {i}".encode()) for i in range(40)]
+    try:
+        results = await asyncio.gather(*(verifier.verify(*item) for item in items))
+    finally:
+        verifier.shutdown()
+    assert all(results)
+    assert verifier.stats()["batches"] == 3  # 16 + 16 + 8
+
+@pytest.mark.asyncio
+async def test_a_batch_is_spread_over_the_worker_threads(monkeypatch):
+    import sig_verifier, threading, time
+    threads = set()
+    def verify_batch(items):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.05) # hold the thread so the other slices can't queue behind it
+        return [sig_verifier._verify_one(*item) for item in items]
+    monkeypatch.setattr(sig_verifier, "_verify_batch", verify_batch)
+    verifier = SignatureVerifier(mode="thread", workers=4, batch_size=64)
+    items = [signed(f"msg {i}".encode()) for i in range(40)]
+    try:
+        results = await asyncio.gather(*(verifier.verify(*item) for item in items))
+    finally:
+        verifier.shutdown()
+    assert all(results)
+    assert verifier.stats()["batches"] == 1 and verifier.stats()["jobs"] == 4
+    assert len(threads) == 4
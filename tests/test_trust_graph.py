@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy import func, select, update
+from models import Agent, Review, Verification
+from trust_graph import TrustGraph, trust_graph
+
+pytest.importorskip("numpy")
+
+def ring_graph():
+    graph = TrustGraph()
+    graph.add_agents([("seed", 0.0), ("whale", 5000.0), ("alice", 0.0), ("bob", 0.0)] + [(f"sybil-{i}", 0.0) for i in range(4)])
+    graph.set_verified(["seed"])
+    graph.add_reviews([("seed", "alice", 5), ("whale", "bob", 4), ("alice", "seed", 3), ("bob", "alice", 2)])
+    # Four sybils praising each other in a ring, both directions
+    graph.add_reviews([(f"sybil-{i}", f"sybil-{(i + d) % 4}", 5) for i in range(4) for d in (1, 3) for _ in range(10)])
+    return graph
+
+def test_trust_flows_from_seeds_not_around_rings():
+    graph = ring_graph()
+    assert graph.solve() > 1
+    assert abs(graph.trust.sum() - 1) < 1e-9
+    assert graph.score("alice") > graph.score("bob") > 0
+    assert all(graph.score(f"sybil-{i}") == 0 for i in range(4))
+
+def test_clusters_flag_unseeded_rings_only():
+    clusters = ring_graph().clusters()
+    assert [c["agent_ids"] for c in clusters] == [[f"sybil-{i}" for i in range(4)]]
+    assert clusters[0]["internal_share"] == 1.0 and clusters[0]["internal_weight"] == 400.0
+
+def random_reviews(rng, n, m):
+    return [(f"a{s}", f"a{d}", 5) for s, d in rng.integers(0, n, (m, 2)).tolist()]
+
+def test_incremental_update_warm_starts():
+    import numpy as np
+    rng = np.random.default_rng(7)
+    reviews = random_reviews(rng, 2000, 20_000)
+    def build(rows):
+        graph = TrustGraph()
+        graph.add_agents((f"a{i}", 0.0) for i in range(2000))
+        graph.set_verified(f"a{i}" for i in range(50))
+        graph.add_reviews(rows)
+        return graph
+    graph = build(reviews)
+    cold = graph.solve()
+    extra = random_reviews(rng, 2000, 20)
+    graph.add_reviews(extra)
+    assert graph.solve() < cold
+    fresh = build(reviews + extra)
+    fresh.solve()
+    assert np.abs(fresh.trust - graph.trust).sum() < 1e-5
+
+@pytest.mark.asyncio
+async def test_refresh_writes_graph_score_and_serves_clusters(client, db_session):
+    try:
+        db_session.add_all([Agent(id=f"tg-{i}", name="Bot", public_key="00", last_active_at=None) for i in range(5)])
+        db_session.add(Verification(agent_id="tg-0", platform="github", proof_url="u", is_verified=True))
+        db_session.add_all([Review(reviewer_id="tg-0", target_id="tg-1", score=5)] +
+                           [Review(reviewer_id=f"tg-{i}", target_id=f"tg-{j}", score=5) for i in (2, 3, 4) for j in (2, 3, 4) if i != j])
+        await db_session.commit()
+
+        stats = await trust_graph.refresh(db_session, full=True)
+        assert stats["ready"] and stats["changed"] >= 5
+        scores = dict((await db_session.execute(select(Agent.id, Agent.graph_score).where(Agent.id.like("tg-%")))).all())
+        assert scores["tg-1"] > 0 and scores["tg-2"] == scores["tg-3"] == scores["tg-4"] == 0
+
+        resp = await client.get("/trust/clusters")
+        assert ["tg-2", "tg-3", "tg-4"] in [c["agent_ids"] for c in resp.json()]
+
+        # Incremental: a review from the seeded agent pulls tg-2 out of zero
+        db_session.add(Review(reviewer_id="tg-0", target_id="tg-2", score=5))
+        await db_session.commit()
+        await trust_graph.refresh(db_session)
+        assert (await client.get("/agent/tg-2")).json()["graph_score"] > 0
+
+        # A stake written without touching last_active_at (the chain indexer) is seen by updated_at
+        await db_session.execute(update(Agent).where(Agent.id == "tg-3").values(staked_amount=500.0))
+        await db_session.commit()
+        await trust_graph.sync(db_session)
+        assert trust_graph.stake[trust_graph.index["tg-3"]] == 500.0
+    finally:
+        trust_graph.reset()
+    assert (await client.get("/trust/clusters")).status_code == 503
+
+@pytest.mark.asyncio
+async def test_sync_sees_reviews_committed_out_of_id_order(db_session):
+    db_session.add_all([Agent(id=f"tgo-{i}", name="Bot", public_key="00") for i in range(3)])
+    await db_session.commit()
+    top = (await db_session.execute(select(func.max(Review.id)))).scalar() or 0
+    graph = TrustGraph()
+    await graph.load(db_session)
+    edges = graph.stats()["edges"]
+
+    # The higher id commits (and is synced) first, then the lower one lands
+    db_session.add(Review(id=top + 100, reviewer_id="tgo-0", target_id="tgo-1", score=5))
+    await db_session.commit()
+    await graph.sync(db_session)
+    db_session.add(Review(id=top + 50, reviewer_id="tgo-0", target_id="tgo-2", score=5))
+    await db_session.commit()
+    await graph.sync(db_session)
+    assert graph.stats()["edges"] == edges + 2
+
+    # Rows still inside the overlap window aren't added twice
+    await graph.sync(db_session)
+    assert graph.stats()["edges"] == edges + 2
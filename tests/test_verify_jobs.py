@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+import json
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from proof_fetcher import ProofFetchError
+from verify_worker import VerificationWorker
+from agent_sdk import AgentSDK
+
+async def signed_post(client, agent, path, payload):
+    body = json.dumps(payload)
+    return await client.post(path, content=body, headers=agent.sign_request("POST", path, body))
+
+async def queue_job(client, agent, url):
+    await signed_post(client, agent, "/register", {"id": agent.agent_id, "name": "JobBot", "public_key": agent.public_key_hex})
+    resp = await signed_post(client, agent, "/verify", {"agent_id": agent.agent_id, "platform": "github", "proof_url": url, "background": True})
+    assert resp.status_code == 202
+    return resp.json()["job_id"]
+
+def worker_for(db_engine, check):
+    return VerificationWorker(sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False), check)
+
+@pytest.mark.asyncio
+async def test_background_verification_applies_boost(client, db_engine):
+    agent = AgentSDK()
+    job_id = await queue_job(client, agent, "https://gist.github.com/bot/1")
+    assert (await client.get(f"/verify/{job_id}")).json()["status"] == "pending"
+
+    async def check(platform, proof_url, agent_id, strict=False):
+        return agent_id == agent.agent_id
+    assert await worker_for(db_engine, check).run_once() >= 1
+
+    job = (await client.get(f"/verify/{job_id}")).json()
+    assert job["status"] == "verified" and job["attempts"] == 1
+    assert (await client.get(f"/agent/{agent.agent_id}")).json()["verification_score"] == 50
+
+@pytest.mark.asyncio
+async def test_no_session_is_held_during_the_check(client, db_engine):
+    agent = AgentSDK()
+    job_id = await queue_job(client, agent, "https://gist.github.com/bot/private-5")
+    assert "proof_url" not in (await client.get(f"/verify/{job_id}")).json()
+
+    factory, open_sessions = sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False), []
+    class Counted:
+        async def __aenter__(self):
+            self.db = await factory().__aenter__()
+            open_sessions.append(self)
+            return self.db
+        async def __aexit__(self, *exc):
+            open_sessions.remove(self)
+            return await self.db.__aexit__(*exc)
+    seen = []
+    async def check(platform, proof_url, agent_id, strict=False):
+        seen.append(len(open_sessions))
+        return True
+    worker = VerificationWorker(Counted, check)
+    await worker.process(job_id, dict(await worker.claim(10 ** 9))[job_id])
+    assert seen == [0]
+    assert (await client.get(f"/verify/{job_id}")).json()["status"] == "verified"
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_retried_later(client, db_engine):
+    agent = AgentSDK()
+    job_id = await queue_job(client, agent, "https://gist.github.com/bot/2")
+
+    async def flaky(platform, proof_url, agent_id, strict=False):
+        raise ProofFetchError("upstream 503")
+    worker = worker_for(db_engine, flaky)
+    await worker.run_once()
+    job = (await client.get(f"/verify/{job_id}")).json()
+    assert job["status"] == "pending" and job["attempts"] == 1
+    assert job["last_error"] == "upstream 503"
+    assert await worker.run_once() == 0 # backing off
+
+@pytest.mark.asyncio
+async def test_unknown_job(client):
+    assert (await client.get("/verify/999999")).status_code == 404
+
+@pytest.mark.asyncio
+async def test_reclaimed_job_is_boosted_once(client, db_engine):
+    agent = AgentSDK()
+    job_id = await queue_job(client, agent, "https://gist.github.com/bot/3")
+
+    async def check(platform, proof_url, agent_id, strict=False):
+        return True
+    slow, other = worker_for(db_engine, check), worker_for(db_engine, check)
+    slow.lease_seconds = 0 # the lease runs out straight away and the other worker claims the job again
+    first = dict(await slow.claim(10 ** 9))[job_id]
+    second = dict(await other.claim(10 ** 9))[job_id]
+    await slow.process(job_id, first)
+    await other.process(job_id, second)
+    assert (await client.get(f"/verify/{job_id}")).json()["status"] == "verified"
+    assert (await client.get(f"/agent/{agent.agent_id}")).json()["verification_score"] == 50
+
+@pytest.mark.asyncio
+async def test_unexpected_error_is_a_failed_attempt(client, db_engine):
+    agent = AgentSDK()
+    job_id = await queue_job(client, agent, "https://gist.github.com/bot/4")
+
+    async def broken(platform, proof_url, agent_id, strict=False):
+        raise KeyError("proof")
+    await worker_for(db_engine, broken).run_once()
+    job = (await client.get(f"/verify/{job_id}")).json()
+    assert job["status"] == "pending" and job["attempts"] == 1 and job["last_error"] == "'proof'"
+
+@pytest.mark.asyncio
+async def test_run_survives_claim_errors(db_engine):
+    worker = worker_for(db_engine, None)
+    worker.poll_interval = 0.01
+    calls, recovered = [], asyncio.Event()
+    async def claim(limit):
+        calls.append(limit)
+        if len(calls) == 1: raise OSError("database is locked")
+        recovered.set()
+        return []
+    worker.claim = claim
+    worker.start()
+    await asyncio.wait_for(recovered.wait(), 1)
+    await worker.stop()
@@ -0,0 +1,336 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import select, update, func, bindparam
+from models import Agent, Verification, Review
+from leaderboard import leaderboard
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+try:
+    import numpy as np
+except ImportError: # optional: pip install 'agentkred[trust]'
+    np = None
+
+# --- Trust Graph ---
+# EigenTrust-style propagation over the review graph. Positive reviews are
+# edges reviewer -> target weighted by score, normalized per reviewer, and
+# trust flows along them by power iteration. A share of every step (and the
+# mass of agents that reviewed nobody) restarts at the seeds: agents with a
+# verified proof, plus staked agents in proportion to their stake. A ring of
+# unseeded agents reviewing each other gets no trust however many reviews it
+# trades, unless trusted agents review into it.
+#
+# graph_score is the propagated trust scaled so an average agent gets
+# SCORE_UNIT, capped at SCORE_CAP. It's exposed next to the other score
+# components; folding it into trust_score is a new ScoreFormula version.
+#
+# load() rebuilds from the DB; sync() pulls reviews, verifications and stake
+# changes since the last pass, and solve() warm-starts from the previous
+# vector so an incremental update needs a few iterations instead of ~50.
+
+log = logging.getLogger("agentkred.trust_graph")
+
+def _require_numpy():
+    if np is None: raise RuntimeError("trust_graph needs numpy (pip install 'agentkred[trust]')")
+
+def _strongly_connected(n: int, indptr: list, targets: list) -> list:
+    """Iterative Tarjan: component label per node."""
+    index, low, comp = [-1] * n, [0] * n, [-1] * n
+    on_stack = [False] * n
+    stack, counter, ncomp = [], 0, 0
+    for root in range(n):
+        if index[root] != -1: continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, indptr[root])]
+        while work:
+            v, i = work[-1]
+            if i < indptr[v + 1]:
+                work[-1] = (v, i + 1)
+                w = targets[i]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, indptr[w]))
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+            work.pop()
+            if work:
+                u = work[-1][0]
+                if low[v] < low[u]: low[u] = low[v]
+            if low[v] == index[v]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp[w] = ncomp
+                    if w == v: break
+                ncomp += 1
+    return comp
+
+class TrustGraph:
+    def __init__(self, damping: float = 0.85, tol: float = 1e-6, max_iter: int = 100, verified_seed: float = 1.0,
+                 stake_cap: float = 1000.0, score_unit: float = 10.0, score_cap: int = 100):
+        self.damping = damping # share of each step that follows review edges
+        self.tol = tol
+        self.max_iter = max_iter
+        self.verified_seed = verified_seed
+        self.stake_cap = stake_cap
+        self.score_unit = score_unit
+        self.score_cap = score_cap
+        self.reset()
+
+    def reset(self):
+        self.ready = False
+        self.ids: list[str] = []
+        self.index: dict[str, int] = {}
+        self.verified: set[int] = set()
+        self.stake: dict[int, float] = {}
+        self._pending: list[tuple[int, int, float]] = []
+        self._src = self._dst = self._w = None
+        self.trust = None
+        self._written = None
+        self._clusters: dict[tuple, list] = {}
+        self._recent_reviews: set[int] = set() # ids already added with created_at inside the sync overlap
+        self._synced_at: Optional[datetime] = None
+        self.iterations = 0
+        self.solve_seconds = 0.0
+        self.edges = 0
+
+    # --- Graph input ---
+    def _node(self, agent_id: str) -> int:
+        i = self.index.get(agent_id)
+        if i is None:
+            i = self.index[agent_id] = len(self.ids)
+            self.ids.append(agent_id)
+        return i
+
+    def add_agents(self, rows: Iterable[tuple[str, float]]):
+        """(agent_id, staked_amount) rows; known agents get their stake updated."""
+        for agent_id, stake in rows:
+            i = self._node(agent_id)
+            if stake and stake > 0: self.stake[i] = stake
+            else: self.stake.pop(i, None)
+
+    def set_verified(self, agent_ids: Iterable[str]):
+        self.verified.update(self._node(a) for a in agent_ids)
+
+    def add_reviews(self, rows: Iterable[tuple[str, str, int]]):
+        """(reviewer_id, target_id, score) rows; only positive, non-self reviews carry trust."""
+        node = self._node
+        self._pending.extend((node(r), node(t), float(s)) for r, t, s in rows if s > 0 and r != t)
+
+    def _flush(self):
+        _require_numpy()
+        if self._src is None:
+            self._src, self._dst, self._w = np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+        if self._pending:
+            src, dst, w = zip(*self._pending)
+            self._src = np.concatenate([self._src, np.array(src, np.int64)])
+            self._dst = np.concatenate([self._dst, np.array(dst, np.int64)])
+            self._w = np.concatenate([self._w, np.array(w)])
+            self._pending = []
+        self.edges = len(self._src)
+
+    # --- Propagation ---
+    def _seed_vector(self, n: int):
+        p = np.zeros(n)
+        if self.verified: p[np.fromiter(self.verified, np.int64, len(self.verified))] += self.verified_seed
+        if self.stake:
+            idx = np.fromiter(self.stake.keys(), np.int64, len(self.stake))
+            p[idx] += np.minimum(np.fromiter(self.stake.values(), float, len(self.stake)), self.stake_cap) / self.stake_cap
+        total = p.sum()
+        return p / total if total > 0 else np.full(n, 1.0 / n)
+
+    def solve(self) -> int:
+        """Power-iterate to convergence, warm-starting from the last vector; returns iterations."""
+        self._flush()
+        n = len(self.ids)
+        start = time.perf_counter()
+        self._clusters = {}
+        if n == 0:
+            self.trust, self.iterations, self.ready = np.zeros(0), 0, True
+            return 0
+        p = self._seed_vector(n)
+        src, dst = self._src, self._dst
+        out = np.bincount(src, weights=self._w, minlength=n)
+        dangling = out == 0
+        norm = self._w / out[src] if len(src) else self._w
+        t = p.copy()
+        if self.trust is not None and self.trust.sum() > 0:
+            t = np.zeros(n)
+            t[:len(self.trust)] = self.trust
+            t /= t.sum()
+        iterations = 0
+        for iterations in range(1, self.max_iter + 1):
+            nxt = np.bincount(dst, weights=t[src] * norm, minlength=n)
+            nxt += t[dangling].sum() * p
+            nxt = self.damping * nxt + (1 - self.damping) * p
+            delta = np.abs(nxt - t).sum()
+            t = nxt
+            if delta < self.tol: break
+        self.trust, self.iterations, self.ready = t, iterations, True
+        self.solve_seconds = time.perf_counter() - start
+        return iterations
+
+    def scores(self):
+        """graph_score per node, in ``ids`` order."""
+        return np.minimum(np.floor(self.trust * len(self.ids) * self.score_unit), self.score_cap).astype(np.int64)
+
+    def score(self, agent_id: str) -> Optional[int]:
+        i = self.index.get(agent_id)
+        if i is None or self.trust is None or i >= len(self.trust): return None
+        return int(self.scores()[i])
+
+    # --- Collusion clusters ---
+    def clusters(self, min_size: int = 3, min_internal_share: float = 0.8, limit: int = 50) -> list[dict]:
+        """Strongly connected review groups with no seeded member that mostly review each other.
+
+        internal_share is the cluster's internal review weight over internal plus
+        inbound weight; sorted by internal weight, heaviest first.
+        """
+        key = (min_size, min_internal_share, limit)
+        if key in self._clusters: return self._clusters[key]
+        self._flush()
+        n = len(self.ids)
+        if n == 0 or not self.edges: return []
+        # Merge parallel edges into one weighted edge; keys come back sorted by source
+        keys, inverse = np.unique(self._src * n + self._dst, return_inverse=True)
+        weights = np.bincount(inverse, weights=self._w)
+        src, dst = keys // n, keys % n
+        indptr = np.searchsorted(src, np.arange(n + 1))
+        comp = np.array(_strongly_connected(n, indptr.tolist(), dst.tolist()), np.int64)
+        ncomp = int(comp.max()) + 1
+        sizes = np.bincount(comp, minlength=ncomp)
+        inside = comp[src] == comp[dst]
+        internal = np.bincount(comp[src][inside], weights=weights[inside], minlength=ncomp)
+        inbound = np.bincount(comp[dst][~inside], weights=weights[~inside], minlength=ncomp)
+        seeds = list(self.verified | set(self.stake))
+        seeded = np.bincount(comp[seeds], minlength=ncomp) if seeds else np.zeros(ncomp, np.int64)
+        share = internal / np.maximum(internal + inbound, 1e-12)
+        suspects = np.flatnonzero((sizes >= min_size) & (seeded == 0) & (share >= min_internal_share))
+        suspects = suspects[np.argsort(-internal[suspects], kind="stable")][:limit]
+        scores = self.scores() if self.trust is not None and len(self.trust) == n else np.zeros(n, np.int64)
+        order = np.argsort(comp, kind="stable")
+        bounds = np.searchsorted(comp[order], suspects), np.searchsorted(comp[order], suspects, side="right")
+        out = []
+        for c, lo, hi in zip(suspects.tolist(), *bounds):
+            members = order[lo:hi]
+            out.append({
+                "agent_ids": sorted(self.ids[i] for i in members.tolist()),
+                "size": int(sizes[c]),
+                "internal_weight": float(internal[c]),
+                "inbound_weight": float(inbound[c]),
+                "internal_share": float(share[c]),
+                "mean_graph_score": float(scores[members].mean()),
+            })
+        self._clusters[key] = out
+        return out
+
+    # --- Database ---
+    async def load(self, db, overlap: float = 5.0):
+        """Full rebuild from the agents, verifications and reviews tables."""
+        _require_numpy()
+        self.reset()
+        self._synced_at = datetime.utcnow()
+        recent = self._synced_at - timedelta(seconds=overlap)
+        self.add_agents((await db.execute(select(Agent.id, Agent.staked_amount))).all())
+        self.set_verified((await db.execute(select(Verification.agent_id).where(Verification.is_verified == True).distinct())).scalars())
+        rows = (await db.execute(select(Review.id, Review.created_at, Review.reviewer_id, Review.target_id, Review.score).where(Review.score > 0))).all()
+        self._recent_reviews = {i for i, created, *_ in rows if created is not None and created >= recent}
+        self.add_reviews((r, t, s) for _, _, r, t, s in rows)
+
+    async def sync(self, db, overlap: float = 5.0):
+        """Pull changes since the last load/sync: agents (new, or stake changed) by updated_at, verifications and reviews by time.
+
+        Each window reaches ``overlap`` seconds back, so rows that committed
+        late (or out of id order) are still seen; reviews already added from
+        the previous window are skipped by id. Anything later than that is
+        caught by the periodic full rebuild.
+        """
+        if self._synced_at is None: return await self.load(db, overlap)
+        since, self._synced_at = self._synced_at - timedelta(seconds=overlap), datetime.utcnow()
+        self.add_agents((await db.execute(select(Agent.id, Agent.staked_amount).where(Agent.updated_at >= since))).all())
+        self.set_verified((await db.execute(
+            select(Verification.agent_id).where(Verification.is_verified == True, Verification.verified_at >= since)
+        )).scalars())
+        rows = (await db.execute(
+            select(Review.id, Review.reviewer_id, Review.target_id, Review.score).where(Review.created_at >= since, Review.score > 0)
+        )).all()
+        seen, self._recent_reviews = self._recent_reviews, {row[0] for row in rows}
+        self.add_reviews((r, t, s) for i, r, t, s in rows if i not in seen)
+
+    async def write(self, db, chunk_size: int = 10_000) -> int:
+        """Persist graph_score for agents whose score changed; returns how many."""
+        scores = self.scores()
+        written = np.full(len(scores), -1, np.int64)
+        if self._written is not None: written[:len(self._written)] = self._written
+        changed = np.flatnonzero(scores != written).tolist()
+        t = Agent.__table__
+        stmt = update(t).where(t.c.id == bindparam("_id")).values(graph_score=bindparam("_g"))
+        for lo in range(0, len(changed), chunk_size):
+            await db.execute(stmt, [{"_id": self.ids[i], "_g": int(scores[i])} for i in changed[lo:lo + chunk_size]])
+        await db.commit()
+        self._written = scores
+        leaderboard.patch("graph_score", {self.ids[i]: int(scores[i]) for i in changed})
+        return len(changed)
+
+    async def refresh(self, db, full: bool = False) -> dict:
+        if full or not self.ready: await self.load(db)
+        else: await self.sync(db)
+        self.solve()
+        changed = await self.write(db)
+        return {**self.stats(), "changed": changed}
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "agents": len(self.ids), "edges": self.edges + len(self._pending), "seeds": len(self.verified | set(self.stake)),
+                "iterations": self.iterations, "solve_seconds": self.solve_seconds}
+
+trust_graph = TrustGraph(
+    damping=float(os.getenv("TRUST_GRAPH_DAMPING", "0.85")),
+    stake_cap=float(os.getenv("TRUST_GRAPH_STAKE_CAP", "1000")),
+)
+
+TRUST_GRAPH = os.getenv("TRUST_GRAPH", "off") # inprocess | off
+TRUST_GRAPH_INTERVAL = float(os.getenv("TRUST_GRAPH_INTERVAL", "30"))
+TRUST_GRAPH_REBUILD_SECONDS = float(os.getenv("TRUST_GRAPH_REBUILD_SECONDS", "3600"))
+
+async def run_trust_graph(session_factory, graph: TrustGraph = trust_graph, interval: float = TRUST_GRAPH_INTERVAL,
+                          rebuild_every: float = TRUST_GRAPH_REBUILD_SECONDS):
+    """Incremental refresh every ``interval`` seconds, full rebuild every ``rebuild_every``."""
+    last_rebuild = None
+    while True:
+        full = last_rebuild is None or time.monotonic() - last_rebuild >= rebuild_every
+        try:
+            async with session_factory() as db: stats = await graph.refresh(db, full=full)
+            if full: last_rebuild = time.monotonic()
+            log.info("trust graph %s: %s", "rebuilt" if full else "updated", stats)
+        except Exception:
+            log.exception("trust graph refresh failed")
+        await asyncio.sleep(interval)
+
+async def _main():
+    # Batch mode: full rebuild, write graph_score for every agent, print the clusters
+    parser = argparse.ArgumentParser(description="Rebuild propagated trust (graph_score) from the review graph")
+    parser.add_argument("--clusters", type=int, default=20, help="suspected collusion clusters to print")
+    args = parser.parse_args()
+
+    from database import AsyncSessionLocal, engine
+    try:
+        async with AsyncSessionLocal() as db: stats = await trust_graph.refresh(db, full=True)
+    finally:
+        await engine.dispose()
+    print(f"{stats['agents']} agents, {stats['edges']} edges, {stats['seeds']} seeds: "
+          f"{stats['iterations']} iterations in {stats['solve_seconds']:.2f}s, {stats['changed']} scores written")
+    for c in trust_graph.clusters(limit=args.clusters):
+        print(f"  cluster of {c['size']}: internal share {c['internal_share']:.2f}, {', '.join(c['agent_ids'][:10])}")
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import update
+from sqlalchemy.future import select
+from models import Verification, score_update
+from leaderboard import leaderboard
+from proof_fetcher import ProofFetchError
+import asyncio
+import logging
+import os
+
+# --- Verification Worker ---
+# POST /verify with "background": true records a pending Verification row and
+# returns 202. This worker claims due jobs, checks the proof, and applies the
+# score boost. Any number of workers (in-process or `python verify_worker.py`)
+# can share the table: a job is claimed with a conditional UPDATE, and a
+# claimed job carries a lease, so a crashed worker's jobs become due again.
+# The outcome is written with the same condition on the lease, so a job whose
+# lease ran out and was claimed again is finished (and boosted) only once.
+
+PLATFORM_BOOSTS = {"github": 50, "twitter": 30}
+
+log = logging.getLogger("agentkred.verify_worker")
+
+class VerificationWorker:
+    def __init__(self, session_factory, check: Callable[..., Awaitable[bool]], concurrency: int = 8, max_attempts: int = 5,
+                 backoff_base: float = 2.0, backoff_max: float = 300.0, lease_seconds: float = 60.0, poll_interval: float = 1.0):
+        self.session_factory = session_factory
+        self.check = check # check(platform, proof_url, agent_id, strict=True) -> bool
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._active: set[asyncio.Task] = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Lifecycle ---
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task: self._task.cancel()
+        for t in list(self._active): t.cancel()
+        await asyncio.gather(*([self._task] if self._task else []), *self._active, return_exceptions=True)
+        self._task = None
+
+    def notify(self):
+        """Wake the loop early; called when a job is enqueued in this process."""
+        if self._wake: self._wake.set()
+
+    async def run(self):
+        self._wake = asyncio.Event()
+        failures = 0
+        while True:
+            free = self.concurrency - len(self._active)
+            try:
+                claimed = await self.claim(free) if free > 0 else []
+            except Exception:
+                failures += 1
+                log.exception("claiming verification jobs failed")
+                await asyncio.sleep(min(self.backoff_max, self.poll_interval * self.backoff_base ** failures))
+                continue
+            failures = 0
+            for job_id, lease in claimed: self._spawn(job_id, lease)
+            if len(claimed) < free or free == 0:
+                self._wake.clear()
+                try: await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError: pass
+
+    async def run_once(self) -> int:
+        """Claim and process every job that is due right now; returns how many ran."""
+        claimed = await self.claim(10 ** 9)
+        await asyncio.gather(*(self.process(job_id, lease) for job_id, lease in claimed))
+        return len(claimed)
+
+    def _spawn(self, job_id: int, lease: datetime):
+        task = asyncio.create_task(self.process(job_id, lease))
+        self._active.add(task)
+        def done(t):
+            self._active.discard(t)
+            self.notify()
+        task.add_done_callback(done)
+
+    # --- Jobs ---
+    async def claim(self, limit: int) -> list[tuple[int, datetime]]:
+        """(job id, lease) for up to ``limit`` due jobs; the lease is the job's next_attempt_at while it runs."""
+        now = datetime.utcnow()
+        lease = now + timedelta(seconds=self.lease_seconds)
+        due = (Verification.status.in_(("pending", "running")), Verification.next_attempt_at <= now)
+        async with self.session_factory() as db:
+            candidates = (await db.execute(select(Verification.id).where(*due).order_by(Verification.next_attempt_at).limit(limit))).scalars().all()
+            claimed = []
+            for job_id in candidates:
+                res = await db.execute(update(Verification).where(Verification.id == job_id, *due).values(status="running", next_attempt_at=lease))
+                if res.rowcount == 1: claimed.append((job_id, lease))
+            await db.commit()
+        return claimed
+
+    async def _finish(self, db, job_id: int, lease: datetime, **values) -> bool:
+        """Write the outcome if this worker still holds the job's lease."""
+        res = await db.execute(
+            update(Verification).where(Verification.id == job_id, Verification.status == "running", Verification.next_attempt_at == lease)
+            .values(**values)
+        )
+        return res.rowcount == 1
+
+    async def process(self, job_id: int, lease: datetime):
+        # No session (or pooled connection) is held across the fetch, which can take seconds
+        async with self.session_factory() as db:
+            job = await db.get(Verification, job_id)
+        attempts = job.attempts + 1
+        try:
+            ok = await self.check(job.platform, job.proof_url, job.agent_id, strict=True)
+        except Exception as e:
+            # Anything unexpected counts as a failed attempt too, rather than leaving the job running
+            if not isinstance(e, (ProofFetchError, asyncio.TimeoutError)): log.exception("verification %s: check failed", job_id)
+            values = {"attempts": attempts, "last_error": (str(e) or type(e).__name__)[:500]}
+            if attempts >= self.max_attempts: values["status"] = "failed"
+            else: values.update(status="pending", next_attempt_at=datetime.utcnow() + timedelta(seconds=min(self.backoff_max, self.backoff_base ** attempts)))
+            async with self.session_factory() as db:
+                await self._finish(db, job_id, lease, **values)
+                await db.commit()
+            return
+
+        async with self.session_factory() as db:
+            if not ok:
+                await self._finish(db, job_id, lease, attempts=attempts, status="failed", last_error="Proof not found")
+                await db.commit()
+                return
+
+            now = datetime.utcnow()
+            if not await self._finish(db, job_id, lease, attempts=attempts, status="verified", is_verified=True, verified_at=now, last_error=None):
+                log.warning("verification %s: lease expired, left to the worker that claimed it again", job_id)
+                return
+            agent = (await db.execute(score_update(job.agent_id, verification_score=PLATFORM_BOOSTS.get(job.platform, 0), last_active_at=now))).scalars().first()
+            await db.commit()
+        if agent: leaderboard.upsert(agent)
+        log.info("verification %s for %s: verified", job_id, job.agent_id)
+
+VERIFY_WORKER = os.getenv("VERIFY_WORKER", "inprocess") # inprocess | external
+
+def build_worker(check: Callable[..., Awaitable[bool]], session_factory=None) -> VerificationWorker:
+    if session_factory is None:
+        from database import AsyncSessionLocal as session_factory
+    return VerificationWorker(
+        session_factory, check,
+        concurrency=int(os.getenv("VERIFY_WORKER_CONCURRENCY", "8")),
+        max_attempts=int(os.getenv("VERIFY_MAX_ATTEMPTS", "5")),
+        backoff_base=float(os.getenv("VERIFY_BACKOFF_BASE", "2")),
+    )
+
+async def _main():
+    # Standalone worker: run with VERIFY_WORKER=external on the API processes
+    from main import check_proof
+    from proof_fetcher import proof_fetcher
+    logging.basicConfig(level=logging.INFO)
+    await proof_fetcher.start()
+    try:
+        await build_worker(check_proof).run()
+    finally:
+        await proof_fetcher.close()
+
+if __name__ == "__main__":
+    asyncio.run(_main())